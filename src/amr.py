@@ -5,104 +5,99 @@
 import getopt
 import os
 import sys
-import datetime
 
 import pandas as pd
-from py2neo import Node, Relationship
-from py2neo.database import Transaction, Graph
 
 from connection import populate_db
-from constants import DATA_DIR, ENCODING, ENGINE
-from sources import add_chembl, add_spark, add_drug_central
-from relations import add_base_data, add_chembl_data, add_spark_data, add_drug_central_data
+from checkpoint import Checkpoint
+from assays import ASSAY_TYPE, AssayAggregator
+from constants import (
+    CHUNK_SIZE,
+    COMMIT_SIZE,
+    DATA_DIR,
+    LABEL_SOURCES,
+    NODE_KEYS,
+    PIPELINE_WORKERS,
+    RELATIONSHIP_SOURCES,
+    SOURCE_FILES,
+)
+from export import export_triples  # noqa: F401, kept importable from amr
+from identity import CompoundIndex
+from manifest import SourceManifest
+from metrics import METRICS, measure, measured, profiled
+from pathogens import PathogenNormalizer
+from pipeline import Pipeline
+from pubchem import LookupCache, PubChemResolver
+from rdf import RdfWriter
+from reference import ReferenceData, get_reference_data
+from registry import NodeRegistry
+from schema import KG_SCHEMA, write_schema
+from sources import (
+    add_chembl,
+    add_drug_central,
+    add_spark,
+    build_compound_index,
+    prefetch_pubchem,
+    read_chembl,
+    read_chembl_dump,
+    read_drug_central,
+    read_spark,
+    search_drug_central,
+)
+from staging import read_source
+from relations import (
+    add_base_data,
+    add_chembl_data,
+    add_spark_data,
+    add_drug_central_data,
+)
+from writer import (
+    BoltWriter,
+    CsvWriter,
+    EdgeCollector,
+    EdgeSpool,
+    GraphWriter,
+    MergeWriter,
+)
 
 pd.set_option('display.max_columns', None)
 
+
 def map_data(
-    data_df: pd.DataFrame
+    data_df: pd.DataFrame,
+    reference: ReferenceData
 ):
     # Map to institute name
-    institute_dict = pd.read_csv(
-        os.path.join(DATA_DIR, 'AMR', 'institute.csv'),
-        dtype=str,
-        index_col='id',
-        encoding=ENCODING,
-        engine=ENGINE
-    ).to_dict()['institute']
-
-    data_df['institute'] = data_df['institute'].map(institute_dict)
+    data_df['institute'] = data_df['institute'].map(reference.institute_names)
 
     # Map to project name
-    project_dict = pd.read_csv(
-        os.path.join(DATA_DIR, 'AMR', 'project.csv'),
-        dtype=str,
-        index_col='id',
-        encoding=ENCODING,
-        engine=ENGINE
-    ).to_dict()['project']
-
     for i in ['project_1', 'project_2']:
-        data_df[i] = data_df[i].map(project_dict)
+        data_df[i] = data_df[i].map(reference.project_names)
 
     # Map to bacterial strain
-    pathogen_dict = pd.read_csv(
-        os.path.join(DATA_DIR, 'AMR', 'pathogen.csv'),
-        dtype=str,
-        encoding=ENCODING,
-        engine=ENGINE
-    ).to_dict()['pathogen']
-
     for i in ['pathogen_1', 'pathogen_2', 'pathogen_3']:
-        data_df[i] = data_df[i].map(pathogen_dict)
+        data_df[i] = data_df[i].map(reference.pathogen_names)
 
     # Map to skill set
-    skill_dict = pd.read_csv(
-        os.path.join(DATA_DIR, 'AMR', 'skill.csv'),
-        dtype=str,
-        index_col='id',
-        encoding=ENCODING,
-        engine=ENGINE
-    ).to_dict()['skill']
-
     for i in ['skill_1', 'skill_2', 'skill_3', 'skill_4']:
-        data_df[i] = data_df[i].map(skill_dict)
+        data_df[i] = data_df[i].map(reference.skill_names)
 
     return data_df
 
 
-def _update_nodes(
-    node_dict: dict,
-    tx: Transaction
-):
-    """Add nodes from dictionary."""
-    for node_type in node_dict:
-        tx.create(node_dict[node_type])
+def _resolver(offline: bool) -> PubChemResolver:
+    """Open the PubChem lookup cache, once per pipeline process."""
+    return PubChemResolver(cache=LookupCache(), offline=offline)
 
 
-def add_nodes(tx: Transaction):
+@measured('node_build.base')
+def add_base_nodes(reference: ReferenceData) -> NodeRegistry:
     """Add nodes specific to AMR data"""
 
-    node_dict = {
-        'Person': {},
-        'Institute': {},
-        'Skill': {},
-        'Pathogen': {},
-        'Project': {},
-        'ChEMBL': {},
-        'SPARK': {},
-        'PubChem': {},
-        'DrugCentral': {},
-    }
+    registry = NodeRegistry(['Person', 'Institute', 'Skill', 'Pathogen', 'Project'])
 
     # Create person nodes
-    person_df = pd.read_csv(
-        os.path.join(DATA_DIR, 'AMR', 'person.csv'),
-        usecols=['contact', 'email', 'orcid'],
-        encoding=ENCODING,
-        engine=ENGINE
-    )
-
-    for name, email, orcid in person_df.values:
+    for name, email, orcid in reference.persons[['contact', 'email', 'orcid']].values:
         person_property = {}
 
         if pd.notna(name):
@@ -114,99 +109,51 @@ def add_nodes(tx: Transaction):
         if pd.notna(orcid):
             person_property['orcid'] = orcid
 
-        node_dict['Person'][name] = Node('Person', **person_property)
-        tx.create(node_dict['Person'][name])
+        registry['Person'].set(name, person_property)
 
     # Create institute nodes
-    institute_df = pd.read_csv(
-        os.path.join(DATA_DIR, 'AMR', 'institute.csv'),
-        usecols=['institute', 'link'],
-        encoding=ENCODING,
-        engine=ENGINE
-    )
-
-    for institute_name, institute_page in institute_df.values:
+    institutes = reference.institutes[['institute', 'link']]
+    for institute_name, institute_page in institutes.values:
         institute_property = {}
 
         if pd.notna(institute_name):
             institute_property['name'] = institute_name
             institute_property['link'] = institute_page
 
-            node_dict['Institute'][institute_name] = Node(
-                'Institute', **institute_property
-            )
-            tx.create(node_dict['Institute'][institute_name])
+            registry['Institute'].set(institute_name, institute_property)
 
     # Create project nodes
-    project_df = pd.read_csv(
-        os.path.join(DATA_DIR, 'AMR', 'project.csv'),
-        dtype=str,
-        index_col='id',
-        encoding=ENCODING,
-        engine=ENGINE
-    )
-
-    for project_name in project_df.values:
+    for project_name in reference.project_names.values():
         project_property = {}
 
         if pd.notna(project_name):
-            project_name = project_name[0]
             project_property['name'] = project_name
             project_property['curie'] = 'imi:' + project_name.lower()
-            project_property[
-                'link'] = f'https://www.imi.europa.eu/projects-results/project-factsheets/{project_name.lower()}'
+            project_property['link'] = (
+                'https://www.imi.europa.eu/projects-results/project-factsheets/'
+                + project_name.lower()
+            )
 
-            node_dict['Project'][project_name] = Node('Project', **project_property)
-            tx.create(node_dict['Project'][project_name])
+            registry['Project'].set(project_name, project_property)
 
     # Create pathogen node
-    pathogen_df = pd.read_csv(
-        os.path.join(DATA_DIR, 'AMR', 'pathogen.csv'),
-        dtype=str,
-        encoding=ENCODING,
-        engine=ENGINE
-    )
-
-    # List of pathogens from data file
-    interested_pathogen = []
-    for i in pathogen_df['pathogen'].values:
-        if pd.notna(i):
-            p = i.split(', ')
-            interested_pathogen.extend(p)
-
-    interested_pathogen = set(interested_pathogen)
-
-    for pathogen_name, taxon_id in pathogen_df.values:
+    for pathogen_name, taxon_id in reference.pathogen_taxa.items():
         pathogen_property = {}
-
-        if pd.isna(pathogen_name):
-            continue
-
         pathogen_property['name'] = pathogen_name
         pathogen_property['curie'] = 'ncbitaxon:' + taxon_id
-        pathogen_property['info'] = f'https://www.ncbi.nlm.nih.gov/Taxonomy/Browser/wwwtax.cgi?mode=Info&id={taxon_id}'
-        node_dict['Pathogen'][pathogen_name] = Node('Pathogen', **pathogen_property)
-        tx.create(node_dict['Pathogen'][pathogen_name])
+        pathogen_property['info'] = (
+            'https://www.ncbi.nlm.nih.gov/Taxonomy/Browser/wwwtax.cgi'
+            f'?mode=Info&id={taxon_id}'
+        )
+        registry['Pathogen'].set(pathogen_name, pathogen_property)
 
     # Create skill nodes
-    skill_df = pd.read_csv(
-        os.path.join(DATA_DIR, 'AMR', 'skill.csv'),
-        dtype=str,
-        index_col='id',
-        encoding=ENCODING,
-        engine=ENGINE
-    )
-
-    skill_set_1 = set(skill_df['skill'].tolist())
-    skill_set_2 = {i + '_group' for i in skill_df['category'].unique().tolist()}
+    skill_set_1 = set(reference.skill_categories)
+    skill_set_2 = {i + '_group' for i in set(reference.skill_categories.values())}
 
     skill_set_1 = skill_set_1.union(skill_set_2)
 
-    skill_def = {
-        skill: definition
-        for skill, definition in skill_df[['skill', 'definition']].values
-        if pd.notna(definition)
-    }
+    skill_def = reference.skill_definitions
 
     for skill_name in skill_set_1:
         skill_property = {}
@@ -216,233 +163,564 @@ def add_nodes(tx: Transaction):
             if skill_name in skill_def:
                 skill_property['definition'] = skill_def[skill_name]
 
-            node_dict['Skill'][skill_name] = Node('Skill', **skill_property)
-            tx.create(node_dict['Skill'][skill_name])
+            registry['Skill'].set(skill_name, skill_property)
 
-    """Add ChEMBL data"""
+    return registry
 
-    node_dict, chembl_to_node_map = add_chembl(
-        interested_pathogen=interested_pathogen,
-        tx=tx,
-        node_dict=node_dict
-    )
 
-    """Add SPARK data"""
+def chembl_compounds(
+    pathogens: PathogenNormalizer, chunksize: int = CHUNK_SIZE
+) -> pd.DataFrame:
+    """Read the ChEMBL compounds"""
+    return read_chembl(pathogens=pathogens, chunksize=chunksize)
 
-    node_dict = add_spark(
-        interested_pathogen=interested_pathogen,
-        chembl_to_node_map=chembl_to_node_map,
-        node_dict=node_dict
-    )
 
-    """Add DrugCentral data"""
-    node_dict = add_drug_central(node_dict=node_dict)
+def spark_compounds(pathogens: PathogenNormalizer) -> pd.DataFrame:
+    """Read SPARK data"""
+    return read_spark(pathogens=pathogens)
 
-    # Add also updated nodes into graph
-    for node_type in node_dict:
-        _update_nodes(
-            node_dict=node_dict[node_type],
-            tx=tx
-        )
 
-    return node_dict
+def drug_central_compounds(pathogens: PathogenNormalizer) -> pd.DataFrame:
+    """Read DrugCentral data"""
+    return read_drug_central(pathogens=pathogens)
 
 
-def add_relations(
-    tx: Transaction,
-    df: pd.DataFrame,
-    mic_df: pd.DataFrame,
-    spark_df: pd.DataFrame,
-    drug_central_df: pd.DataFrame,
-    node_mapping_dict: dict
+def pubchem_lookups(
+    spark_compounds: pd.DataFrame,
+    drug_central_compounds: pd.DataFrame,
+    offline: bool
 ):
-    """Add relations specific to AMR data. """
-
-    # Add basic data
-    add_base_data(df=df, node_mapping_dict=node_mapping_dict, tx=tx)
-
-    # Add ChEMBL data
-    add_chembl_data(df=mic_df, node_mapping_dict=node_mapping_dict, tx=tx)
-
-    # Add spark data
-    add_spark_data(df=spark_df, node_mapping_dict=node_mapping_dict, tx=tx)
+    """Look up the PubChem ids of SPARK and the DrugCentral names in one process.
+
+    The requests of a load are sent from this stage only, so they keep to the
+    rate limit of a single resolver. Later stages read the lookup cache.
+    """
+    prefetch_pubchem(
+        spark_df=spark_compounds,
+        drug_central_df=drug_central_compounds,
+        resolver=_resolver(offline)
+    )
 
-    # Add Drug Central data
-    add_drug_central_data(df=drug_central_df, node_mapping_dict=node_mapping_dict, tx=tx)
 
-    print('#### Node Summary ####')
-    for i in node_mapping_dict:
-        print(f'{i} - {len(node_mapping_dict[i])}')
+def compound_nodes(
+    chembl_compounds: pd.DataFrame,
+    spark_compounds: pd.DataFrame,
+    drug_central_compounds: pd.DataFrame,
+    offline: bool,
+    pubchem_lookups=None
+) -> tuple:
+    """Resolve the compounds of all sources to one node each, keyed by preferred curie
 
+    Runs after ``pubchem_lookups``, so PubChem is only read from the cache.
+    """
+    resolver = _resolver(offline)
+    drug_central_compounds = search_drug_central(drug_central_compounds, resolver)
 
-def add_skill_data(
-    tx: Transaction,
-    node_mapping_dict: dict
-):
-    """Add skill category connection to AMR KG."""
-
-    skill_df = pd.read_csv(
-        os.path.join(DATA_DIR, 'AMR', 'skill.csv'),
-        usecols=['skill', 'category'],
-        encoding=ENCODING,
-        engine=ENGINE
-    )
+    with measure('node_build.index') as span:
+        index = build_compound_index(
+            chembl_compounds, spark_compounds, drug_central_compounds
+        )
+        span.rows = len(index)
 
-    skill_df['category'] = skill_df['category'].apply(lambda x: x + '_group')
-
-    for skill_name, skill_class_name in skill_df.values:
-        skill_node = node_mapping_dict['Skill'][skill_name]
-        skill_class_node = node_mapping_dict['Skill'][skill_class_name]
-        includes = Relationship(skill_class_node, 'INCLUDES', skill_node)
-        tx.create(includes)
+    registry = NodeRegistry(['ChEMBL', 'SPARK', 'PubChem', 'DrugCentral'])
 
+    with measure('node_build.chembl', rows=len(chembl_compounds)):
+        add_chembl(chembl_df=chembl_compounds, registry=registry, index=index)
+    with measure('node_build.spark', rows=len(spark_compounds)):
+        add_spark(
+            spark_df=spark_compounds, registry=registry, index=index, resolver=resolver
+        )
+    with measure('node_build.drug_central', rows=len(drug_central_compounds)):
+        add_drug_central(
+            drug_central_df=drug_central_compounds,
+            registry=registry,
+            index=index,
+            resolver=resolver
+        )
+    return index, registry
 
-def add_institute_data(
-    tx: Transaction,
-    node_mapping_dict: dict
-):
-    # Map to project name
-    project_dict = pd.read_csv(
-        os.path.join(DATA_DIR, 'AMR', 'project.csv'),
-        dtype=str,
-        index_col='id',
-        encoding=ENCODING,
-        engine=ENGINE
-    ).to_dict()['project']
-
-    institute_df = pd.read_csv(
-        os.path.join(DATA_DIR, 'AMR', 'institute.csv'),
-        usecols=['institute', 'projects'],
-        encoding=ENCODING,
-        engine=ENGINE
-    )
 
-    for row in institute_df.values:
-        (
-            institute_name,
-            projects
-        ) = row
+def merge_nodes(base_nodes: NodeRegistry, compound_nodes: tuple) -> NodeRegistry:
+    """Combine the nodes of all sources"""
+    return base_nodes.merge(compound_nodes[1])
 
-        institute_node = node_mapping_dict['Institute'][institute_name]
 
-        for project_idx in projects.split(','):
-            if project_idx:
-                project_name = project_dict[int(project_idx)]
-                project_node = node_mapping_dict['Project'][project_name]
+def compound_index(compound_nodes: tuple) -> CompoundIndex:
+    """Index of the canonical compound keys, for the relations of all sources"""
+    return compound_nodes[0]
 
-                supervises = Relationship(institute_node, 'SUPERVISES', project_node)
-                tx.create(supervises)
 
+def write_nodes(nodes: NodeRegistry, writer: GraphWriter):
+    """Report key and name collisions, then write all nodes once the sources are done"""
+    nodes.report()
 
-def export_triples(
-    graph: Graph
-):
-    """Exporting triples of the graph"""
+    for node_type in nodes:
+        writer.add_nodes(node_type, nodes[node_type])
 
-    DATE = datetime.today().strftime('%d_%b_%Y')
-    t = graph.run(
-        'Match (n)-[r]-(m) Return n.name, n.curie, type(r), m.name, m.curie'
-    ).to_data_frame()
 
-    graph_dir = f'{DATA_DIR}/dump'
-    os.makedirs(graph_dir, exist_ok=True)
-    return t.to_csv(f'{graph_dir}/base_triples-{DATE}.tsv', sep='\t', index=False)
+@measured('edge_build.amr')
+def amr_edges(df: pd.DataFrame, reference: ReferenceData) -> EdgeCollector:
+    """Add basic data, intra-skill relations and institute-project edges"""
+    edges = EdgeCollector()
+    add_base_data(df=df, writer=edges)
+    add_skill_data(writer=edges, reference=reference)
+    add_institute_data(df=df, writer=edges, reference=reference)
+    return edges
 
 
-def main():
-    db_name = "amr"
-    # try:
-    #     opts, args = getopt.getopt(argv, "hd:", ["db="])
-    # except getopt.GetoptError:
-    #     print("amr -id <dbname>")
-    #     sys.exit(2)
-    # for opt, arg in opts:
-    #     if opt == "-h":
-    #         print("amr -d <dbname>")
-    #         sys.exit()
-    #     elif opt in ("-d", "--db"):
-    #         db_name = arg
-
-    tx = populate_db(db_name=db_name)
-    df = pd.read_csv(
-        os.path.join(DATA_DIR, 'AMR', 'person.csv'),
+@measured('edge_build.chembl')
+def chembl_edges(
+    compounds: CompoundIndex,
+    pathogens: PathogenNormalizer,
+    chunksize: int = CHUNK_SIZE
+) -> EdgeSpool:
+    """Add ChEMBL data, read chunk by chunk and spooled to disk"""
+    edges = EdgeSpool()
+    mic_chunks = read_chembl_dump(
+        pathogens=pathogens,
         usecols=[
-            'contact',
-            'institute',
-            'project_1',
-            'project_2',
-            'pathogen_1',
-            'pathogen_2',
-            'pathogen_3',
-            'skill_1',
-            'skill_2',
-            'skill_3',
-            'skill_4',
+            'chembl_id',
+            'standard_relation',
+            'standard_value',
+            'standard_units',
+            'strain',
+            'assay_id',
         ],
-        encoding=ENCODING,
-        engine=ENGINE
+        chunksize=chunksize
     )
 
-    df = map_data(data_df=df)
-
-    # Load ChEMBL data
-    mic_df = pd.read_csv(
-        os.path.join(DATA_DIR, 'MIC', 'data_dump_31.tsv'),
-        sep='\t',
-        dtype=str,
-        encoding=ENCODING,
-        engine=ENGINE
-    )
-    mic_df['mic_val'] = mic_df['standard_value'] + mic_df['standard_units']
-    mic_df.drop(['standard_value', 'standard_units'], axis=1, inplace=True)
-
-    # Load SPARK data
-    spark_df = pd.read_csv(
-        os.path.join(DATA_DIR, 'SPARK', 'processed_mic_data.tsv'),
-        sep='\t',
-        dtype=str,
-        encoding=ENCODING,
-        engine=ENGINE
+    for mic_df in mic_chunks:
+        add_chembl_data(df=mic_df, writer=edges, index=compounds, pathogens=pathogens)
+
+    return edges
+
+
+@measured('edge_build.spark')
+def spark_edges(
+    compounds: CompoundIndex, pathogens: PathogenNormalizer
+) -> EdgeCollector:
+    """Add spark data"""
+    edges = EdgeCollector()
+    spark_df = read_source(
+        'SPARK/processed_mic_data.tsv',
+        columns=[
+            'Compound Name',
+            'Curated & Transformed MIC Data: Species',
+            'Curated & Transformed MIC Data: MIC (in microM) (microM)',
+            'Curated & Transformed MIC Data: DOI',
+            'PubMed ID',
+            'pubchem',
+            'chembl',
+        ],
+        filter_values=pathogens.matches
     )
     spark_df.drop_duplicates(inplace=True)
 
-    drug_central_df = pd.read_csv(
-        os.path.join(DATA_DIR, 'drug_central', 'drug.target.interaction.tsv'),
-        sep='\t',
-        dtype=str,
-        usecols=[
+    add_spark_data(df=spark_df, writer=edges, index=compounds, pathogens=pathogens)
+    return edges
+
+
+@measured('edge_build.drug_central')
+def drug_central_edges(
+    compounds: CompoundIndex, pathogens: PathogenNormalizer
+) -> EdgeCollector:
+    """Add Drug Central data"""
+    edges = EdgeCollector()
+    drug_central_df = read_source(
+        'drug_central/drug.target.interaction.tsv',
+        columns=[
             'STRUCT_ID',
             'ACT_VALUE',
             'ACT_UNIT',
             'ACT_TYPE',
             'ACT_SOURCE_URL',
             'ORGANISM',
-        ]
+        ],
+        filter_values=pathogens.matches
     )
     drug_central_df.drop_duplicates(inplace=True)
 
+    add_drug_central_data(
+        df=drug_central_df,
+        writer=edges,
+        index=compounds,
+        pathogens=pathogens
+    )
+    return edges
+
+
+def write_edges(
+    writer: GraphWriter,
+    nodes: NodeRegistry,
+    amr_edges: EdgeCollector,
+    chembl_edges: EdgeSpool,
+    spark_edges: EdgeCollector,
+    drug_central_edges: EdgeCollector,
+    write_nodes=None,
+    assays_path: str = None
+):
+    """Add relations specific to AMR data. Sources left out of the pipeline are skipped.
+
+    The ``ASSAY IN`` measurements of all sources are aggregated into one edge per
+    pathogen and compound, the single measurements are written to ``assays_path``.
+    """
+    assays = AssayAggregator(writer, raw_path=assays_path)
+    for edges in (amr_edges, chembl_edges, spark_edges, drug_central_edges):
+        if edges is not None:
+            edges.replay(assays)
+    assays.close()
+
+    print('#### Node Summary ####')
+    for i in nodes:
+        print(f'{i} - {len(nodes[i])}')
+
+
+def add_skill_data(
+    writer: GraphWriter,
+    reference: ReferenceData
+):
+    """Add skill category connection to AMR KG."""
+
+    skill_df = reference.skills[['category', 'skill']].copy()
+    skill_df['category'] = skill_df['category'] + '_group'
+
+    for skill_name, skill_class_name in skill_df.values:
+        writer.add_relationship(
+            ('Skill', skill_class_name), 'INCLUDES', ('Skill', skill_name)
+        )
+
+
+def add_institute_data(
+    df: pd.DataFrame,
+    writer: GraphWriter,
+    reference: ReferenceData
+):
+    """Add the projects supervised by each institute, each pair once.
+
+    Institutes supervise the projects listed in institute.csv and the first
+    project of each of their members.
+    """
+    # Map to project name
+    project_dict = reference.project_names
+
+    listed = [
+        (institute_name, project_dict[int(project_idx)])
+        for institute_name, projects in reference.institutes[
+            ['institute', 'projects']
+        ].values
+        for project_idx in projects.split(',')
+        if project_idx
+    ]
+
+    # Institute -[SUPERVISES] -> Project
+    supervises = pd.concat([
+        df[['institute', 'project_1']].set_axis(['start', 'end'], axis=1),
+        pd.DataFrame(listed, columns=['start', 'end']),
+    ])
+    supervises = supervises.dropna().drop_duplicates()
+    writer.add_relationships('Institute', 'SUPERVISES', 'Project', supervises)
+
+
+def load(
+    writer: GraphWriter,
+    sources: set = frozenset(SOURCE_FILES),
+    offline: bool = False,
+    chunksize: int = CHUNK_SIZE,
+    workers: int = PIPELINE_WORKERS,
+    assays_path: str = None
+) -> Pipeline:
+    """Build the KG into ``writer`` and close it, returning the pipeline run.
+
+    Only the relations of ``sources`` are written, all nodes always are. Any
+    writer can be used, e.g. ``memory.MemoryWriter`` to build the KG without Neo4j.
+    The single assay measurements are written to ``assays_path`` if given.
+    """
+    reference = get_reference_data()
+
+    df = reference.persons[[
+        'contact',
+        'institute',
+        'project_1',
+        'project_2',
+        'pathogen_1',
+        'pathogen_2',
+        'pathogen_3',
+        'skill_1',
+        'skill_2',
+        'skill_3',
+        'skill_4',
+    ]].copy()
+
+    df = map_data(data_df=df, reference=reference)
+
+    # Strain names of all sources are mapped to the pathogens of pathogen.csv
+    pathogens = PathogenNormalizer(reference.pathogen_taxa)
+
+    # Sources are parsed and resolved in parallel, nodes and relations are written here
+    pipeline = Pipeline(workers=workers)
+
     # Add nodes
-    node_map = add_nodes(tx=tx)
+    pipeline.add('base_nodes', add_base_nodes, local=True, reference=reference)
+    pipeline.add(
+        'chembl_compounds', chembl_compounds, pathogens=pathogens, chunksize=chunksize
+    )
+    pipeline.add('spark_compounds', spark_compounds, pathogens=pathogens)
+    pipeline.add('drug_central_compounds', drug_central_compounds, pathogens=pathogens)
+    pipeline.add(
+        'pubchem_lookups',
+        pubchem_lookups,
+        deps=('spark_compounds', 'drug_central_compounds'),
+        offline=offline
+    )
+    pipeline.add(
+        'compound_nodes',
+        compound_nodes,
+        deps=(
+            'chembl_compounds',
+            'spark_compounds',
+            'drug_central_compounds',
+            'pubchem_lookups',
+        ),
+        offline=offline
+    )
+    pipeline.add('compounds', compound_index, deps=('compound_nodes',), local=True)
+    pipeline.add(
+        'nodes', merge_nodes, deps=('base_nodes', 'compound_nodes'), local=True
+    )
+    pipeline.add('write_nodes', write_nodes, deps=('nodes',), local=True, writer=writer)
 
     # Add relations
-    add_relations(
-        tx=tx,
-        df=df,
-        mic_df=mic_df,
-        spark_df=spark_df,
-        drug_central_df=drug_central_df,
-        node_mapping_dict=node_map
+    if 'AMR' in sources:
+        pipeline.add('amr_edges', amr_edges, df=df, reference=reference)
+
+    # Assay edges aggregate the measurements of all sources, so are rebuilt together
+    if sources & RELATIONSHIP_SOURCES[ASSAY_TYPE]:
+        pipeline.add(
+            'chembl_edges',
+            chembl_edges,
+            deps=('compounds',),
+            pathogens=pathogens,
+            chunksize=chunksize
+        )
+        pipeline.add(
+            'spark_edges', spark_edges, deps=('compounds',), pathogens=pathogens
+        )
+        pipeline.add(
+            'drug_central_edges',
+            drug_central_edges,
+            deps=('compounds',),
+            pathogens=pathogens
+        )
+
+    pipeline.add(
+        'write_edges',
+        write_edges,
+        deps=(
+            'nodes',
+            'write_nodes',
+            'amr_edges',
+            'chembl_edges',
+            'spark_edges',
+            'drug_central_edges',
+        ),
+        local=True,
+        writer=writer,
+        assays_path=assays_path
     )
 
-    # Add intra-skill relations
-    add_skill_data(tx=tx, node_mapping_dict=node_map)
+    pipeline.run()
 
-    # Add institute-project edges
-    add_institute_data(tx=tx, node_mapping_dict=node_map)
-    tx.commit()
+    writer.close()
+    return pipeline
 
 
-if __name__ == "__main__":
-    # main(sys.argv[1:])
-    main()
+def main(argv):
+    db_name = "amr"
+    export_dir = None
+    offline = False
+    incremental = False
+    chunksize = CHUNK_SIZE
+    workers = PIPELINE_WORKERS
+    resume = False
+    commit_size = COMMIT_SIZE
+    rdf_dir = None
+    rdf_format = 'nt'
+    compress = False
+    assays_path = None
+    metrics_path = None
+    prometheus_path = None
+    profile_path = None
+    usage = (
+        "amr -d <dbname> [-e <csv export dir> | -t <rdf dir> [-f nt|ttl] [-z] | -i] "
+        "[-o] [-c <chunk size>] [-j <workers>] [-r] [-n <commit size>] "
+        "[-a <assays tsv>] [-m <metrics json>] [--prometheus <textfile>] "
+        "[--profile <file.prof|file.html>] [--log-json]"
+    )
 
+    try:
+        opts, args = getopt.getopt(
+            argv,
+            "hd:e:oic:j:rn:t:f:za:m:",
+            [
+                "db=", "export=", "offline", "incremental", "chunksize=", "jobs=",
+                "resume", "commit-size=", "rdf=", "format=", "gzip", "assays=",
+                "metrics=", "prometheus=", "profile=", "log-json",
+            ]
+        )
+    except getopt.GetoptError:
+        print(usage)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == "-h":
+            print(usage)
+            sys.exit()
+        elif opt in ("-d", "--db"):
+            db_name = arg
+        elif opt in ("-e", "--export"):
+            export_dir = arg
+        elif opt in ("-o", "--offline"):
+            # Only use cached PubChem lookups
+            offline = True
+        elif opt in ("-i", "--incremental"):
+            # Merge changed sources into the existing database
+            incremental = True
+        elif opt in ("-c", "--chunksize"):
+            # Rows of the ChEMBL dump held in memory at a time
+            chunksize = int(arg)
+        elif opt in ("-j", "--jobs"):
+            # Worker processes of the pipeline, 0 to run every stage in this process
+            workers = int(arg)
+        elif opt in ("-r", "--resume"):
+            # Continue a failed load after its last committed batch
+            resume = True
+        elif opt in ("-n", "--commit-size"):
+            # Rows written per transaction
+            commit_size = int(arg)
+        elif opt in ("-t", "--rdf"):
+            rdf_dir = arg
+        elif opt in ("-f", "--format"):
+            # RDF serialization, N-Triples or Turtle
+            rdf_format = arg
+        elif opt in ("-z", "--gzip"):
+            compress = True
+        elif opt in ("-a", "--assays"):
+            # Keep every assay measurement in a TSV file next to the aggregated edges
+            assays_path = arg
+        elif opt in ("-m", "--metrics"):
+            # Durations, rows, memory and cache hit rates of every step as JSON
+            metrics_path = arg
+        elif opt == "--prometheus":
+            # The same metrics as a textfile for the Prometheus node exporter
+            prometheus_path = arg
+        elif opt == "--profile":
+            # Profile of the main process, pyinstrument for .html given it is
+            # installed, cProfile otherwise
+            profile_path = arg
+        elif opt == "--log-json":
+            # Log every measured step as a JSON line
+            METRICS.log_json = True
+
+    if (export_dir or rdf_dir) and (incremental or resume):
+        print(usage)
+        sys.exit(2)
+
+    if (export_dir and rdf_dir) or rdf_format not in ('nt', 'ttl'):
+        print(usage)
+        sys.exit(2)
+
+    # Sources whose data is (re)written
+    sources = set(SOURCE_FILES)
+
+    if export_dir:
+        # Write neo4j-admin import files instead of loading over Bolt
+        writer = CsvWriter(output_dir=export_dir)
+    elif rdf_dir:
+        # Serialize the KG to RDF files, no database needed
+        writer = RdfWriter(output_dir=rdf_dir, fmt=rdf_format, compress=compress)
+    else:
+        manifest_path = os.path.join(DATA_DIR, 'cache', f'{db_name}-sources.json')
+        manifest = SourceManifest(manifest_path)
+        checkpoint = Checkpoint(
+            os.path.join(DATA_DIR, 'cache', f'{db_name}-checkpoint.jsonl'),
+            sources=manifest.current
+        )
+
+        if resume and not checkpoint.exists():
+            print(f'No checkpoint found at {checkpoint.path}, loading from the start')
+            resume = False
+
+        # Fails before touching the database if the sources changed since the checkpoint
+        committed = checkpoint.load() if resume else None
+
+        if incremental:
+            sources = manifest.changed()
+
+            if not sources:
+                print('No source changed since the last load')
+                return
+
+            print(f'Loading changed sources: {", ".join(sorted(sources))}')
+
+            # Nodes and relationships of the changed sources are rewritten, stale ones
+            # deleted, the others are kept as they are
+            labels = {label for label, deps in LABEL_SOURCES.items() if deps & sources}
+            rel_types = {
+                rel_type
+                for rel_type, deps in RELATIONSHIP_SOURCES.items()
+                if deps & sources
+            }
+            writer = MergeWriter(
+                populate_db(db_name=db_name, unique=True, schema=KG_SCHEMA),
+                node_keys=NODE_KEYS,
+                skip_labels=set(LABEL_SOURCES) - labels,
+                sweep_labels=labels,
+                sweep_types=rel_types,
+                # A resumed load keeps the generation of the failed one
+                generation=checkpoint.generation,
+                commit_size=commit_size,
+                checkpoint=checkpoint
+            )
+        else:
+            # A full load replaces the database, with the nodes, relationships and
+            # constraints of earlier loads; only a resumed one keeps what it holds
+            tx = populate_db(db_name=db_name, replace=not resume, schema=KG_SCHEMA)
+            writer = BoltWriter(tx, commit_size=commit_size, checkpoint=checkpoint)
+
+        if resume:
+            print(f'Resuming from {checkpoint.path}')
+            writer.resume(*committed)
+        else:
+            checkpoint.start()
+
+    with profiled(profile_path):
+        pipeline = load(
+            writer,
+            sources=sources,
+            offline=offline,
+            chunksize=chunksize,
+            workers=workers,
+            assays_path=assays_path
+        )
+
+    writer.report()
+    pipeline.report()
+    METRICS.report()
+
+    if metrics_path:
+        METRICS.write_json(metrics_path)
+    if prometheus_path:
+        METRICS.write_prometheus(prometheus_path)
+
+    if export_dir:
+        schema_path = write_schema(os.path.join(export_dir, 'schema.cypher'))
+        print(
+            'Then create the indexes with: '
+            f'cypher-shell -d <database> -f {schema_path}'
+        )
+
+    if incremental:
+        manifest.save()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+
+"""Aggregation of the ASSAY IN measurements into one edge per pathogen and compound"""
+
+import os
+import pickle
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from constants import ASSAY_BUCKETS, ASSAY_SPILL_ROWS
+from metrics import measure
+from units import MIC_COLUMNS, MIC_EXACT, MIC_MASS, MIC_MOLAR, MIC_VALID
+from writer import GraphWriter
+
+ASSAY_TYPE = 'ASSAY IN'
+
+# Units of the MIC statistics of the edges, by normalized column
+STATISTICS = {
+    MIC_MOLAR: 'microM',
+    MIC_MASS: 'ug/mL',
+}
+
+
+def aggregate_assays(measurements: pd.DataFrame) -> pd.DataFrame:
+    """Group measurements by ``start`` and ``end`` into one edge each.
+
+    Edges get the number of measurements, of those with a normalized MIC and
+    of the censored ones among them (e.g. ``'>64'``), the minimum, median and
+    geometric mean of the exact MIC values in microM and in ug/mL (see units.py)
+    and, for every other column, the list of its distinct values in the order
+    they were measured.
+    """
+    keys = ['start', 'end']
+
+    # Groups are numbered in order of appearance, which also works for missing keys
+    groups = measurements.groupby(keys, sort=False, dropna=False).ngroup()
+    first = ~groups.duplicated()
+    edges = measurements.loc[first, keys].set_index(groups[first])
+    edges['Measurements'] = groups.value_counts()
+
+    if MIC_VALID in measurements:
+        valid = measurements[MIC_VALID].eq(True)
+        edges['Normalized measurements'] = valid.groupby(groups).sum()
+
+        # Bounds only, left out of the statistics
+        if MIC_EXACT in measurements:
+            censored = valid & measurements[MIC_EXACT].ne(True)
+            edges['Censored measurements'] = censored.groupby(groups).sum()
+
+    for column, unit in STATISTICS.items():
+        if column not in measurements:
+            continue
+
+        values = measurements[column]
+        if MIC_EXACT in measurements:
+            values = values.where(measurements[MIC_EXACT].eq(True))
+        logs = np.log(values.where(values > 0))
+        stats = pd.DataFrame({'value': values, 'log': logs}).groupby(groups).agg(
+            low=('value', 'min'),
+            median=('value', 'median'),
+            log=('log', 'mean'),
+        )
+        edges[f'MIC min ({unit})'] = stats['low']
+        edges[f'MIC median ({unit})'] = stats['median']
+        edges[f'MIC geometric mean ({unit})'] = np.exp(stats['log'])
+
+    for column in measurements.columns.difference(keys + MIC_COLUMNS, sort=False):
+        distinct = pd.DataFrame({'group': groups, 'value': measurements[column]})
+        distinct = distinct.dropna().drop_duplicates()
+        edges[column] = distinct.groupby('group')['value'].agg(list)
+
+    return edges.reset_index(drop=True)
+
+
+class AssayAggregator:
+    """Stand in for a writer, aggregating the ``ASSAY IN`` edge tables into edges.
+
+    Other relationships are passed to ``writer`` as they come. The ``ASSAY IN``
+    tables are kept per compound label until :meth:`close`, so measurements of
+    the same pair from several sources end up on one edge. With ``raw_path``,
+    all measurements are also written to a TSV file.
+
+    Beyond ``spill_rows`` measurements, the tables are spilled to temporary
+    files, one per label pair and bucket of pathogen and compound pairs. All
+    measurements of a pair land in the same bucket, so :meth:`close` aggregates
+    one bucket at a time.
+    """
+
+    def __init__(
+        self,
+        writer: GraphWriter,
+        raw_path: str = None,
+        spill_rows: int = ASSAY_SPILL_ROWS,
+        buckets: int = ASSAY_BUCKETS
+    ):
+        self.writer = writer
+        self.raw_path = raw_path
+        self.spill_rows = spill_rows
+        self.buckets = buckets
+        self._tables = {}  # (start label, end label) -> list of edge tables
+        self._rows = 0
+        self._columns = {}  # columns of all tables, in order of appearance
+        self._spill_dir = None
+        self._spilled = {}  # (start label, end label) -> number in the spill file names
+        self._raw_written = False
+
+    def add_relationship(
+        self, start: tuple, rel_type: str, end: tuple, properties: dict = None
+    ):
+        if rel_type == ASSAY_TYPE:
+            self.add_relationships(start[0], rel_type, end[0], pd.DataFrame([
+                {'start': start[1], 'end': end[1], **(properties or {})}
+            ]))
+        else:
+            self.writer.add_relationship(start, rel_type, end, properties)
+
+    def add_relationships(
+        self, start_label: str, rel_type: str, end_label: str, edges: pd.DataFrame
+    ):
+        if rel_type == ASSAY_TYPE:
+            self._tables.setdefault((start_label, end_label), []).append(edges)
+            self._columns.update(dict.fromkeys(edges.columns))
+            self._rows += len(edges)
+            if self._rows > self.spill_rows:
+                self._spill()
+        else:
+            self.writer.add_relationships(start_label, rel_type, end_label, edges)
+
+    def _spill(self):
+        """Append the buffered tables to their bucket files and empty the buffer."""
+        if self._spill_dir is None:
+            self._spill_dir = tempfile.mkdtemp(prefix='amr-kg-assays-')
+
+        with measure('edge_build.assays_spill', rows=self._rows):
+            for labels, tables in self._tables.items():
+                number = self._spilled.setdefault(labels, len(self._spilled))
+                measurements = pd.concat(tables, ignore_index=True)
+                pairs = measurements[['start', 'end']]
+                buckets = pd.util.hash_pandas_object(pairs, index=False) % self.buckets
+                for bucket, part in measurements.groupby(buckets, sort=False):
+                    with open(self._bucket_path(number, bucket), 'ab') as file:
+                        pickle.dump(part, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+        self._tables.clear()
+        self._rows = 0
+
+    def _bucket_path(self, number: int, bucket: int) -> str:
+        return os.path.join(self._spill_dir, f'{number}_{bucket}.pkl')
+
+    def _spilled_measurements(self, number: int):
+        """Yield the measurements of each bucket of a label pair, in added order."""
+        for bucket in range(self.buckets):
+            path = self._bucket_path(number, bucket)
+            if not os.path.exists(path):
+                continue
+
+            parts = []
+            with open(path, 'rb') as file:
+                while True:
+                    try:
+                        parts.append(pickle.load(file))
+                    except EOFError:
+                        break
+            yield pd.concat(parts, ignore_index=True)
+
+    def _aggregate(self, start_label: str, end_label: str, measurements: pd.DataFrame):
+        """Write the edges of ``measurements``, returning the row and edge counts."""
+        if measurements.empty:
+            return 0, 0
+
+        with measure('edge_build.assays', rows=len(measurements)):
+            edges = aggregate_assays(measurements)
+        self.writer.add_relationships(start_label, ASSAY_TYPE, end_label, edges)
+
+        if self.raw_path:
+            self._write_raw(start_label, end_label, measurements)
+
+        return len(measurements), len(edges)
+
+    def _write_raw(self, start_label: str, end_label: str, measurements: pd.DataFrame):
+        """Append ``measurements`` to ``raw_path``, with the columns of all tables."""
+        if not self._raw_written:
+            os.makedirs(os.path.dirname(os.path.abspath(self.raw_path)), exist_ok=True)
+
+        raw = measurements.reindex(columns=list(self._columns)).assign(label=end_label)
+        raw.rename(columns={'start': start_label, 'end': 'compound'}).to_csv(
+            self.raw_path,
+            sep='\t',
+            index=False,
+            mode='a' if self._raw_written else 'w',
+            header=not self._raw_written
+        )
+        self._raw_written = True
+
+    def close(self) -> dict:
+        """Write the aggregated edges.
+
+        Returns the number of measurements and edges by compound label.
+        """
+        counts = {}
+
+        try:
+            if self._spill_dir is not None:
+                self._spill()
+
+            for labels, tables in self._tables.items():
+                measurements = pd.concat(tables, ignore_index=True)
+                counts[labels[1]] = self._aggregate(*labels, measurements)
+
+            for labels, number in self._spilled.items():
+                rows, edges = 0, 0
+                for measurements in self._spilled_measurements(number):
+                    bucket_rows, bucket_edges = self._aggregate(*labels, measurements)
+                    rows, edges = rows + bucket_rows, edges + bucket_edges
+                counts[labels[1]] = (rows, edges)
+        finally:
+            if self._spill_dir is not None:
+                shutil.rmtree(self._spill_dir, ignore_errors=True)
+            self._spill_dir = None
+            self._spilled.clear()
+            self._tables.clear()
+            self._rows = 0
+
+        counts = {label: count for label, count in counts.items() if count[0]}
+
+        print('#### Assay Summary ####')
+        for label, (rows, edges) in counts.items():
+            print(f'{label} - {rows} measurements in {edges} edges')
+
+        return counts
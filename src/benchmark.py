@@ -0,0 +1,580 @@
+# -*- coding: utf-8 -*-
+
+"""Benchmarks of the loaders on synthetic source files of increasing size
+
+For each size, the AMR person table, the ChEMBL, SPARK and DrugCentral dumps and
+the MIC table of mic-script.py are generated with that many rows, next to a
+PubChem cache holding all their compounds. The KG is then loaded in a child
+process pointed at the generated files with ``AMR_KG_DATA_DIR``, into a
+``MemoryWriter`` and optionally a Neo4j database. Wall time, peak RSS and rows
+per second of every pipeline stage and of the writes are stored as JSON, and
+compared with an earlier run given as baseline.
+"""
+
+import getopt
+import json
+import os
+import platform
+import runpy
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from constants import COMMIT_SIZE, DATA_DIR, PIPELINE_WORKERS
+from metrics import METRICS, peak_rss
+from pubchem import LookupCache
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Reference tables shipped with the repository, copied next to the generated files
+REFERENCE_DIR = os.path.join(SRC_DIR, os.pardir, 'data', 'AMR')
+REFERENCE_FILES = [
+    'institute.csv', 'project.csv', 'pathogen.csv', 'skill.csv', 'ontology.tsv'
+]
+
+BENCHMARK_SIZES = [1000, 10000, 100000]
+SLOWDOWN = 1.2  # Wall time ratio to the baseline reported as a regression
+
+# Strain spellings of the sources, mapped back to the pathogens by pathogens.py
+STRAIN_SUFFIXES = ['', ' (strain ATCC 25922)', ' O157:H7', ' subsp. benchmark']
+UNITS = ['ug.mL-1', 'ug/ml', 'nM', 'uM', 'mg/L']
+RELATIONS = ['=', '>', '<=', '>=']
+JOURNALS = [
+    'J Med Chem',
+    'Antimicrob Agents Chemother',
+    'Bioorg Med Chem Lett',
+    'Eur J Med Chem',
+]
+
+
+def _choice(rng: np.random.Generator, values: list, rows: int) -> np.ndarray:
+    return np.asarray(values, dtype=object)[rng.integers(0, len(values), rows)]
+
+
+def _numbers(rng: np.random.Generator, rows: int, decimal: str = '.') -> pd.Series:
+    """MIC-like positive numbers as text."""
+    values = pd.Series(np.round(rng.lognormal(1, 2, rows), 3)).astype(str)
+    return values.str.replace('.', decimal, regex=False) if decimal != '.' else values
+
+
+def _ids(prefix: str, numbers: np.ndarray) -> pd.Series:
+    return prefix + pd.Series(numbers).astype(str)
+
+
+def _missing(rng: np.random.Generator, values: pd.Series, fraction: float) -> pd.Series:
+    return values.where(rng.random(len(values)) >= fraction)
+
+
+def _strains(
+    rng: np.random.Generator, pathogens: list, rows: int, others: list = ()
+) -> np.ndarray:
+    """Pathogen names with strain suffixes, and some organisms the KG does not have."""
+    names = pd.Series(_choice(rng, pathogens, rows))
+    names += _choice(rng, STRAIN_SUFFIXES, rows)
+    if others:
+        names = names.where(rng.random(rows) >= 0.1, _choice(rng, others, rows))
+    return names.to_numpy()
+
+
+def generate_persons(
+    rng: np.random.Generator, rows: int, reference_dir: str = REFERENCE_DIR
+) -> pd.DataFrame:
+    """Persons referring to the ids of the reference tables, with test ORCIDs."""
+    counts = {
+        name: len(pd.read_csv(
+            os.path.join(reference_dir, f'{name}.csv'), encoding='ISO-8859-1'
+        ))
+        for name in ('institute', 'project', 'pathogen', 'skill')
+    }
+    numbers = np.arange(1, rows + 1)
+    contacts = 'Person ' + pd.Series(numbers).astype(str)
+
+    df = pd.DataFrame({
+        'id': numbers,
+        'contact': contacts,
+        'email': contacts.str.replace(' ', '.') + '@test.de',
+        'institute': rng.integers(1, counts['institute'] + 1, rows),
+        'orcid': 'https://orcid.org/0000-0002-7683-0452',
+    })
+    for column, name, missing in [
+        ('project_1', 'project', 0),
+        ('project_2', 'project', 0.5),
+        ('pathogen_1', 'pathogen', 0),
+        ('pathogen_2', 'pathogen', 0.3),
+        ('pathogen_3', 'pathogen', 0.6),
+        ('skill_1', 'skill', 0),
+        ('skill_2', 'skill', 0.2),
+        ('skill_3', 'skill', 0.5),
+        ('skill_4', 'skill', 0.8),
+    ]:
+        ids = pd.Series(rng.integers(1, counts[name] + 1, rows))
+        df[column] = _missing(rng, ids, missing).astype('Int64')
+
+    return df
+
+
+def _assay_ids(rng: np.random.Generator, rows: int) -> pd.Series:
+    """ChEMBL assay ids, one assay per 50 rows."""
+    return _ids('CHEMBL', rng.integers(1, max(rows // 50, 1) + 1, rows) + 10 ** 7)
+
+
+def generate_chembl(
+    rng: np.random.Generator, rows: int, pathogens: list
+) -> pd.DataFrame:
+    """ChEMBL MIC dump with a compound per 10 rows, some without a preferred name."""
+    compounds = rng.integers(1, max(rows // 10, 1) + 1, rows)
+    names = _missing(rng, 'COMPOUND ' + pd.Series(compounds).astype(str), 0.1)
+
+    return pd.DataFrame({
+        'pref_name': names,
+        'chembl_id': _ids('CHEMBL', compounds),
+        'standard_relation': _choice(rng, RELATIONS, rows),
+        'standard_value': _numbers(rng, rows),
+        'standard_units': _choice(rng, UNITS, rows),
+        'strain': _strains(
+            rng, pathogens, rows, others=['Unknown bug', 'Homo sapiens']
+        ),
+        'assay_id': _assay_ids(rng, rows),
+    })
+
+
+def generate_spark(
+    rng: np.random.Generator, rows: int, pathogens: list
+) -> pd.DataFrame:
+    """SPARK MIC data, sharing ChEMBL ids with the ChEMBL dump.
+
+    PubChem CIDs are stored as floats, as in the SPARK export. They and the ChEMBL
+    ids are missing per compound, so some compounds only have their SPARK id.
+    """
+    count = max(rows // 10, 1)
+    compounds = rng.integers(1, count + 1, rows)
+    no_pubchem = (rng.random(count + 1) < 0.3)[compounds]
+    no_chembl = (rng.random(count + 1) < 0.5)[compounds]
+
+    return pd.DataFrame({
+        'Compound Name': _ids('SPARK-', compounds),
+        'SMILES': pd.Series(compounds % 40 + 1).map(lambda length: 'C' * length) + 'O',
+        'Curated & Transformed MIC Data: Species': _strains(rng, pathogens, rows),
+        'Curated & Transformed MIC Data: MIC (in microM) (microM)': _numbers(rng, rows),
+        'Curated & Transformed MIC Data: DOI': _ids(
+            '10.1000/benchmark.', compounds % 1000
+        ),
+        'PubMed ID': _ids('', compounds % 1000 + 10 ** 7),
+        'pubchem': (_ids('', compounds + 5 * 10 ** 6) + '.0').where(~no_pubchem),
+        'chembl': _ids('CHEMBL', compounds).where(~no_chembl),
+    })
+
+
+def generate_drug_central(
+    rng: np.random.Generator, rows: int, pathogens: list
+) -> pd.DataFrame:
+    """DrugCentral activities of a drug per 5 rows, some on organisms not in the KG."""
+    drugs = rng.integers(1, max(rows // 5, 1) + 1, rows)
+
+    return pd.DataFrame({
+        'DRUG_NAME': _ids('drug', drugs),
+        'STRUCT_ID': _ids('', drugs),
+        'ACT_VALUE': _numbers(rng, rows),
+        'ACT_UNIT': _choice(rng, ['uM', 'nM', 'ug/ml'], rows),
+        'ACT_TYPE': _choice(rng, ['MIC', 'IC50', 'Ki'], rows),
+        'ACT_SOURCE_URL': _ids('https://doi.org/10.1000/drug.', drugs % 1000),
+        'ORGANISM': _strains(rng, pathogens, rows, others=['Homo sapiens']),
+    })
+
+
+def generate_mic(rng: np.random.Generator, rows: int, pathogens: list) -> pd.DataFrame:
+    """MIC table of mic-script.py.
+
+    Numbers have comma decimals and relations are quoted, as exported by ChEMBL.
+    """
+    compounds = rng.integers(1, max(rows // 10, 1) + 1, rows)
+    chembl_ids = _ids('CHEMBL', compounds)
+    weights = pd.Series(np.round(200 + compounds % 600 + 0.25, 2)).astype(str)
+
+    return pd.DataFrame({
+        'strain': _strains(rng, pathogens, rows),
+        'Molecule ChEMBL ID': chembl_ids,
+        'NAME': chembl_ids,
+        'Molecular Weight': weights.str.replace('.', ','),
+        'Standard Relation': "'" + pd.Series(_choice(rng, RELATIONS, rows)) + "'",
+        'Standard Value': _numbers(rng, rows, decimal=','),
+        'Standard Units': _choice(rng, ['nM', 'ug.mL-1'], rows),
+        'pIC50': pd.Series(
+            np.round(rng.uniform(4, 9, rows), 1)
+        ).astype(str).str.replace('.', ','),
+        'Assay ChEMBL ID': _assay_ids(rng, rows),
+        'Document Journal': _missing(rng, pd.Series(_choice(rng, JOURNALS, rows)), 0.2),
+        'Document Year': _missing(
+            rng, pd.Series(rng.integers(1990, 2023, rows)).astype(str), 0.1
+        ),
+    })
+
+
+def seed_pubchem(
+    cache_path: str, spark_df: pd.DataFrame, drug_central_df: pd.DataFrame
+):
+    """Cache a compound for every CID and a CID for two in three drug names.
+
+    Loads of the generated files can then run offline.
+    """
+    cids = spark_df['pubchem'].dropna().str.split('.').str[0].unique().tolist()
+
+    names = drug_central_df['DRUG_NAME'].unique().tolist()
+    found = {
+        name: [6 * 10 ** 6 + number]
+        for number, name in enumerate(names)
+        if number % 3
+    }
+    cids += [str(cid) for cid, in found.values()]
+
+    cache = LookupCache(path=cache_path)
+    cache.set_many('cid', (
+        (
+            cid,
+            {'cid': int(cid), 'synonym': f'synonym {cid}', 'iupac_name': f'iupac {cid}'}
+        )
+        for cid in cids
+    ))
+    cache.set_many('name', ((name, found.get(name)) for name in names))
+    cache.close()
+
+
+def generate(data_dir: str, rows: int, seed: int = 0) -> dict:
+    """Write the synthetic source files with ``rows`` rows each to ``data_dir``.
+
+    Returns the row counts of the files.
+    """
+    rng = np.random.default_rng(seed)
+    pathogens = pd.read_csv(os.path.join(REFERENCE_DIR, 'pathogen.csv'), dtype=str)
+    pathogens = pathogens['pathogen'].dropna().tolist()
+
+    os.makedirs(os.path.join(data_dir, 'AMR'), exist_ok=True)
+    for file_name in REFERENCE_FILES:
+        if os.path.exists(os.path.join(REFERENCE_DIR, file_name)):
+            shutil.copy(
+                os.path.join(REFERENCE_DIR, file_name),
+                os.path.join(data_dir, 'AMR', file_name)
+            )
+
+    tables = {
+        'AMR/person.csv': (generate_persons(rng, rows), ','),
+        'MIC/data_dump_31.tsv': (generate_chembl(rng, rows, pathogens), '\t'),
+        'SPARK/processed_mic_data.tsv': (generate_spark(rng, rows, pathogens), '\t'),
+        'drug_central/drug.target.interaction.tsv': (
+            generate_drug_central(rng, rows, pathogens), '\t'
+        ),
+        'MIC/mic-data.tsv': (generate_mic(rng, rows, pathogens), '\t'),
+    }
+    for file_name, (df, sep) in tables.items():
+        os.makedirs(os.path.dirname(os.path.join(data_dir, file_name)), exist_ok=True)
+        df.to_csv(os.path.join(data_dir, file_name), sep=sep, index=False)
+
+    seed_pubchem(
+        os.path.join(data_dir, 'cache', 'pubchem.sqlite'),
+        spark_df=tables['SPARK/processed_mic_data.tsv'][0],
+        drug_central_df=tables['drug_central/drug.target.interaction.tsv'][0]
+    )
+
+    return {file_name: len(df) for file_name, (df, _) in tables.items()}
+
+
+def _rows(result) -> int:
+    """Rows produced by a stage, as the length of tables, registries and collectors."""
+    if isinstance(result, tuple):
+        return max((_rows(part) for part in result), default=0)
+    try:
+        return len(result)
+    except TypeError:
+        return 0
+
+
+def _rate(rows: int, seconds: float) -> float:
+    return rows / seconds if seconds else None
+
+
+def run_load(db_name: str = None, workers: int = PIPELINE_WORKERS) -> dict:
+    """Load the KG from ``DATA_DIR`` and measure every stage.
+
+    The KG is loaded into memory, or into ``db_name`` replacing it.
+    """
+    from amr import load
+    from memory import MemoryWriter
+    from writer import BoltWriter
+
+    if db_name:
+        from connection import populate_db
+        from schema import KG_SCHEMA
+        tx = populate_db(db_name=db_name, replace=True, schema=KG_SCHEMA)
+        writer = BoltWriter(tx, commit_size=COMMIT_SIZE)
+    else:
+        writer = MemoryWriter()
+
+    start = time.time()
+    pipeline = load(writer, offline=True, workers=workers)
+    wall_time = time.time() - start
+
+    writes = writer.report()
+    pipeline.report()
+
+    stages = {}
+    for name, (stage_start, stage_end) in pipeline.timings.items():
+        rows = _rows(pipeline.results.get(name))
+        stages[name] = {
+            'seconds': stage_end - stage_start,
+            'rows': rows,
+            'rows_per_second': _rate(rows, stage_end - stage_start),
+            'peak_rss_mb': pipeline.peaks[name],
+        }
+
+    rows = sum(write['rows'] for write in writes.values())
+    return {
+        'wall_time': wall_time,
+        'peak_rss_mb': peak_rss(),
+        'rows': rows,
+        'rows_per_second': _rate(rows, wall_time),
+        'stages': stages,
+        'writes': writes,
+        'metrics': METRICS.snapshot(),
+    }
+
+
+def run_mic_script(db_name: str) -> dict:
+    """Load the MIC table of ``DATA_DIR`` with mic-script.py into ``db_name``."""
+    script = runpy.run_path(os.path.join(SRC_DIR, 'mic-script.py'))
+    mic_path = os.path.join(DATA_DIR, 'MIC', 'mic-data.tsv')
+    rows = len(pd.read_csv(mic_path, sep='\t', usecols=['strain']))
+
+    start = time.time()
+    script['main'](['-d', db_name])
+    wall_time = time.time() - start
+
+    return {
+        'wall_time': wall_time,
+        'peak_rss_mb': peak_rss(),
+        'rows': rows,
+        'rows_per_second': _rate(rows, wall_time),
+        'stages': {},
+        'writes': {},
+        'metrics': METRICS.snapshot(),
+    }
+
+
+def _run_child(data_dir: str, target: str, db_name: str, workers: int) -> dict:
+    """Run one target in a fresh process reading ``data_dir``, for its own peak RSS."""
+    result_path = os.path.join(data_dir, f'{target}.json')
+    with open(os.path.join(data_dir, f'{target}.log'), 'w') as log:
+        process = subprocess.run(
+            [
+                sys.executable, os.path.abspath(__file__), '--child', target,
+                '-j', str(workers), '-o', result_path,
+            ]
+            + (['-d', db_name] if db_name else []),
+            env={**os.environ, 'AMR_KG_DATA_DIR': data_dir},
+            stdout=log,
+            stderr=subprocess.STDOUT,
+        )
+
+    if process.returncode:
+        return {'error': f'exit code {process.returncode}, see {log.name}'}
+
+    with open(result_path) as file:
+        return json.load(file)
+
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=SRC_DIR,
+            capture_output=True,
+            text=True
+        ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run_benchmarks(
+    sizes: list = BENCHMARK_SIZES,
+    db_name: str = None,
+    workers: int = PIPELINE_WORKERS,
+    work_dir: str = None,
+    keep: bool = False
+) -> dict:
+    """Generate the sources of each size and load them.
+
+    Each size is loaded into memory, and into ``db_name`` if given.
+    """
+    work_dir = work_dir or tempfile.mkdtemp(prefix='amr-kg-benchmark-')
+    targets = ['memory'] + (['neo4j', 'mic'] if db_name else [])
+
+    results = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'workers': workers,
+        'runs': [],
+    }
+
+    try:
+        for size in sizes:
+            data_dir = os.path.join(work_dir, str(size)) + os.sep
+
+            start = time.time()
+            files = generate(data_dir, size)
+            print(f'Generated {size} rows per source in {time.time() - start:.2f}s')
+
+            for target in targets:
+                run = {
+                    'target': target,
+                    'size': size,
+                    'files': files,
+                    **_run_child(data_dir, target, db_name, workers),
+                }
+                results['runs'].append(run)
+
+                if 'error' in run:
+                    print(f'{target} - {size} rows failed: {run["error"]}')
+                else:
+                    print(
+                        f'{target} - {size} rows in {run["wall_time"]:.2f}s '
+                        f'({run["peak_rss_mb"]:.0f} MB peak, '
+                        f'{run["rows_per_second"] or 0:.0f} rows/s)'
+                    )
+    finally:
+        if not keep:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    return results
+
+
+def compare(results: dict, baseline: dict, slowdown: float = SLOWDOWN) -> list:
+    """Print wall times against the same target and size of ``baseline``.
+
+    Returns the slower ones.
+    """
+    previous = {
+        (run['target'], run['size']): run
+        for run in baseline['runs']
+        if 'error' not in run
+    }
+    regressions = []
+
+    baseline_name = baseline.get("commit") or baseline.get("created")
+    print(f'#### Compared with {baseline_name} ####')
+    for run in results['runs']:
+        base = previous.get((run['target'], run['size']))
+        if base is None or 'error' in run:
+            continue
+
+        timings = [('total', run['wall_time'], base['wall_time'])]
+        timings += [
+            (name, stage['seconds'], base['stages'][name]['seconds'])
+            for name, stage in run['stages'].items()
+            if name in base['stages']
+        ]
+        for name, seconds, base_seconds in timings:
+            ratio = seconds / base_seconds if base_seconds else 1.0
+            slower = ratio > slowdown and seconds - base_seconds > 0.1
+            if slower:
+                regressions.append((run['target'], run['size'], name, ratio))
+
+            print(
+                f'{run["target"]} {run["size"]} {name} - '
+                f'{seconds:.2f}s vs {base_seconds:.2f}s '
+                f'({ratio:.2f}x){" <- slower" if slower else ""}'
+            )
+
+    return regressions
+
+
+def main(argv):
+    sizes = BENCHMARK_SIZES
+    db_name = None
+    workers = PIPELINE_WORKERS
+    output_path = None
+    baseline_path = None
+    work_dir = None
+    keep = False
+    child = None
+    usage = (
+        "benchmark [-s <sizes, e.g. 1000,10000>] [-d <neo4j dbname>] [-j <workers>] "
+        "[-o <results json>] [-b <baseline json>] [-w <work dir>] [-k]"
+    )
+
+    try:
+        opts, args = getopt.getopt(
+            argv,
+            "hs:d:j:o:b:w:k",
+            [
+                "sizes=", "db=", "jobs=", "output=", "baseline=", "work-dir=", "keep",
+                "child=",
+            ]
+        )
+    except getopt.GetoptError:
+        print(usage)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == "-h":
+            print(usage)
+            sys.exit()
+        elif opt in ("-s", "--sizes"):
+            # Rows per source file, 1k to 10M
+            sizes = [int(size) for size in arg.split(',')]
+        elif opt in ("-d", "--db"):
+            # Also load into this Neo4j database, replacing it, and run mic-script.py
+            db_name = arg
+        elif opt in ("-j", "--jobs"):
+            workers = int(arg)
+        elif opt in ("-o", "--output"):
+            output_path = arg
+        elif opt in ("-b", "--baseline"):
+            # Earlier results to compare the wall times with
+            baseline_path = arg
+        elif opt in ("-w", "--work-dir"):
+            work_dir = arg
+        elif opt in ("-k", "--keep"):
+            # Keep the generated files
+            keep = True
+        elif opt == "--child":
+            # Run one target on AMR_KG_DATA_DIR, used by run_benchmarks
+            child = arg
+
+    if child:
+        if child == 'mic':
+            result = run_mic_script(db_name)
+        else:
+            result = run_load(db_name=db_name, workers=workers)
+        with open(output_path, 'w') as file:
+            json.dump(result, file)
+        return
+
+    results = run_benchmarks(
+        sizes=sizes, db_name=db_name, workers=workers, work_dir=work_dir, keep=keep
+    )
+
+    output_path = output_path or os.path.join(
+        os.path.expanduser(DATA_DIR),
+        'benchmarks',
+        time.strftime('%Y%m%d-%H%M%S') + '.json'
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+    with open(output_path, 'w') as file:
+        json.dump(results, file, indent=2)
+    print(f'Results written to {output_path}')
+
+    if baseline_path:
+        with open(baseline_path) as file:
+            regressions = compare(results, json.load(file))
+
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+"""On-disk record of committed batches, to resume a failed load"""
+
+import json
+import os
+import uuid
+from collections import defaultdict
+
+
+class CheckpointMismatch(ValueError):
+    """Raised when a checkpoint does not belong to the load being resumed."""
+
+
+class Checkpoint:
+    """Append-only log of the batches committed by a writer.
+
+    The first line holds the hashes of the source files and the generation of
+    the load, which a resumed load keeps. Each following line is
+    one committed batch: the node label or relationship group, the number of rows,
+    the running row offset of that group and, for nodes, the keys and backend ids
+    of the written nodes so later relationships can refer to them. Lines are only
+    appended once their transaction is committed.
+    """
+
+    def __init__(self, path: str, sources: dict):
+        self.path = os.path.expanduser(path)
+        self.sources = sources
+        self.generation = uuid.uuid4().hex
+        self._offsets = defaultdict(int)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def load(self) -> tuple:
+        """Return the committed nodes and relationships.
+
+        Nodes are ``(key, id)`` lists by label, relationships are row counts by group.
+        """
+        nodes = defaultdict(list)
+        relationships = defaultdict(int)
+
+        with open(self.path) as file:
+            header = json.loads(next(file))
+            if header['sources'] != self.sources:
+                raise CheckpointMismatch(
+                    f'Source files changed since {self.path} was written'
+                )
+            self.generation = header.get('generation', self.generation)
+
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Line cut off by a crash, its batch was not committed
+                    break
+
+                if entry['kind'] == 'nodes':
+                    nodes[entry['group']].extend(zip(entry['keys'], entry['ids']))
+                    self._offsets[entry['group']] = entry['offset']
+                else:
+                    group = tuple(entry['group'])
+                    relationships[group] += entry['rows']
+                    self._offsets[group] = entry['offset']
+
+        return nodes, relationships
+
+    def start(self):
+        """Begin a new log, replacing any previous one."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'w') as file:
+            header = {'sources': self.sources, 'generation': self.generation}
+            file.write(json.dumps(header) + '\n')
+        self._offsets.clear()
+
+    def record(self, batches: list):
+        """Append committed ``(kind, group, keys, ids, rows)`` batches."""
+        lines = []
+        for kind, group, keys, ids, rows in batches:
+            self._offsets[group] += rows
+            entry = {
+                'kind': kind,
+                'group': group,
+                'rows': rows,
+                'offset': self._offsets[group],
+            }
+            if kind == 'nodes':
+                entry.update(last_key=keys[-1] if keys else None, keys=keys, ids=ids)
+            lines.append(json.dumps(entry) + '\n')
+
+        with open(self.path, 'a') as file:
+            file.writelines(lines)
+            file.flush()
+            os.fsync(file.fileno())
+
+    def remove(self):
+        """Delete the log once the load is complete."""
+        if self.exists():
+            os.remove(self.path)
@@ -1,46 +1,131 @@
 # -*- coding: utf-8 -*-
 
 import logging
+import threading
 
 from py2neo import Graph, SystemGraph
 
-from constants import ADMIN_NAME, ADMIN_PASS, URL
+from constants import ADMIN_NAME, ADMIN_PASS, POOL_SIZE, URL
+from schema import provision_schema
 
 logger = logging.getLogger()
 logging.basicConfig(level=logging.INFO)
 
-system_graph = SystemGraph(URL, auth=(ADMIN_NAME, ADMIN_PASS))
+
+class ConnectionManager:
+    """Shared handles to the Neo4j server, opened on first use.
+
+    Each database gets one :class:`Graph` with a pool of up to ``pool_size``
+    connections, reused by all loaders and exports. Handles are thread-safe, but
+    each thread should begin its own transaction. The list of databases is read
+    once and kept up to date by :meth:`create_database`.
+    """
+
+    def __init__(
+        self,
+        url: str = URL,
+        auth: tuple = (ADMIN_NAME, ADMIN_PASS),
+        pool_size: int = POOL_SIZE,
+    ):
+        self.url = url
+        self.auth = auth
+        self.pool_size = pool_size
+        self._system = None
+        self._graphs = {}
+        self._databases = None
+        self._lock = threading.RLock()
+
+    @property
+    def system(self) -> SystemGraph:
+        """Handle to the system database."""
+        with self._lock:
+            if self._system is None:
+                self._system = SystemGraph(
+                    self.url, auth=self.auth, max_size=self.pool_size
+                )
+            return self._system
+
+    def graph(self, db_name: str) -> Graph:
+        """Handle to ``db_name``, without checking that it exists."""
+        with self._lock:
+            if db_name not in self._graphs:
+                self._graphs[db_name] = Graph(
+                    self.url, auth=self.auth, name=db_name, max_size=self.pool_size
+                )
+            return self._graphs[db_name]
+
+    def databases(self) -> set:
+        """Names of the databases on the server, read on the first call."""
+        with self._lock:
+            if self._databases is None:
+                databases = self.system.run("""SHOW DATABASES""").data()
+                self._databases = {info["name"] for info in databases}
+            return self._databases
+
+    def create_database(self, db_name: str):
+        """Create ``db_name``, replacing any existing database of that name."""
+        with self._lock:
+            self.system.run("""CREATE OR REPLACE DATABASE {}""".format(db_name))
+            self.databases().add(db_name)
+
+            # Connections to the replaced database are stale
+            self._graphs.pop(db_name, None)
+
+        logger.info(f"Created {db_name} in Neo4J!")
+
+    def close(self):
+        """Close all pooled connections, they are reopened on next use."""
+        with self._lock:
+            for graph in [self._system, *self._graphs.values()]:
+                if graph is not None:
+                    graph.service.connector.close()
+            self._system = None
+            self._graphs.clear()
+            self._databases = None
+
+
+connections = ConnectionManager()
+
+
+def get_system_graph() -> SystemGraph:
+    """Connect to the system database on first use."""
+    return connections.system
+
+
+def get_graph(db_name: str) -> Graph:
+    """Shared handle to a database, for loaders and exports."""
+    return connections.graph(db_name)
 
 
 def create_new_db(db_name: str):
     """Create a new DB table"""
-
-    system_graph.run("""CREATE OR REPLACE DATABASE {}""".format(db_name))
-
-    logger.info(f"Created {db_name} in Neo4J!")
+    connections.create_database(db_name)
 
 
 def check_database(db_name: str) -> bool:
-    database_info = system_graph.run("""SHOW DATABASES""").data()
+    return db_name in connections.databases()
 
-    for info in database_info:
-        if info["name"] == db_name:
-            return True
-    return False
 
+def populate_db(
+    db_name: str,
+    unique: bool = False,
+    replace: bool = False,
+    schema: dict = None
+):
+    """Return a transaction on the database, created if missing or with ``replace``.
 
-def populate_db(db_name: str):
+    ``schema`` holds the keyword arguments of :func:`schema.provision_schema` for
+    the labels the caller loads, e.g. ``schema.KG_SCHEMA``. Its constraints and
+    indexes are provisioned first, uniqueness constraints on the node keys if
+    ``unique`` is set. Without it the schema of the database is left as is.
+    """
 
-    in_db = check_database(db_name)
-
-    if not in_db:
+    if replace or not check_database(db_name):
         create_new_db(db_name)
-        in_db = check_database(db_name)  # to update the database
-
-    assert in_db is True
 
-    conn = Graph(URL, auth=(ADMIN_NAME, ADMIN_PASS), name=db_name)
+    conn = get_graph(db_name)
+    if schema is not None:
+        provision_schema(conn, unique=unique, **schema)
 
     tx = conn.begin()
     return tx
-
@@ -1,39 +1,172 @@
 # -*- coding: utf-8 -*-
 
-# Data paths
-DATA_DIR = "~/data/"
+import os
+
+# Data paths, AMR_KG_DATA_DIR points the loaders at another copy such as the
+# benchmark data
+DATA_DIR = os.environ.get("AMR_KG_DATA_DIR", "~/data/")
 
 # Neo4J connectors
 ADMIN_NAME = "neo4j"
 ADMIN_PASS = "neo4jbinder"
 URL = "bolt://localhost:7687"
+POOL_SIZE = 8  # Bolt connections kept open per database
 ENCODING = 'ISO-8859-1'
 ENGINE = "python"
 
-# DrugCentral pathogen mapper
+# Key property of each label, used to MERGE nodes in incremental loads
+NODE_KEYS = {
+    'Person': 'email',
+    'Institute': 'name',
+    'Skill': 'name',
+    'Pathogen': 'curie',
+    'Project': 'curie',
+    'ChEMBL': 'curie',
+    'SPARK': 'curie',
+    'PubChem': 'curie',
+    'DrugCentral': 'curie',
+}
+
+# Properties looked up by name or id, indexed next to the key properties above
+NODE_INDEXES = {
+    'Person': ['name', 'orcid'],
+    'Pathogen': ['name'],
+    'Project': ['name'],
+    'ChEMBL': ['name'],
+    'PubChem': ['name'],
+    'DrugCentral': ['name'],
+}
+
+# Properties searched by substring, given a text index from Neo4j 4.4 on
+TEXT_INDEXES = {
+    'ChEMBL': ['name'],
+    'PubChem': ['name'],
+    'DrugCentral': ['name'],
+}
+
+SCHEMA_TIMEOUT = 300  # seconds to wait for new indexes to come online
+
+# Files of each data source, relative to DATA_DIR, hashed to detect changes
+SOURCE_FILES = {
+    'AMR': [
+        'AMR/person.csv',
+        'AMR/institute.csv',
+        'AMR/project.csv',
+        'AMR/pathogen.csv',
+        'AMR/skill.csv',
+    ],
+    'ChEMBL': ['MIC/data_dump_31.tsv'],
+    'SPARK': ['SPARK/processed_mic_data.tsv'],
+    'DrugCentral': ['drug_central/drug.target.interaction.tsv'],
+}
+
+# Sources the nodes of each label are built from, the AMR pathogens filter all chemicals
+LABEL_SOURCES = {
+    'Person': {'AMR'},
+    'Institute': {'AMR'},
+    'Skill': {'AMR'},
+    'Pathogen': {'AMR'},
+    'Project': {'AMR'},
+    # Compounds are resolved across sources, see identity.py
+    'ChEMBL': {'AMR', 'ChEMBL', 'SPARK', 'DrugCentral'},
+    'SPARK': {'AMR', 'ChEMBL', 'SPARK', 'DrugCentral'},
+    'PubChem': {'AMR', 'ChEMBL', 'SPARK', 'DrugCentral'},
+    'DrugCentral': {'AMR', 'ChEMBL', 'SPARK', 'DrugCentral'},
+}
+
+# Sources the relationships of each type are built from
+RELATIONSHIP_SOURCES = {
+    'WORKS_AT': {'AMR'},
+    'IS_INVOLVED_IN': {'AMR'},
+    'SUPERVISES': {'AMR'},
+    'HAS_SKILL': {'AMR'},
+    'WORKS_WITH': {'AMR'},
+    'INCLUDES': {'AMR'},
+    # The measurements of all sources are aggregated into one edge, see assays.py
+    'ASSAY IN': {'AMR', 'ChEMBL', 'SPARK', 'DrugCentral'},
+}
+
+# PubChem lookup cache
+PUBCHEM_CACHE = DATA_DIR + "cache/pubchem.sqlite"
+PUBCHEM_CACHE_TTL = 90 * 24 * 3600  # seconds
+PUBCHEM_NEGATIVE_TTL = 7 * 24 * 3600  # seconds, for identifiers not found in PubChem
+
+# PubChem PUG REST access, see https://pubchem.ncbi.nlm.nih.gov/docs/programmatic-access
+PUBCHEM_URL = "https://pubchem.ncbi.nlm.nih.gov/rest/pug"
+PUBCHEM_RATE = 5  # requests per second allowed by PubChem
+PUBCHEM_WORKERS = 4
+PUBCHEM_BATCH_SIZE = 100  # CIDs per request
+PUBCHEM_RETRIES = 3
+
+# Number of rows sent per UNWIND query by the bulk writer
+BATCH_SIZE = 10000
+
+# Number of rows written per transaction, each commit is checkpointed to resume
+# failed loads
+COMMIT_SIZE = 100000
+
+# Number of rows read at a time from the ChEMBL MIC dump
+CHUNK_SIZE = 200000
+
+# ASSAY IN measurements kept in memory before they are spilled to disk, split into
+# buckets of pathogen and compound pairs that are aggregated one at a time
+ASSAY_SPILL_ROWS = 1000000
+ASSAY_BUCKETS = 64
+
+# Worker processes running the independent stages of a load, see pipeline.py
+PIPELINE_WORKERS = 4
+
+# Relationships read per query by the triple export, and base IRI of its N-Triples
+EXPORT_PAGE_SIZE = 10000
+EXPORT_IRI = "urn:amr-kg:"
+
+# Namespaces the curie prefixes of the KG expand to in the RDF serialization, see rdf.py
+RDF_PREFIXES = {
+    'chembl': 'https://identifiers.org/chembl.compound:',
+    'pubchem': 'https://identifiers.org/pubchem.compound:',
+    'ncbitaxon': 'http://purl.obolibrary.org/obo/NCBITaxon_',
+    'drug.central': 'https://identifiers.org/drugcentral:',
+    'spark': EXPORT_IRI + 'spark:',
+    'imi': EXPORT_IRI + 'imi:',
+}
+RDF_SHARD_SIZE = 1000000  # triples per RDF file
+
+# Parquet copies of the source files, see staging.py
+STAGING_DIR = DATA_DIR + "staging/"
+
+# Curated strain names of the sources and their pathogen, aliases in the pathogen
+# index of pathogens.py
 PATHOGEN_MAPPER = {
     'Escherichia coli': 'Escherichia coli',
     'Escherichia coli (strain K12)': 'Escherichia coli',
     'Helicobacter pylori (strain ATCC 700392 / 26695)': 'Helicobacter pylori',
-    'Mycobacterium tuberculosis (strain ATCC 25618 / H37Rv)': 'Mycobacterium tuberculosis',
-    'Pseudomonas aeruginosa (strain ATCC 15692 / DSM 22644 / CIP 104116 / JCM 14847 / LMG 12228 / 1C / PRS 101 / PAO1)': 'Pseudomonas aeruginosa',
+    'Mycobacterium tuberculosis (strain ATCC 25618 / H37Rv)':
+        'Mycobacterium tuberculosis',
+    (
+        'Pseudomonas aeruginosa (strain ATCC 15692 / DSM 22644 / CIP 104116 / '
+        'JCM 14847 / LMG 12228 / 1C / PRS 101 / PAO1)'
+    ): 'Pseudomonas aeruginosa',
     'Helicobacter pylori': 'Helicobacter pylori',
     'Pseudomonas aeruginosa': 'Pseudomonas aeruginosa',
     'Shigella dysenteriae': 'Shigella sp.',
     'Plasmodium falciparum': 'Plasmodium falciparum',
-    'Pseudomonas aeruginosa (strain ATCC 15692 / PAO1 / 1C / PRS 101 / LMG 12228)': 'Pseudomonas aeruginosa',
+    'Pseudomonas aeruginosa (strain ATCC 15692 / PAO1 / 1C / PRS 101 / LMG 12228)':
+        'Pseudomonas aeruginosa',
     'Klebsiella pneumoniae': 'Klebsiella pneumoniae',
     'Acinetobacter baumannii': 'Acinetobacter baumannii',
     'Plasmodium falciparum (isolate 3D7)': 'Plasmodium falciparum',
     'Salmonella typhi': 'Salmonella',
-    'Haemophilus influenzae (strain ATCC 51907 / DSM 11121 / KW20 / Rd)': 'Haemophilus influenzae',
+    'Haemophilus influenzae (strain ATCC 51907 / DSM 11121 / KW20 / Rd)':
+        'Haemophilus influenzae',
     'Streptococcus pyogenes serotype M1': 'Streptococcus pyogenes',
     'Haemophilus influenzae': 'Haemophilus influenzae',
     'Streptococcus pyogenes': 'Streptococcus pyogenes',
     'Streptococcus pyogenes serotype M4 (strain MGAS10750)': 'Streptococcus pyogenes',
-    'Mycobacterium tuberculosis (strain CDC 1551 / Oshkosh)': 'Mycobacterium tuberculosis',
+    'Mycobacterium tuberculosis (strain CDC 1551 / Oshkosh)':
+        'Mycobacterium tuberculosis',
     'Neisseria gonorrhoeae': 'Neisseria gonorrhoeae',
-    'Streptococcus pneumoniae serotype 4 (strain ATCC BAA-334 / TIGR4)': 'Streptococcus pneumoniae',
+    'Streptococcus pneumoniae serotype 4 (strain ATCC BAA-334 / TIGR4)':
+        'Streptococcus pneumoniae',
     'Escherichia coli O157:H7': 'Escherichia coli',
     'Streptococcus pneumoniae': 'Streptococcus pneumoniae',
     'Enterococcus faecium': 'Enterococcus faecium',
@@ -44,7 +177,11 @@ PATHOGEN_MAPPER = {
     'Helicobacter pylori (strain HPAG1)': 'Helicobacter pylori',
     'Staphylococcus aureus (strain MRSA252)': 'Staphylococcus aureus',
     'Clostridioides difficile': 'Clostridium difficile',
-    'Klebsiella pneumoniae subsp. pneumoniae (strain ATCC 700721 / MGH 78578)': 'Klebsiella pneumoniae',
+    'Klebsiella pneumoniae subsp. pneumoniae (strain ATCC 700721 / MGH 78578)':
+        'Klebsiella pneumoniae',
     'Escherichia coli DEC1B': 'Escherichia coli',
-    'Acinetobacter baumannii (strain ATCC 19606 / DSM 30007 / CIP 70.34 / JCM 6841 / NBRC 109757 / NCIMB 12457 / NCTC 12156 / 81)': 'Acinetobacter baumannii'
+    (
+        'Acinetobacter baumannii (strain ATCC 19606 / DSM 30007 / CIP 70.34 / '
+        'JCM 6841 / NBRC 109757 / NCIMB 12457 / NCTC 12156 / 81)'
+    ): 'Acinetobacter baumannii'
 }
@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+
+"""Streaming export of the KG triples to TSV, N-Triples or Parquet"""
+
+import csv
+import datetime
+import getopt
+import gzip
+import os
+import sys
+from urllib.parse import quote
+
+from py2neo import Graph
+
+from connection import get_graph
+from constants import DATA_DIR, EXPORT_IRI, EXPORT_PAGE_SIZE
+from rdf import curie_iri, relation_iri
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export disabled
+    pa = None
+
+COLUMNS = ['n.name', 'n.curie', 'type(r)', 'm.name', 'm.curie']
+
+FORMATS = {
+    'tsv': '.tsv',
+    'nt': '.nt',
+    'parquet': '.parquet',
+}
+
+
+def iter_triples(graph: Graph, page_size: int = EXPORT_PAGE_SIZE):
+    """Yield pages of ``(n.name, n.curie, type(r), m.name, m.curie)`` rows.
+
+    Each relationship is yielded once, read in its direction, by ranges of internal
+    ids looked up with an id seek, so each query touches at most ``page_size``
+    relationships.
+    """
+    max_id = graph.run('MATCH ()-[r]->() RETURN max(id(r)) AS max_id').evaluate()
+    if max_id is None:
+        return
+
+    for start in range(0, max_id + 1, page_size):
+        rows = graph.run(
+            """
+            MATCH (n)-[r]->(m)
+            WHERE id(r) IN $ids
+            RETURN n.name, n.curie, type(r), m.name, m.curie
+            """,
+            ids=list(range(start, min(start + page_size, max_id + 1)))
+        ).data()
+
+        if rows:
+            yield [tuple(row[column] for column in COLUMNS) for row in rows]
+
+
+def _open(path: str, compress: bool):
+    if compress:
+        return gzip.open(path, 'wt', encoding='utf-8', newline='')
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+def write_tsv(pages, path: str, compress: bool = False) -> int:
+    """Write pages of rows to a TSV file with a header, returning the number of rows."""
+    count = 0
+    with _open(path, compress) as file:
+        writer = csv.writer(file, delimiter='\t', lineterminator='\n')
+        writer.writerow(COLUMNS)
+        for rows in pages:
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+
+def _iri(curie, name) -> str:
+    """IRI of a node, from its curie as in rdf.py, or else under ``EXPORT_IRI``."""
+    iri = curie_iri(curie) if curie is not None else None
+    if iri is None:
+        key = curie if curie is not None else name
+        iri = f'{EXPORT_IRI}{quote(str(key), safe=":")}'
+    return f'<{iri}>'
+
+
+def write_ntriples(pages, path: str, compress: bool = False) -> int:
+    """Write pages of rows as N-Triples, returning the number of triples."""
+    count = 0
+    with _open(path, compress) as file:
+        for rows in pages:
+            file.writelines(
+                f'{_iri(start_curie, start_name)} <{relation_iri(rel_type)}> '
+                f'{_iri(end_curie, end_name)} .\n'
+                for start_name, start_curie, rel_type, end_name, end_curie in rows
+            )
+            count += len(rows)
+    return count
+
+
+def write_parquet(pages, path: str, compress: bool = False) -> int:
+    """Write each page of rows as a Parquet row group, returning the number of rows."""
+    if pa is None:
+        raise ImportError('pyarrow is required for the Parquet export')
+
+    schema = pa.schema([(column, pa.string()) for column in COLUMNS])
+    count = 0
+    compression = 'gzip' if compress else 'snappy'
+    with pq.ParquetWriter(path, schema, compression=compression) as writer:
+        for rows in pages:
+            columns = [
+                [None if value is None else str(value) for value in column]
+                for column in zip(*rows)
+            ]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+            count += len(rows)
+    return count
+
+
+WRITERS = {
+    'tsv': write_tsv,
+    'nt': write_ntriples,
+    'parquet': write_parquet,
+}
+
+
+def export_triples(
+    graph: Graph,
+    output_dir: str = os.path.join(DATA_DIR, 'dump'),
+    fmt: str = 'tsv',
+    compress: bool = False,
+    page_size: int = EXPORT_PAGE_SIZE
+) -> str:
+    """Export the triples of the graph page by page, returning the path of the file.
+
+    Memory use depends on ``page_size`` only. With ``compress`` the TSV and
+    N-Triples files are gzipped and Parquet uses its gzip codec.
+    """
+    date = datetime.date.today().strftime('%d_%b_%Y')
+    output_dir = os.path.expanduser(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    path = os.path.join(output_dir, f'base_triples-{date}{FORMATS[fmt]}')
+    if compress and fmt != 'parquet':
+        path += '.gz'
+
+    pages = iter_triples(graph, page_size=page_size)
+    count = WRITERS[fmt](pages, path, compress=compress)
+    print(f'Exported {count} triples to {path}')
+    return path
+
+
+def main(argv):
+    db_name = "amr"
+    output_dir = os.path.join(DATA_DIR, 'dump')
+    fmt = 'tsv'
+    compress = False
+    usage = "export -d <dbname> [-o <output dir>] [-f tsv|nt|parquet] [-z]"
+
+    try:
+        opts, args = getopt.getopt(
+            argv, "hd:o:f:z", ["db=", "output=", "format=", "gzip"]
+        )
+    except getopt.GetoptError:
+        print(usage)
+        sys.exit(2)
+    for opt, arg in opts:
+        if opt == "-h":
+            print(usage)
+            sys.exit()
+        elif opt in ("-d", "--db"):
+            db_name = arg
+        elif opt in ("-o", "--output"):
+            output_dir = arg
+        elif opt in ("-f", "--format"):
+            fmt = arg
+        elif opt in ("-z", "--gzip"):
+            compress = True
+
+    if fmt not in FORMATS:
+        print(usage)
+        sys.exit(2)
+
+    export_triples(
+        get_graph(db_name), output_dir=output_dir, fmt=fmt, compress=compress
+    )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
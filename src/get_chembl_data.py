@@ -2,67 +2,132 @@
 
 """Source code to get latest data from ChEMBL."""
 
-import chembl_downloader
+import csv
+import os
+import sqlite3
+from contextlib import closing
+
 import pandas as pd
 
+from constants import CHUNK_SIZE
+
 pd.set_option('display.max_columns', None)
 
+# Columns joined or filtered on by the assay query, indexed if no index starts with them
+INDEXED_COLUMNS = [
+    ('ACTIVITIES', 'molregno'),
+    ('ACTIVITIES', 'assay_id'),
+    ('ACTIVITIES', 'standard_type'),
+    ('ASSAYS', 'assay_organism'),
+]
+
+GET_ASSAYS = """
+SELECT
+        MOLECULE_DICTIONARY.pref_name,
+        MOLECULE_DICTIONARY.chembl_id,
+        ACTIVITIES.standard_relation,
+        ACTIVITIES.standard_type,
+        ACTIVITIES.standard_value,
+        ACTIVITIES.standard_units,
+        ASSAYS.assay_organism as strain,
+        ASSAYS.chembl_id as assay_id
+    FROM MOLECULE_DICTIONARY
+    JOIN ACTIVITIES ON MOLECULE_DICTIONARY.molregno == ACTIVITIES.molregno
+    JOIN ASSAYS ON ACTIVITIES.assay_id == ASSAYS.assay_id
+    WHERE
+        EXISTS (
+            SELECT 1 FROM temp.pathogens
+            WHERE
+                ASSAYS.assay_organism == temp.pathogens.name
+                or (
+                    ASSAYS.assay_organism >= temp.pathogens.name || ' '
+                    and ASSAYS.assay_organism < temp.pathogens.name || '!'
+                )
+        )
+        and ASSAYS.assay_type == 'F'
+        and ACTIVITIES.standard_value is not null
+        and ACTIVITIES.standard_relation is not null
+        and ACTIVITIES.standard_relation = '='
+        and ACTIVITIES.standard_type = 'MIC'
+"""
+
+
+def create_indexes(conn: sqlite3.Connection, columns: list = INDEXED_COLUMNS) -> list:
+    """Create an index on each (table, column) unless one already starts with it."""
+    created = []
+
+    for table, column in columns:
+        indexed = {
+            conn.execute(f'PRAGMA index_info("{index[1]}")').fetchone()[2]
+            for index in conn.execute(f'PRAGMA index_list("{table}")').fetchall()
+        }
+        if column in indexed:
+            continue
+
+        name = f'idx_amr_{table.lower()}_{column.lower()}'
+        conn.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" ("{column}")')
+        created.append(name)
+
+    return created
+
+
+def get_data(
+    path: str = None,
+    version: str = None,
+    pathogen_file: str = '../data/AMR/pathogen.csv',
+    output_dir: str = '../data/MIC',
+    chunksize: int = CHUNK_SIZE
+) -> str:
+    """Method to get AMR related data from ChEMBL.
 
-def get_data():
-    """Method to get AMR related data from ChEMBL."""
-
-    bacterial_species = pd.read_csv(f'../data/AMR/pathogen.csv')['pathogen'].to_list()
-
-    version, path = chembl_downloader.download_extract_sqlite(return_version=True)
-
-    get_assays = """
-    SELECT
-            MOLECULE_DICTIONARY.pref_name,
-            MOLECULE_DICTIONARY.molregno as chembl_id,
-            ACTIVITIES.standard_relation,
-            ACTIVITIES.standard_type,
-            ACTIVITIES.standard_value,
-            ACTIVITIES.standard_units,
-            ASSAYS.assay_organism as strain,
-            ASSAYS.chembl_id as assay_id
-        FROM MOLECULE_DICTIONARY
-        JOIN ACTIVITIES ON MOLECULE_DICTIONARY.molregno == ACTIVITIES.molregno
-        JOIN ASSAYS ON ACTIVITIES.assay_id == ASSAYS.assay_id
-        WHERE
-            ASSAYS.assay_type == 'F'
-            and ACTIVITIES.standard_value is not null
-            and ACTIVITIES.standard_relation is not null
-            and ACTIVITIES.standard_relation = '='
-            and ACTIVITIES.standard_type = 'MIC'
+    Only assays on the pathogens of the KG are selected, through a temporary table
+    queried for each assay, and rows are written to the TSV as they are fetched. An
+    organism matches a pathogen name or starts with it and a space, so strains
+    such as ``'Staphylococcus aureus subsp. aureus'`` are kept and mapped to their
+    pathogen when the dump is read.
+    ``path`` and ``version`` point to a local ChEMBL SQLite file instead of
+    downloading the latest release. Returns the path of the TSV.
     """
 
-    assay_df = chembl_downloader.query(get_assays)
-    assay_df = assay_df[assay_df['strain'].isin(bacterial_species)]
-    assay_df.to_csv(f'../data/MIC/data_dump_{version}.tsv', sep='\t', index=False)
-
-    # get_activity = """
-    # SELECT
-    #
-    # FROM ACTIVITIES
-    # WHERE and ACTIVITIES.standard_relation = '='
-    # """
-    #
-    # act_df = chembl_downloader.query(get_activity)
-    #
-    # data_df = pd.merge(assay_df, act_df, on='id', how='left')
-    #
-    # get_compounds = """
-    #     SELECT
-    #
-    #
-    #     FROM MOLECULE_DICTIONARY
-    #     """
-    #
-    # chem_df = chembl_downloader.query(get_compounds)
-    #
-    # data_df = pd.merge(data_df, chem_df, on='mol_id', how='left')
-    # data_df = data_df[data_df['standard_type'] == 'MIC']
-    # data_df.to_csv(f'../data/MIC/data_dump_{version}.tsv', sep='\t', index=False)
+    bacterial_species = pd.read_csv(pathogen_file)['pathogen'].dropna().unique()
+
+    if path is None:
+        import chembl_downloader
+
+        version, path = chembl_downloader.download_extract_sqlite(return_version=True)
+
+    output_path = os.path.join(output_dir, f'data_dump_{version}.tsv')
+
+    with closing(sqlite3.connect(path)) as conn:
+        created = create_indexes(conn)
+        if created:
+            print(f'Created indexes {", ".join(created)}')
+
+        conn.execute('CREATE TEMP TABLE pathogens (name TEXT PRIMARY KEY)')
+        conn.executemany(
+            'INSERT OR IGNORE INTO temp.pathogens VALUES (?)',
+            [(name,) for name in bacterial_species]
+        )
+
+        cursor = conn.execute(GET_ASSAYS)
+
+        # Written to a temporary file first so an interrupted run leaves no partial dump
+        rows = 0
+        with open(output_path + '.tmp', 'w', newline='') as file:
+            writer = csv.writer(file, delimiter='\t', lineterminator='\n')
+            writer.writerow([column[0] for column in cursor.description])
+
+            while True:
+                chunk = cursor.fetchmany(chunksize)
+                if not chunk:
+                    break
+                writer.writerows(chunk)
+                rows += len(chunk)
+
+    os.replace(output_path + '.tmp', output_path)
+    print(f'Wrote {rows} assays to {output_path}')
+
+    return output_path
 
 
 if __name__ == '__main__':
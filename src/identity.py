@@ -0,0 +1,197 @@
+# -*- coding: utf-8 -*-
+
+"""Cross-source compound identity, a union-find over the identifiers of source rows"""
+
+import numpy as np
+import pandas as pd
+
+try:
+    from rdkit import Chem, RDLogger
+except ImportError:  # InChIKeys from SMILES disabled
+    Chem = None
+
+# Curie prefixes of compound identifiers, in the order they are preferred as the
+# key of a compound, and the label of the nodes keyed by each. Other identifiers,
+# such as InChIKeys, only link compounds.
+COMPOUND_LABELS = {
+    'chembl': 'ChEMBL',
+    'pubchem': 'PubChem',
+    'drug.central': 'DrugCentral',
+    'spark': 'SPARK',
+}
+
+# Page of a compound by the prefix of its key
+COMPOUND_PAGES = {
+    'chembl': 'https://www.ebi.ac.uk/chembl/compound_report_card/{}/',
+    'pubchem': 'https://pubchem.ncbi.nlm.nih.gov/compound/{}',
+    'drug.central': 'https://drugcentral.org/drugcard/{}',
+}
+
+# Properties holding the other identifiers of a compound, by prefix
+IDENTIFIER_PROPERTIES = {
+    'chembl': 'ChEMBL ID',
+    'pubchem': 'PubChem ID',
+    'drug.central': 'DrugCentral ID',
+    'spark': 'Spark ID',
+}
+
+
+def curies(prefix: str, identifiers: pd.Series) -> pd.Series:
+    """Prefix identifiers into curies, keeping missing ones missing."""
+    identifiers = identifiers.astype(object)
+    return (prefix + ':' + identifiers.astype(str)).where(identifiers.notna())
+
+
+def pubchem_curies(cids: pd.Series) -> pd.Series:
+    """Curies of PubChem CIDs stored as text or as floats like ``'2244.0'``."""
+    return curies('pubchem', cids.astype('string').str.split('.').str[0].astype(object))
+
+
+def inchikeys(smiles: pd.Series) -> pd.Series:
+    """Curies of the InChIKeys of SMILES, computed once per distinct SMILES.
+
+    All are missing without RDKit.
+    """
+    if Chem is None:
+        return pd.Series(np.nan, index=smiles.index, dtype=object)
+
+    RDLogger.DisableLog('rdApp.*')
+
+    keys = {}
+    for value in smiles.dropna().unique():
+        molecule = Chem.MolFromSmiles(value)
+        keys[value] = np.nan
+        if molecule is not None:
+            keys[value] = 'inchikey:' + Chem.MolToInchiKey(molecule)
+
+    return smiles.map(keys)
+
+
+def prefix(curie: str) -> str:
+    return curie.split(':', 1)[0]
+
+
+def compound_properties(key: str) -> dict:
+    """``curie`` and ``info`` page of the compound keyed by ``key``."""
+    properties = {'curie': key}
+
+    kind, _, identifier = key.partition(':')
+    if kind in COMPOUND_PAGES:
+        properties['info'] = COMPOUND_PAGES[kind].format(identifier)
+
+    return properties
+
+
+class UnionFind:
+    """Disjoint sets of the integers ``0 .. size - 1``.
+
+    Uses path halving and union by size.
+    """
+
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+        self.size = [1] * size
+
+    def find(self, item: int) -> int:
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, first: int, second: int) -> int:
+        first, second = self.find(first), self.find(second)
+        if first == second:
+            return first
+
+        if self.size[first] < self.size[second]:
+            first, second = second, first
+        self.parent[second] = first
+        self.size[first] += self.size[second]
+        return first
+
+    def roots(self) -> np.ndarray:
+        roots = [self.find(item) for item in range(len(self.parent))]
+        return np.array(roots, dtype=np.int64)
+
+
+class CompoundIndex:
+    """Map every identifier of a compound to one canonical compound key.
+
+    Built from tables of curies, one column per identifier kind and one row per
+    source record, where the identifiers of a row belong to the same compound.
+    Rows sharing any identifier are merged, transitively. Each compound is keyed
+    by its identifier of the first prefix of ``COMPOUND_LABELS`` it has, the
+    first seen of that prefix if there are several.
+    """
+
+    def __init__(self, tables: list):
+        tables = [
+            table.reset_index(drop=True).astype(object)
+            for table in tables
+            if not table.empty
+        ]
+        rows = pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
+
+        # Identifiers as integers, in order of appearance
+        stacked = rows.stack().dropna() if not rows.empty else pd.Series(dtype=object)
+        codes, identifiers = pd.factorize(stacked)
+        codes = pd.Series(codes, index=stacked.index)
+
+        # Link every identifier of a row to the first one
+        sets = UnionFind(len(identifiers))
+        first = codes.groupby(level=0).transform('first')
+        for item, anchor in zip(codes.to_numpy(), first.to_numpy()):
+            if item != anchor:
+                sets.union(item, anchor)
+
+        prefixes = pd.Series(identifiers).map(prefix)
+        ranks = {kind: rank for rank, kind in enumerate(COMPOUND_LABELS)}
+        rank = prefixes.map(ranks).fillna(len(COMPOUND_LABELS))
+
+        compounds = pd.DataFrame({
+            'identifier': identifiers,
+            'root': sets.roots(),
+            'rank': rank,
+        })
+        canonical = compounds.sort_values(['root', 'rank'], kind='stable')
+        canonical = canonical.groupby('root')['identifier'].first()
+
+        keys = canonical.loc[compounds['root']].to_numpy()
+        self.keys = pd.Series(keys, index=identifiers)
+        self.keys = self.keys[self.keys.map(prefix).isin(list(COMPOUND_LABELS))]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, identifier: str) -> bool:
+        return identifier in self.keys.index
+
+    def key(self, identifier: str) -> str:
+        """Canonical key of an identifier, or ``None`` if it is unknown."""
+        return self.keys.get(identifier)
+
+    def canonical(self, identifiers: pd.Series) -> pd.Series:
+        """Canonical keys of a column of identifiers, missing where unknown."""
+        return identifiers.map(self.keys)
+
+    def first_known(self, *columns: pd.Series) -> pd.Series:
+        """Canonical key of the first known identifier of each row among ``columns``."""
+        keys = self.canonical(columns[0])
+        for column in columns[1:]:
+            keys = keys.where(keys.notna(), self.canonical(column))
+        return keys
+
+    @staticmethod
+    def labels(keys: pd.Series) -> pd.Series:
+        """Node label of each canonical key."""
+        return keys.map(prefix, na_action='ignore').map(COMPOUND_LABELS)
+
+    def identifiers(self, key: str) -> list:
+        """All identifiers of the compound keyed by ``key``, in order of appearance."""
+        return self.keys.index[self.keys == key].tolist()
+
+    def merged(self) -> pd.Series:
+        """Number of identifiers of each compound with more than one, by key."""
+        counts = self.keys.value_counts()
+        return counts[counts > 1]
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+
+"""Content hashes of the source files, to skip unchanged sources in incremental loads"""
+
+import hashlib
+import json
+import os
+
+from constants import DATA_DIR, SOURCE_FILES
+
+
+def file_hash(path: str, chunk_size: int = 1 << 20) -> str:
+    """Return the SHA-256 of a file, or ``None`` if it does not exist."""
+    if not os.path.exists(path):
+        return None
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SourceManifest:
+    """Hashes of the files of each source as of the last successful load."""
+
+    def __init__(
+        self,
+        path: str,
+        data_dir: str = DATA_DIR,
+        sources: dict = SOURCE_FILES
+    ):
+        self.path = os.path.expanduser(path)
+        self.data_dir = os.path.expanduser(data_dir)
+        self.sources = sources
+
+        if os.path.exists(self.path):
+            with open(self.path) as file:
+                self.hashes = json.load(file)
+        else:
+            self.hashes = {}
+
+        self.current = {
+            source: {
+                name: file_hash(os.path.join(self.data_dir, name)) for name in files
+            }
+            for source, files in sources.items()
+        }
+
+    def changed(self) -> set:
+        """Return the sources whose files differ from the last load."""
+        return {
+            source
+            for source, hashes in self.current.items()
+            if self.hashes.get(source) != hashes
+        }
+
+    def save(self):
+        """Record the current hashes, to be called once the load is committed."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, 'w') as file:
+            json.dump(self.current, file, indent=2)
+        self.hashes = self.current
@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+
+"""In-memory graph backend, to build and query the KG without Neo4j"""
+
+from array import array
+from collections import defaultdict
+from functools import partial
+
+import numpy as np
+
+from constants import BATCH_SIZE
+from writer import GraphWriter
+
+DIRECTIONS = ('out', 'in', 'both')
+
+
+def _ids(values) -> np.ndarray:
+    """Copy an ``array`` of ids to NumPy, so the array can still grow."""
+    return np.array(values, dtype=np.int64)
+
+
+class MemoryGraph:
+    """Labelled property graph held in flat arrays.
+
+    Nodes and relationships get dense integer ids in the order they are added.
+    Labels and relationship types are interned to small codes, endpoints are kept
+    in ``array`` columns and indexed per label and per type. Adjacency is built
+    on demand as compressed sparse rows, one offset array and one neighbor array
+    per direction, and rebuilt after new relationships are added.
+    """
+
+    def __init__(self):
+        self.labels = []  # label code -> label
+        self.types = []  # type code -> relationship type
+        self._label_codes = {}
+        self._type_codes = {}
+
+        self._node_labels = array('H')
+        self._node_properties = []
+        self._label_index = defaultdict(partial(array, 'q'))
+
+        self._starts = array('q')
+        self._ends = array('q')
+        self._edge_types = array('H')
+        # relationship id -> properties, for relationships that have any
+        self._edge_properties = {}
+        self._type_index = defaultdict(partial(array, 'q'))
+
+        self._adjacency = {}
+
+    def __len__(self) -> int:
+        return len(self._node_labels)
+
+    @property
+    def relationship_count(self) -> int:
+        return len(self._starts)
+
+    @staticmethod
+    def _intern(name: str, names: list, codes: dict) -> int:
+        if name not in codes:
+            codes[name] = len(names)
+            names.append(name)
+        return codes[name]
+
+    def add_nodes(self, label: str, rows: list) -> range:
+        """Add nodes with the given property dicts, returning their ids."""
+        code = self._intern(label, self.labels, self._label_codes)
+        first = len(self._node_labels)
+
+        self._node_labels.extend([code] * len(rows))
+        self._node_properties.extend(rows)
+        ids = range(first, first + len(rows))
+        self._label_index[label].extend(ids)
+        return ids
+
+    def add_relationships(self, rel_type: str, rows: list) -> range:
+        """Add ``(start id, end id, properties)`` relationships, returning their ids."""
+        code = self._intern(rel_type, self.types, self._type_codes)
+        first = len(self._starts)
+
+        for offset, (start, end, properties) in enumerate(rows):
+            self._starts.append(start)
+            self._ends.append(end)
+            if properties:
+                self._edge_properties[first + offset] = properties
+
+        self._edge_types.extend([code] * len(rows))
+        ids = range(first, first + len(rows))
+        self._type_index[rel_type].extend(ids)
+        self._adjacency.clear()
+        return ids
+
+    def label(self, node_id: int) -> str:
+        return self.labels[self._node_labels[node_id]]
+
+    def properties(self, node_id: int) -> dict:
+        return self._node_properties[node_id]
+
+    def relationship(self, rel_id: int) -> tuple:
+        """Return ``(start id, type, end id, properties)`` of a relationship."""
+        return (
+            self._starts[rel_id],
+            self.types[self._edge_types[rel_id]],
+            self._ends[rel_id],
+            self._edge_properties.get(rel_id, {}),
+        )
+
+    def nodes(self, label: str = None) -> np.ndarray:
+        """Ids of all nodes, or of the nodes of one label."""
+        if label is None:
+            return np.arange(len(self), dtype=np.int64)
+        return _ids(self._label_index.get(label, ()))
+
+    def relationships(self, rel_type: str = None) -> tuple:
+        """Return the ids, start ids and end ids of all or one type of relationships."""
+        starts, ends = _ids(self._starts), _ids(self._ends)
+
+        if rel_type is None:
+            return np.arange(len(starts), dtype=np.int64), starts, ends
+
+        ids = _ids(self._type_index.get(rel_type, ()))
+        return ids, starts[ids], ends[ids]
+
+    def find(self, label: str, prop: str, value) -> list:
+        """Ids of the nodes of ``label`` with ``prop`` equal to ``value``, by a scan."""
+        return [
+            node_id for node_id in self._label_index.get(label, ())
+            if self._node_properties[node_id].get(prop) == value
+        ]
+
+    def _csr(self, direction: str) -> tuple:
+        """Return ``(offsets, neighbors, relationship ids, type codes)`` of a direction.
+
+        The arrays are sorted by node.
+        """
+        if direction not in self._adjacency:
+            sources, targets = self._starts, self._ends
+            if direction != 'out':
+                sources, targets = targets, sources
+            sources, targets = _ids(sources), _ids(targets)
+
+            order = np.argsort(sources, kind='stable')
+            offsets = np.zeros(len(self) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(sources, minlength=len(self)), out=offsets[1:])
+            types = np.array(self._edge_types, dtype=np.int64)[order]
+            self._adjacency[direction] = offsets, targets[order], order, types
+
+        return self._adjacency[direction]
+
+    def _adjacent(self, node_id: int, direction: str) -> tuple:
+        offsets, neighbors, _, types = self._csr(direction)
+        start, end = offsets[node_id], offsets[node_id + 1]
+        return neighbors[start:end], types[start:end]
+
+    def neighbors(
+        self, node_id: int, rel_type: str = None, direction: str = 'out'
+    ) -> np.ndarray:
+        """Ids of the nodes connected to ``node_id``, once per relationship."""
+        if direction not in DIRECTIONS:
+            raise ValueError(
+                f'direction should be one of {DIRECTIONS}, not {direction}'
+            )
+
+        directions = ('out', 'in') if direction == 'both' else (direction,)
+        found = []
+        for side in directions:
+            neighbors, types = self._adjacent(node_id, side)
+            if rel_type is not None:
+                neighbors = neighbors[types == self._type_codes.get(rel_type, -1)]
+            found.append(neighbors)
+
+        return np.concatenate(found)
+
+    def degrees(self, direction: str = 'out') -> np.ndarray:
+        """Number of relationships of every node, indexed by node id."""
+        if direction == 'both':
+            return self.degrees('out') + self.degrees('in')
+        return np.diff(self._csr(direction)[0])
+
+    def summary(self) -> dict:
+        """Number of nodes per label and of relationships per type."""
+        return {
+            **{label: len(ids) for label, ids in self._label_index.items()},
+            **{rel_type: len(ids) for rel_type, ids in self._type_index.items()},
+        }
+
+
+class MemoryWriter(GraphWriter):
+    """Write nodes and relationships into a :class:`MemoryGraph`.
+
+    The backend ids of the nodes are their integer ids in the graph.
+    """
+
+    def __init__(self, graph: MemoryGraph = None, batch_size: int = BATCH_SIZE):
+        super().__init__(batch_size=batch_size)
+        self.graph = graph if graph is not None else MemoryGraph()
+
+    def _write_nodes(self, label: str, rows: list) -> list:
+        return list(self.graph.add_nodes(label, rows))
+
+    def _write_relationships(
+        self,
+        start_label: str,
+        rel_type: str,
+        end_label: str,
+        rows: list
+    ):
+        self.graph.add_relationships(rel_type, rows)
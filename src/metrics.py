@@ -0,0 +1,284 @@
+# -*- coding: utf-8 -*-
+
+"""Durations, row counts, memory and cache hit rates of the load steps
+
+Steps are measured with the :func:`measure` context manager or the
+:func:`measured` decorator, under dotted names such as ``parse.SPARK/...``,
+``filter.pathogens``, ``pubchem.prefetch``, ``node_build.compounds``,
+``edge_build.chembl``, ``write.ChEMBL`` or ``commit``. They add up in the
+process-wide ``METRICS``, which pipeline stages run in worker processes send
+back to the main process. The totals can be printed, written as JSON or as a
+Prometheus textfile, and every step can be logged as a JSON line.
+"""
+
+import cProfile
+import functools
+import json
+import logging
+import os
+import resource
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_PREFIX = 'amr_kg'
+
+
+def peak_rss() -> float:
+    """Peak resident set size of this process so far, in MB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, KB elsewhere
+    return peak / 1024 ** 2 if sys.platform == 'darwin' else peak / 1024
+
+
+def current_rss() -> float:
+    """Resident set size of this process, in MB, or the peak where /proc is missing."""
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return peak_rss()
+    return pages * os.sysconf('SC_PAGE_SIZE') / 1024 ** 2
+
+
+def _rows(result) -> int:
+    """Rows of a result with a length, e.g. tables, registries and edge collectors."""
+    try:
+        return len(result)
+    except TypeError:
+        return 0
+
+
+def _step() -> dict:
+    return {'calls': 0, 'seconds': 0.0, 'rows': 0, 'memory_mb': 0.0, 'rss_mb': 0.0}
+
+
+class Span:
+    """A measured step, whose ``rows`` can be set while it runs."""
+
+    def __init__(self, name: str, rows: int = 0):
+        self.name = name
+        self.rows = rows
+
+
+class Metrics:
+    """Totals of the measured steps and event counters of one process."""
+
+    def __init__(self):
+        self.steps = {}  # name -> calls, seconds, rows, memory delta and max RSS
+        self.counters = defaultdict(int)  # e.g. pubchem_cache_hits
+        self.log_json = False
+
+    def record(
+        self,
+        name: str,
+        seconds: float,
+        rows: int = 0,
+        memory: float = 0.0,
+        rss: float = 0.0
+    ):
+        step = self.steps.setdefault(name, _step())
+        step['calls'] += 1
+        step['seconds'] += seconds
+        step['rows'] += rows
+        step['memory_mb'] += memory
+        step['rss_mb'] = max(step['rss_mb'], rss)
+
+        if self.log_json:
+            logger.info(json.dumps({
+                'step': name,
+                'seconds': round(seconds, 6),
+                'rows': rows,
+                'memory_mb': round(memory, 3),
+                'rss_mb': round(rss, 3),
+                'pid': os.getpid(),
+            }))
+
+    def count(self, name: str, value: int = 1):
+        self.counters[name] += value
+
+    def hit_rates(self) -> dict:
+        """Hit rate of the caches counting ``<cache>_hits`` and ``<cache>_misses``."""
+        rates = {}
+        for name, hits in self.counters.items():
+            if name.endswith('_hits'):
+                cache = name[:-len('_hits')]
+                total = hits + self.counters.get(cache + '_misses', 0)
+                rates[cache] = hits / total if total else None
+        return rates
+
+    def snapshot(self) -> dict:
+        return {
+            'steps': {name: dict(step) for name, step in self.steps.items()},
+            'counters': dict(self.counters),
+            'hit_rates': self.hit_rates(),
+        }
+
+    def merge(self, snapshot: dict):
+        """Add the totals of another process, as taken by :meth:`snapshot`."""
+        for name, other in snapshot['steps'].items():
+            step = self.steps.setdefault(name, _step())
+            for key in ('calls', 'seconds', 'rows', 'memory_mb'):
+                step[key] += other[key]
+            step['rss_mb'] = max(step['rss_mb'], other['rss_mb'])
+
+        for name, value in snapshot['counters'].items():
+            self.counters[name] += value
+
+    def reset(self):
+        self.steps.clear()
+        self.counters.clear()
+
+    def report(self) -> dict:
+        """Print the totals of each step and the cache hit rates."""
+        print('#### Step Metrics ####')
+        for name, step in sorted(self.steps.items()):
+            rate = step['rows'] / step['seconds'] if step['seconds'] else 0
+            print(
+                f'{name} - {step["calls"]} calls, {step["rows"]} rows '
+                f'in {step["seconds"]:.2f}s ({rate:.0f} rows/s, '
+                f'{step["memory_mb"]:+.0f} MB, {step["rss_mb"]:.0f} MB RSS)'
+            )
+
+        for cache, rate in self.hit_rates().items():
+            if rate is not None:
+                print(f'{cache} cache - {rate:.1%} hits')
+
+        return self.snapshot()
+
+    def write_json(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as file:
+            json.dump(self.snapshot(), file, indent=2)
+
+    def write_prometheus(self, path: str):
+        """Write the totals in the Prometheus text format, for the textfile collector.
+
+        The file is replaced at once, so the collector never reads it half written.
+        """
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples: list):
+            lines.append(f'# HELP {PROMETHEUS_PREFIX}_{name} {help_text}')
+            lines.append(f'# TYPE {PROMETHEUS_PREFIX}_{name} {kind}')
+            for labels, value in samples:
+                labels = ','.join(
+                    f'{key}="{_label(value)}"' for key, value in labels.items()
+                )
+                lines.append(f'{PROMETHEUS_PREFIX}_{name}{{{labels}}} {value}')
+
+        steps = sorted(self.steps.items())
+        metric('step_calls_total', 'counter', 'Times each step ran.',
+               [({'step': name}, step['calls']) for name, step in steps])
+        metric('step_seconds_total', 'counter', 'Wall time spent in each step.',
+               [({'step': name}, step['seconds']) for name, step in steps])
+        metric('step_rows_total', 'counter', 'Rows handled by each step.',
+               [({'step': name}, step['rows']) for name, step in steps])
+        metric('step_memory_megabytes', 'gauge',
+               'Change of the resident set size over each step.',
+               [({'step': name}, step['memory_mb']) for name, step in steps])
+        metric('step_rss_megabytes', 'gauge',
+               'Largest resident set size at the end of each step.',
+               [({'step': name}, step['rss_mb']) for name, step in steps])
+        counters = sorted(self.counters.items())
+        metric('events_total', 'counter',
+               'Counted events, such as cache hits and misses.',
+               [({'event': name}, value) for name, value in counters])
+        rates = sorted(self.hit_rates().items())
+        metric('cache_hit_ratio', 'gauge', 'Share of lookups answered by each cache.',
+               [({'cache': name}, rate) for name, rate in rates if rate is not None])
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path + '.tmp', 'w') as file:
+            file.write('\n'.join(lines) + '\n')
+        os.replace(path + '.tmp', path)
+
+
+def _label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+METRICS = Metrics()
+
+
+@contextmanager
+def measure(name: str, rows: int = 0, metrics: Metrics = METRICS):
+    """Measure the wall time and memory delta of the enclosed code under ``name``."""
+    span = Span(name, rows)
+    rss = current_rss()
+    start = time.perf_counter()
+    try:
+        yield span
+    finally:
+        seconds = time.perf_counter() - start
+        end_rss = current_rss()
+        metrics.record(name, seconds, rows=span.rows, memory=end_rss - rss, rss=end_rss)
+
+
+def measured(name: str, metrics: Metrics = METRICS):
+    """Decorate a function to :func:`measure` each call and the rows of its result."""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with measure(name, metrics=metrics) as span:
+                result = func(*args, **kwargs)
+                span.rows = _rows(result)
+            return result
+        return wrapper
+    return decorator
+
+
+def measured_chunks(chunks, name: str, metrics: Metrics = METRICS):
+    """Yield from an iterator of tables, measuring the time taken to produce each."""
+    chunks = iter(chunks)
+    while True:
+        with measure(name, metrics=metrics) as span:
+            chunk = next(chunks, None)
+            span.rows = _rows(chunk)
+        if chunk is None:
+            return
+        yield chunk
+
+
+@contextmanager
+def profiled(path: str = None):
+    """Profile the enclosed code of this process into ``path`` if given.
+
+    Paths ending in ``.html`` get a pyinstrument report if it is installed, others
+    a cProfile dump to read with ``pstats`` or snakeviz.
+    """
+    if not path:
+        yield
+        return
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    if path.endswith('.html'):
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            path = path[:-len('.html')] + '.prof'
+            logger.warning(
+                f'pyinstrument is not installed, writing a cProfile dump to {path}'
+            )
+        else:
+            profiler = Profiler()
+            profiler.start()
+            try:
+                yield
+            finally:
+                profiler.stop()
+                with open(path, 'w') as file:
+                    file.write(profiler.output_html())
+            return
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path)
@@ -5,169 +5,154 @@ import os
 import sys
 
 import pandas as pd
-from py2neo import Node, Relationship
-from py2neo.database import Transaction
-from tqdm import tqdm
 
-from connection import commit, populate_db
-from constants import DATA_DIR
-
-
-def create_nodes(tx: Transaction, data: pd.DataFrame):
-    """Create nodes specific for MIC"""
-
-    node_map = {"Bacteria": {}, "Chemical": {}, "IC50": {}, "Journal": {}, "Year": {}}
-
-    # Create bacterial strains
-    bacterial_strain = data["strain"].unique().tolist()
-    for bacteria_name in bacterial_strain:
-        bacterial_property = {}
-
-        if pd.notna(bacteria_name):
-            bacterial_property["name"] = bacteria_name
-
-        node_map["Bacteria"][bacteria_name] = Node("Bacteria", **bacterial_property)
-        tx.create(node_map["Bacteria"][bacteria_name])
-
-    # Create chemical nodes
-    chemical_data = data[["Molecule ChEMBL ID", "NAME"]]
-    chemical_data = chemical_data.drop_duplicates()
-    for chembl_id, name in chemical_data.values:
+from connection import populate_db
+from constants import COMMIT_SIZE, DATA_DIR
+from metrics import METRICS, measure
+from writer import BoltWriter, GraphWriter
+
+CHEMBL_COMPOUND_URL = "https://www.ebi.ac.uk/chembl/compound_report_card/{}/"
+CHEMBL_ASSAY_URL = "https://www.ebi.ac.uk/chembl/assay_report_card/"
+
+# Lookup indexes of the MIC graph, see schema.provision_schema
+MIC_SCHEMA = {
+    "node_keys": {
+        "Bacteria": "name",
+        "Chemical": "name",
+        "IC50": "name",
+        "Journal": "name",
+        "Year": "year",
+    },
+    "node_indexes": {},
+    "text_indexes": {},
+}
+
+
+def _properties(values: pd.Series, name: str) -> dict:
+    """Map each distinct value to its node properties, empty for missing values."""
+    values = values.drop_duplicates()
+    return {value: {name: value} if pd.notna(value) else {} for value in values}
+
+
+def create_nodes(data: pd.DataFrame) -> dict:
+    """Node tables specific for MIC, mapping the key of each node to its properties"""
+
+    # Chemicals are keyed by name, with the ChEMBL id of the first row of each name
+    chemical_data = data[["NAME", "Molecule ChEMBL ID"]].drop_duplicates(subset="NAME")
+    chemicals = {}
+    for name, chembl_id in chemical_data.values:
         chemical_property = {}
 
         if pd.notna(chembl_id):
-            chemical_property[
-                "chembl"
-            ] = f"https://www.ebi.ac.uk/chembl/compound_report_card/{chembl_id}/"
+            chemical_property["chembl"] = CHEMBL_COMPOUND_URL.format(chembl_id)
 
         if pd.notna(name):
             chemical_property["name"] = name
 
-        node_map["Chemical"][name] = Node("Chemical", **chemical_property)
-        tx.create(node_map["Chemical"][name])
-
-    # Create pIC50 nodes
-    ic50 = data["pIC50"].unique().tolist()
-    for val in ic50:
-        ic50_property = {}
-
-        if pd.notna(val):
-            ic50_property["name"] = val
-        node_map["IC50"][val] = Node("IC50", **ic50_property)
-        tx.create(node_map["IC50"][val])
-
-    # Add journal information
-    journal_names = data["Document Journal"].unique().tolist()
-    journal_names = ["Assay test" if pd.isna(x) else x for x in journal_names]
-
-    for name in journal_names:
-        journal_property = {}
+        chemicals[name] = chemical_property
 
-        if pd.notna(name):
-            journal_property["name"] = name
-
-        node_map["Journal"][name] = Node("Journal", **journal_property)
-        tx.create(node_map["Journal"][name])
-
-    # Add journal year
-    publication_years = data["Document Year"].unique().tolist()
+    return {
+        "Bacteria": _properties(data["strain"], "name"),
+        "Chemical": chemicals,
+        "IC50": _properties(data["pIC50"], "name"),
+        "Journal": _properties(data["Document Journal"], "name"),
+        "Year": _properties(data["Document Year"].dropna(), "year"),
+    }
 
-    for year in publication_years:
-        year_property = {}
 
-        if pd.notna(year):
-            year_property["year"] = year
+def create_relations(data: pd.DataFrame) -> list:
+    """Edge tables specific to MIC, as ``(start label, type, end label, edges)``.
 
-            node_map["Year"][year] = Node("Year", **year_property)
-            tx.create(node_map["Year"][year])
+    Each distinct edge is kept once: a chemical has one ``HAS_pIC50``, ``FOUND_IN``
+    and ``IN_YEAR`` edge per value, however many assay rows report it.
+    """
 
-    return node_map
+    assay_in = data[["strain", "NAME", "Assay ChEMBL ID"]]
+    assay_in = assay_in.dropna(subset=["Assay ChEMBL ID"])
+    assay_in = pd.DataFrame({
+        "start": assay_in["strain"],
+        "end": assay_in["NAME"],
+        "assay_info": CHEMBL_ASSAY_URL + assay_in["Assay ChEMBL ID"] + "/",
+    }).drop_duplicates()
 
+    def chemical_edges(column: str) -> pd.DataFrame:
+        edges = data[["NAME", column]].dropna(subset=[column]).drop_duplicates()
+        return edges.set_axis(["start", "end"], axis=1)
 
-def create_relations(df: pd.DataFrame, node_map: dict, tx: Transaction):
-    """Add relations specific to MIC"""
+    return [
+        ("Bacteria", "ASSAY_IN", "Chemical", assay_in),
+        ("Chemical", "HAS_pIC50", "IC50", chemical_edges("pIC50")),
+        ("Chemical", "FOUND_IN", "Journal", chemical_edges("Document Journal")),
+        ("Chemical", "IN_YEAR", "Year", chemical_edges("Document Year")),
+    ]
 
-    for row in tqdm(df.values, desc="Adding relations"):
-        (
-            strain,
-            chembl_id,  # not needed
-            chemical,
-            pval,
-            assay_id,
-            doc_name,
-            doc_year,
-        ) = row
 
-        bact_node = node_map["Bacteria"][strain]
-        chem_node = node_map["Chemical"][chemical]
+def load(writer: GraphWriter, data: pd.DataFrame):
+    """Write the MIC nodes and relationships of ``data`` in batches."""
 
-        assay_property = {}
-        if pd.notna(assay_id):
-            assay_property[
-                "assay_info"
-            ] = f"https://www.ebi.ac.uk/chembl/assay_report_card/{assay_id}/"
+    journals = data["Document Journal"].fillna(value="Assay test")
+    data = data.assign(**{"Document Journal": journals})
 
-            assay_in = Relationship(bact_node, "ASSAY_IN", chem_node, **assay_property)
-            tx.create(assay_in)
+    with measure("node_build.mic") as span:
+        nodes = create_nodes(data=data)
+        span.rows = sum(len(table) for table in nodes.values())
 
-        if pd.notna(pval):
-            p_node = node_map["IC50"][pval]
+    for label, table in nodes.items():
+        writer.add_nodes(label, table)
 
-            has_pic50 = Relationship(chem_node, "HAS_pIC50", p_node)
-            tx.create(has_pic50)
+    with measure("edge_build.mic") as span:
+        relations = create_relations(data=data)
+        span.rows = sum(len(edges) for *_, edges in relations)
 
-        if pd.notna(doc_name):
-            journal_node = node_map["Journal"][doc_name]
+    for start_label, rel_type, end_label, edges in relations:
+        writer.add_relationships(start_label, rel_type, end_label, edges)
 
-            found_in = Relationship(chem_node, "FOUND_IN", journal_node)
-            tx.create(found_in)
-
-        if pd.notna(doc_year):
-            year_node = node_map["Year"][doc_year]
-
-            in_year = Relationship(chem_node, "IN_YEAR", year_node)
-            tx.create(in_year)
+    writer.close()
 
 
 def main(argv):
     db_name = "micdata"
+    commit_size = COMMIT_SIZE
+    usage = "mic-script -d <dbname> [-n <commit size>]"
 
     try:
-        opts, args = getopt.getopt(argv, "hd:", ["db="])
+        opts, args = getopt.getopt(argv, "hd:n:", ["db=", "commit-size="])
     except getopt.GetoptError:
-        print("mic-script -id <dbname>")
+        print(usage)
         sys.exit(2)
     for opt, arg in opts:
         if opt == "-h":
-            print("mic-script -id <dbname>")
+            print(usage)
             sys.exit()
         elif opt in ("-d", "--db"):
             db_name = arg
-
-    tx = populate_db(db_name=db_name)
-
-    data_df = pd.read_csv(
-        os.path.join(DATA_DIR, "MIC", "mic-data.tsv"),
-        sep="\t",
-        dtype=str,
-        usecols=[
-            "strain",
-            "Molecule ChEMBL ID",
-            "NAME",
-            "pIC50",
-            "Assay ChEMBL ID",
-            "Document Year",
-            "Document Journal",
-        ],
-    )
-
-    node_mapping_dict = create_nodes(tx=tx, data=data_df)
-
-    data_df["Document Journal"] = data_df["Document Journal"].fillna(value="Assay test")
-
-    create_relations(df=data_df, tx=tx, node_map=node_mapping_dict)
-
-    commit(db_name, tx)
+        elif opt in ("-n", "--commit-size"):
+            # Commit every time this many rows were written
+            commit_size = int(arg)
+
+    with measure("parse.MIC/mic-data.tsv") as span:
+        data_df = pd.read_csv(
+            os.path.join(DATA_DIR, "MIC", "mic-data.tsv"),
+            sep="\t",
+            dtype=str,
+            usecols=[
+                "strain",
+                "Molecule ChEMBL ID",
+                "NAME",
+                "pIC50",
+                "Assay ChEMBL ID",
+                "Document Year",
+                "Document Journal",
+            ],
+        )
+        span.rows = len(data_df)
+
+    tx = populate_db(db_name=db_name, schema=MIC_SCHEMA)
+    writer = BoltWriter(tx, commit_size=commit_size)
+    load(writer, data_df)
+
+    writer.report()
+    METRICS.report()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+"""Mapping of the strain names of the sources to the pathogens of the KG"""
+
+import pandas as pd
+
+from constants import PATHOGEN_MAPPER
+from metrics import METRICS, measure
+
+# Last token of genus level names such as 'Shigella sp.', matching any species
+GENUS_TOKENS = ('sp', 'spp')
+
+
+def tokens(values: pd.Series) -> pd.Series:
+    """Lower case words and numbers of each value.
+
+    For example ``['escherichia', 'coli', 'o157', 'h7']``.
+    """
+    values = values.astype('string').str.lower()
+    return values.str.replace(r'[^0-9a-z]+', ' ', regex=True).str.split()
+
+
+class PathogenNormalizer:
+    """Map strain names to the canonical pathogen names of ``pathogen.csv``.
+
+    The token sequences of the pathogen names and of the curated ``aliases`` form
+    a prefix index. A strain maps to the pathogen of its longest prefix in the
+    index, so ``'Staphylococcus aureus (strain MRSA252)'`` is
+    ``'Staphylococcus aureus'`` and ``'Streptococcus mutans'`` the genus
+    ``'Streptococcus'``. NCBI taxon ids (``562``, ``NCBITaxon:562``) only match
+    as a whole, so a strain starting with a number is not taken for a taxon.
+    Each distinct strain is mapped once and remembered.
+    """
+
+    def __init__(self, pathogen_taxa: dict, aliases: dict = PATHOGEN_MAPPER):
+        names = {}
+        for alias, pathogen in aliases.items():
+            if pathogen in pathogen_taxa:
+                names[alias] = pathogen
+
+        taxa = {}
+        for pathogen, taxon in pathogen_taxa.items():
+            names[pathogen] = pathogen
+            if pd.notna(taxon):
+                taxa[str(taxon)] = pathogen
+                taxa['ncbitaxon:' + str(taxon)] = pathogen
+
+        self.index = {}  # space joined token prefix -> pathogen
+        for name, words in zip(names, tokens(pd.Series(list(names), dtype=object))):
+            if len(words) > 1 and words[-1] in GENUS_TOKENS:
+                words = words[:-1]
+            self.index.setdefault(' '.join(words), names[name])
+
+        self.taxa = {}  # space joined tokens of a whole taxon id -> pathogen
+        for taxon, words in zip(taxa, tokens(pd.Series(list(taxa), dtype=object))):
+            self.taxa.setdefault(' '.join(words), taxa[taxon])
+
+        self.depth = max((len(key.split()) for key in self.index), default=0)
+        self.pathogens = set(pathogen_taxa)
+        self._mapped = {}  # strain -> pathogen or None
+
+    def __contains__(self, pathogen: str) -> bool:
+        return pathogen in self.pathogens
+
+    def __iter__(self):
+        return iter(self.pathogens)
+
+    def _map(self, strains: pd.Series) -> pd.Series:
+        """Taxon id or longest indexed prefix of each strain.
+
+        Looks up each prefix length once.
+        """
+        words = tokens(strains)
+        pathogens = words.str.join(' ').map(self.taxa).astype(object)
+
+        for length in range(self.depth, 0, -1):
+            prefixes = words.str[:length].str.join(' ')
+            pathogens = pathogens.where(pathogens.notna(), prefixes.map(self.index))
+
+        return pathogens
+
+    def normalize(self, strains: pd.Series) -> pd.Series:
+        """Pathogen of each strain, missing where none matches."""
+        with measure('filter.pathogens', rows=len(strains)):
+            distinct = pd.Series(strains.dropna().unique(), dtype=object)
+            new = distinct[~distinct.isin(list(self._mapped))]
+
+            METRICS.count('pathogens_cache_hits', len(distinct) - len(new))
+            METRICS.count('pathogens_cache_misses', len(new))
+
+            if not new.empty:
+                self._mapped.update(zip(new, self._map(new)))
+
+            pathogens = strains.map(self._mapped)
+            return pathogens.where(pathogens.notna(), None)
+
+    def matches(self, strains: pd.Series) -> pd.Series:
+        """Whether each strain maps to a pathogen, as a ``read_source`` filter."""
+        return self.normalize(strains).notna()
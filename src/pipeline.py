@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+"""Dependency graph of load stages, run in a process pool"""
+
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from constants import PIPELINE_WORKERS
+from metrics import METRICS, measure, peak_rss
+
+
+def _timed(func, kwargs: dict, name: str) -> tuple:
+    """Run a stage, returning its result, wall clock start and end and peak RSS."""
+    start = time.time()
+    with measure(f'stage.{name}'):
+        result = func(**kwargs)
+    return result, start, time.time(), peak_rss()
+
+
+def _pooled(func, kwargs: dict, name: str) -> tuple:
+    """Run a stage in a worker process, also returning the metrics it recorded there."""
+    METRICS.reset()
+    return _timed(func, kwargs, name) + (METRICS.snapshot(),)
+
+
+class Stage:
+    """A step of the pipeline, called with its dependency results as keywords."""
+
+    def __init__(
+        self,
+        name: str,
+        func,
+        deps: tuple = (),
+        local: bool = False,
+        kwargs: dict = None
+    ):
+        self.name = name
+        self.func = func
+        self.deps = tuple(deps)
+        self.local = local
+        self.kwargs = kwargs or {}
+
+
+class Pipeline:
+    """Run stages as soon as their dependencies are done.
+
+    Stages run in a pool of worker processes, so their functions, arguments and
+    results must be picklable. Local stages run in the calling process, for work
+    that needs an open database transaction or other shared state. Dependencies
+    that were not added to the pipeline are passed as ``None``, so a skipped
+    source only needs its stages to be left out.
+    """
+
+    def __init__(self, workers: int = PIPELINE_WORKERS):
+        self.workers = workers
+        self.stages = {}
+        self.results = {}
+        self.timings = {}
+        # stage -> peak RSS in MB of the process that ran it, up to the stage end
+        self.peaks = {}
+
+    def add(self, name: str, func, deps: tuple = (), local: bool = False, **kwargs):
+        """Add a stage, whose ``func`` gets ``kwargs`` and the dependency results."""
+        if name in self.stages:
+            raise ValueError(f'Stage {name} is already defined')
+        self.stages[name] = Stage(name, func, deps=deps, local=local, kwargs=kwargs)
+
+    def _arguments(self, stage: Stage) -> dict:
+        return {
+            **stage.kwargs,
+            **{dep: self.results.get(dep) for dep in stage.deps},
+        }
+
+    def _is_ready(self, stage: Stage) -> bool:
+        return all(dep in self.results or dep not in self.stages for dep in stage.deps)
+
+    def run(self) -> dict:
+        """Run all stages and return their results by name.
+
+        With zero workers every stage runs locally.
+        """
+        pending = dict(self.stages)
+        running = {}
+        self.start = time.time()
+
+        executor = None
+        if self.workers:
+            executor = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            while pending or running:
+                ready = [stage for stage in pending.values() if self._is_ready(stage)]
+                if not ready and not running:
+                    raise ValueError(
+                        f'Unresolvable dependencies in stages {", ".join(pending)}'
+                    )
+
+                # Start all pool stages first so they overlap with the local ones
+                ready.sort(key=lambda stage: stage.local or executor is None)
+                for stage in ready:
+                    del pending[stage.name]
+
+                    if stage.local or executor is None:
+                        result, start, end, peak = _timed(
+                            stage.func, self._arguments(stage), stage.name
+                        )
+                        self.results[stage.name] = result
+                        self.timings[stage.name] = (start, end)
+                        self.peaks[stage.name] = peak
+                        break  # Check for stages unblocked by this one
+
+                    future = executor.submit(
+                        _pooled, stage.func, self._arguments(stage), stage.name
+                    )
+                    running[future] = stage.name
+
+                unblocked = any(self._is_ready(stage) for stage in pending.values())
+                if running and not unblocked:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        name = running.pop(future)
+                        result, start, end, peak, metrics = future.result()
+                        METRICS.merge(metrics)
+                        self.results[name] = result
+                        self.timings[name] = (start, end)
+                        self.peaks[name] = peak
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+        return self.results
+
+    def critical_path(self) -> list:
+        """Return the chain of stages ending last.
+
+        Each stage of the chain started after the last of its dependencies.
+        """
+        if not self.timings:
+            return []
+
+        path = [max(self.timings, key=lambda name: self.timings[name][1])]
+        while True:
+            deps = [dep for dep in self.stages[path[-1]].deps if dep in self.timings]
+            if not deps:
+                break
+            path.append(max(deps, key=lambda name: self.timings[name][1]))
+
+        return path[::-1]
+
+    def report(self) -> dict:
+        """Print the start, end, wall time and peak RSS of each stage.
+
+        Times are relative to the pipeline start.
+        """
+        print('#### Stage Timings ####')
+        timings = sorted(self.timings.items(), key=lambda item: item[1])
+        for name, (start, end) in timings:
+            where = 'local' if self.stages[name].local or not self.workers else 'pool'
+            print(
+                f'{name} ({where}) - '
+                f'{start - self.start:.2f}s to {end - self.start:.2f}s '
+                f'({end - start:.2f}s, {self.peaks[name]:.0f} MB peak)'
+            )
+
+        path = self.critical_path()
+        print(f'Critical path: {" -> ".join(path)}')
+
+        return {
+            name: end - start
+            for name, (start, end) in self.timings.items()
+        }
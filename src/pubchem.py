@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+
+"""Cached PubChem lookups used by the source loaders"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import urlopen
+
+from constants import (
+    PUBCHEM_BATCH_SIZE,
+    PUBCHEM_CACHE,
+    PUBCHEM_CACHE_TTL,
+    PUBCHEM_NEGATIVE_TTL,
+    PUBCHEM_RATE,
+    PUBCHEM_RETRIES,
+    PUBCHEM_URL,
+    PUBCHEM_WORKERS,
+)
+from metrics import METRICS, measure
+
+logger = logging.getLogger(__name__)
+
+
+class OfflineCacheMiss(LookupError):
+    """Raised in offline mode when a lookup is not in the cache."""
+
+
+class LookupCache:
+    """SQLite-backed cache of lookup results keyed by namespace and identifier.
+
+    Misses are stored as ``NULL`` so that identifiers unknown to PubChem are not
+    queried again until ``negative_ttl`` has passed.
+    """
+
+    def __init__(
+        self,
+        path: str = PUBCHEM_CACHE,
+        ttl: float = PUBCHEM_CACHE_TTL,
+        negative_ttl: float = PUBCHEM_NEGATIVE_TTL
+    ):
+        path = os.path.expanduser(path)
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS lookups (
+                namespace TEXT NOT NULL,
+                identifier TEXT NOT NULL,
+                value TEXT,
+                fetched_at REAL NOT NULL,
+                PRIMARY KEY (namespace, identifier)
+            )
+            """
+        )
+
+    def get(self, namespace: str, identifier, expired: bool = False) -> tuple:
+        """Return ``(found, value)`` for a cached lookup.
+
+        Entries older than their TTL count as not found unless ``expired`` is set.
+        """
+        row = self._conn.execute(
+            'SELECT value, fetched_at FROM lookups '
+            'WHERE namespace = ? AND identifier = ?',
+            (namespace, str(identifier))
+        ).fetchone()
+
+        if row is None:
+            self.misses += 1
+            return False, None
+
+        value, fetched_at = row
+        ttl = self.ttl if value is not None else self.negative_ttl
+        if not expired and time.time() - fetched_at > ttl:
+            self.misses += 1
+            return False, None
+
+        self.hits += 1
+        return True, json.loads(value) if value is not None else None
+
+    def set(self, namespace: str, identifier, value):
+        """Store a lookup result, ``None`` marking an identifier as not found."""
+        with self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO lookups VALUES (?, ?, ?, ?)',
+                (
+                    namespace,
+                    str(identifier),
+                    json.dumps(value) if value is not None else None,
+                    time.time()
+                )
+            )
+
+    def set_many(self, namespace: str, items):
+        """Store ``(identifier, value)`` lookup results in one transaction."""
+        fetched_at = time.time()
+        with self._conn:
+            self._conn.executemany(
+                'INSERT OR REPLACE INTO lookups VALUES (?, ?, ?, ?)',
+                (
+                    (
+                        namespace,
+                        str(identifier),
+                        json.dumps(value) if value is not None else None,
+                        fetched_at,
+                    )
+                    for identifier, value in items
+                )
+            )
+
+    def close(self):
+        self._conn.close()
+
+
+class RateLimiter:
+    """Space out calls shared between threads to at most ``rate`` per second.
+
+    The limit holds per process, so a load sends all its lookups from one stage.
+    """
+
+    def __init__(self, rate: float = PUBCHEM_RATE):
+        self.interval = 1 / rate
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+
+        if delay > 0:
+            time.sleep(delay)
+
+
+class PubChemRestClient:
+    """Fetch compound information from the PubChem PUG REST API.
+
+    CIDs are looked up in batches of up to ``PUBCHEM_BATCH_SIZE`` per request.
+    Busy and server errors are retried with exponential backoff. ``base_url``
+    can point to a local server for testing.
+    """
+
+    def __init__(
+        self,
+        base_url: str = PUBCHEM_URL,
+        limiter: RateLimiter = None,
+        retries: int = PUBCHEM_RETRIES,
+        backoff: float = 1.0,
+        timeout: float = 30
+    ):
+        self.base_url = base_url.rstrip('/')
+        self.limiter = limiter if limiter is not None else RateLimiter()
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+
+    def _post(self, path: str, data: dict):
+        """POST form data, returning the decoded JSON or ``None`` without a match."""
+        body = urlencode(data).encode()
+
+        for attempt in range(self.retries + 1):
+            self.limiter.wait()
+            try:
+                url = f'{self.base_url}/{path}'
+                with urlopen(url, data=body, timeout=self.timeout) as response:
+                    return json.load(response)
+            except HTTPError as error:
+                if error.code == 404:
+                    return None
+                if error.code not in (429, 500, 503, 504) or attempt == self.retries:
+                    raise
+            except URLError:
+                if attempt == self.retries:
+                    raise
+
+            time.sleep(self.backoff * 2 ** attempt)
+
+    def compounds(self, cids: list) -> dict:
+        """Return the fields used by the loaders by CID, ``None`` for unknown CIDs."""
+        results = {int(cid): None for cid in cids}
+        data = {'cid': ','.join(str(cid) for cid in results)}
+
+        properties = self._post('compound/cid/property/IUPACName/JSON', data) or {}
+        for record in properties.get('PropertyTable', {}).get('Properties', []):
+            results[record['CID']] = {
+                'cid': record['CID'],
+                'synonym': None,
+                'iupac_name': record.get('IUPACName'),
+            }
+
+        synonyms = self._post('compound/cid/synonyms/JSON', data) or {}
+        for record in synonyms.get('InformationList', {}).get('Information', []):
+            if results.get(record['CID']) and record.get('Synonym'):
+                results[record['CID']]['synonym'] = record['Synonym'][0]
+
+        return results
+
+    def compound(self, cid) -> dict:
+        """Return the fields used by the loaders, or ``None`` if the CID is unknown."""
+        return self.compounds([cid])[int(cid)]
+
+    def search_name(self, name: str) -> list:
+        """Return the CIDs matching a compound name."""
+        result = self._post('compound/name/cids/JSON', {'name': name}) or {}
+        return result.get('IdentifierList', {}).get('CID', [])
+
+
+class PubChemResolver:
+    """Resolve PubChem identifiers through a persistent cache.
+
+    The client is any object with ``compound(cid)``, ``compounds(cids)`` and
+    ``search_name(name)`` methods, so tests can replace PubChem with a local stub.
+    In offline mode the client is never called and cache misses raise
+    :class:`OfflineCacheMiss`.
+    """
+
+    def __init__(
+        self,
+        cache: LookupCache = None,
+        client=None,
+        offline: bool = False,
+        workers: int = PUBCHEM_WORKERS,
+        batch_size: int = PUBCHEM_BATCH_SIZE
+    ):
+        self.cache = cache if cache is not None else LookupCache()
+        self.client = client if client is not None else PubChemRestClient()
+        self.offline = offline
+        self.workers = workers
+        self.batch_size = batch_size
+
+    def _lookup(self, namespace: str, identifier, fetch):
+        found, value = self.cache.get(namespace, identifier, expired=self.offline)
+        METRICS.count('pubchem_cache_hits' if found else 'pubchem_cache_misses')
+        if found:
+            return value
+
+        if self.offline:
+            raise OfflineCacheMiss(f'{namespace}:{identifier} is not cached')
+
+        with measure('pubchem.fetch', rows=1):
+            value = fetch(identifier)
+        self.cache.set(namespace, identifier, value or None)
+        return value
+
+    def compound(self, cid) -> dict:
+        """Return ``cid``, ``synonym`` and ``iupac_name`` of a compound, or ``None``."""
+        return self._lookup('cid', str(cid), self.client.compound)
+
+    def search_name(self, name: str) -> list:
+        """Return the CIDs matching a compound name."""
+        return self._lookup('name', name, self.client.search_name) or []
+
+    def _is_cached(self, namespace: str, identifier) -> bool:
+        return self.cache.get(namespace, identifier)[0]
+
+    def _run(self, fetch, items: list, desc: str):
+        """Call ``fetch`` on every item in a thread pool, yield ``(item, result)``."""
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(fetch, item): item for item in items}
+            for future in as_completed(futures):
+                try:
+                    yield futures[future], future.result()
+                except Exception as error:  # Left uncached, retried by the loaders
+                    item = futures[future]
+                    logger.warning(f'{desc} lookup failed for {item}: {error}')
+
+    def prefetch(self, cids=(), names=()):
+        """Resolve all uncached names and CIDs concurrently and store them in the cache.
+
+        CIDs found for the names are fetched as well, since the loaders need their
+        synonyms. Only the calling thread touches the cache.
+        """
+        if self.offline:
+            return
+
+        with measure('pubchem.prefetch') as span:
+            span.rows = self._prefetch(cids, names)
+
+    def _prefetch(self, cids, names) -> int:
+        names = [
+            name for name in dict.fromkeys(names) if not self._is_cached('name', name)
+        ]
+        cids = {str(cid) for cid in cids}
+
+        for name, result in self._run(self.client.search_name, names, desc='Name'):
+            self.cache.set('name', name, result or None)
+
+        for name in names:
+            found, result = self.cache.get('name', name)
+            if found and result:
+                cids.add(str(result[0]))
+
+        cids = sorted(cid for cid in cids if not self._is_cached('cid', cid))
+        batches = [
+            cids[i:i + self.batch_size] for i in range(0, len(cids), self.batch_size)
+        ]
+
+        for _, results in self._run(self.client.compounds, batches, desc='CID'):
+            for cid, compound in results.items():
+                self.cache.set('cid', str(cid), compound)
+
+        logger.info(f'Prefetched {len(names)} names and {len(cids)} CIDs from PubChem')
+        return len(names) + len(cids)
@@ -0,0 +1,257 @@
+# -*- coding: utf-8 -*-
+
+"""RDF serialization of the KG straight from the loaders, as N-Triples or Turtle"""
+
+import gzip
+import math
+import os
+from urllib.parse import quote
+
+from constants import BATCH_SIZE, EXPORT_IRI, NODE_KEYS, RDF_PREFIXES, RDF_SHARD_SIZE
+from writer import GraphWriter
+
+RDF = 'http://www.w3.org/1999/02/22-rdf-syntax-ns#'
+RDFS = 'http://www.w3.org/2000/01/rdf-schema#'
+XSD = 'http://www.w3.org/2001/XMLSchema#'
+
+FORMATS = {
+    'nt': '.nt',
+    'ttl': '.ttl',
+}
+
+
+def local_iri(kind: str, name) -> str:
+    """IRI of a class, property, relation or node of the KG under ``EXPORT_IRI``."""
+    return f'{EXPORT_IRI}{kind}/{quote(str(name), safe="")}'
+
+
+def curie_iri(curie: str, prefixes: dict = RDF_PREFIXES) -> str:
+    """Expand a curie like ``chembl:CHEMBL25``, ``None`` for an unknown prefix."""
+    prefix, _, identifier = str(curie).partition(':')
+    if not identifier or prefix not in prefixes:
+        return None
+    return prefixes[prefix] + quote(identifier, safe='')
+
+
+def relation_iri(rel_type: str) -> str:
+    return local_iri('relation', rel_type)
+
+
+def _escape(value: str) -> str:
+    return (
+        value.replace('\\', '\\\\')
+        .replace('"', '\\"')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+def literal(value) -> str:
+    """Serialize a property value, typed for non-strings as in neo4j-admin exports."""
+    if isinstance(value, bool):
+        return f'"{str(value).lower()}"^^<{XSD}boolean>'
+    if isinstance(value, int):
+        return f'"{value}"^^<{XSD}integer>'
+    if isinstance(value, float):
+        if math.isnan(value):
+            return f'"NaN"^^<{XSD}double>'
+        if math.isinf(value):
+            return f'"{"INF" if value > 0 else "-INF"}"^^<{XSD}double>'
+        return f'"{value!r}"^^<{XSD}double>'
+    return f'"{_escape(str(value))}"'
+
+
+def _missing(value) -> bool:
+    """Whether a property value is missing, as NaN from pandas, and so has no triple."""
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+def _items(properties: dict):
+    """Yield ``(name, value)`` of the properties set, once per item of list values."""
+    for name, value in properties.items():
+        for item in value if isinstance(value, list) else [value]:
+            if not _missing(item):
+                yield name, item
+
+
+def _is_local_name(name: str) -> bool:
+    """Whether a Turtle prefixed name can use ``name`` as is.
+
+    Checks a conservative subset of PN_LOCAL: ASCII letters, digits, ``_`` and
+    ``-``, except as the first character.
+    """
+    return (
+        bool(name)
+        and name[0] != '-'
+        and all(c.isascii() and (c.isalnum() or c in '_-') for c in name)
+    )
+
+
+class RdfWriter(GraphWriter):
+    """Write the nodes and relationships of the loaders as N-Triples or Turtle files.
+
+    Nodes get the IRI of their curie where its prefix is in ``RDF_PREFIXES``,
+    otherwise one under ``EXPORT_IRI`` from their key property. Each node has an
+    ``rdf:type`` of its label and one literal per property, with the name also
+    as ``rdfs:label``. Relationship properties are attached to a reified
+    statement. Output is streamed to files of up to ``shard_size`` triples,
+    optionally gzipped, and never held in memory. Missing property values are
+    left out and list values give one triple per item.
+    """
+
+    def __init__(
+        self,
+        output_dir: str,
+        fmt: str = 'nt',
+        compress: bool = False,
+        shard_size: int = RDF_SHARD_SIZE,
+        node_keys: dict = NODE_KEYS,
+        prefixes: dict = RDF_PREFIXES,
+        batch_size: int = BATCH_SIZE
+    ):
+        super().__init__(batch_size=batch_size)
+        self.output_dir = os.path.expanduser(output_dir)
+        os.makedirs(self.output_dir, exist_ok=True)
+
+        self.fmt = fmt
+        self.compress = compress
+        self.shard_size = shard_size
+        self.node_keys = node_keys
+        self.prefixes = {
+            **prefixes,
+            'amr': EXPORT_IRI,
+            'class': EXPORT_IRI + 'class/',
+            'property': EXPORT_IRI + 'property/',
+            'relation': EXPORT_IRI + 'relation/',
+            'rdf': RDF,
+            'rdfs': RDFS,
+            'xsd': XSD,
+        }
+        # Longest namespace first, so the most specific prefix is used
+        self._namespaces = sorted(self.prefixes.items(), key=lambda item: -len(item[1]))
+
+        self.paths = []
+        self.triples = 0
+        self._file = None
+        self._shard_triples = 0
+        self._next_node = 0
+        self._next_statement = 0
+
+    def _term(self, iri: str) -> str:
+        if self.fmt == 'ttl':
+            for prefix, namespace in self._namespaces:
+                if iri.startswith(namespace) and _is_local_name(iri[len(namespace):]):
+                    return f'{prefix}:{iri[len(namespace):]}'
+        return f'<{iri}>'
+
+    def _emit(self, lines: list):
+        """Write the triples of one node or relationship, in a new shard if needed."""
+        if self._file is None or self._shard_triples >= self.shard_size:
+            self._open_shard()
+
+        self._file.write(''.join(
+            f'{subject} {predicate} {value} .\n' for subject, predicate, value in lines
+        ))
+        self._shard_triples += len(lines)
+        self.triples += len(lines)
+
+    def _open_shard(self):
+        if self._file is not None:
+            self._file.close()
+
+        name = f'amr-kg-{len(self.paths):05d}{FORMATS[self.fmt]}'
+        path = os.path.join(self.output_dir, name)
+        if self.compress:
+            path += '.gz'
+            self._file = gzip.open(path, 'wt', encoding='utf-8')
+        else:
+            self._file = open(path, 'w', encoding='utf-8')
+
+        if self.fmt == 'ttl':
+            self._file.writelines(
+                f'@prefix {prefix}: <{namespace}> .\n'
+                for prefix, namespace in self.prefixes.items()
+            )
+            self._file.write('\n')
+
+        self.paths.append(path)
+        self._shard_triples = 0
+
+    def _node_iri(self, label: str, properties: dict) -> str:
+        if 'curie' in properties:
+            iri = curie_iri(properties['curie'], self.prefixes)
+            if iri is not None:
+                return iri
+
+        key = properties.get(self.node_keys.get(label), properties.get('curie'))
+        if key is None:
+            key = f'_{self._next_node}'
+            self._next_node += 1
+
+        return local_iri(label.lower(), key)
+
+    def _write_nodes(self, label: str, rows: list) -> list:
+        ids = []
+        label_type = self._term(local_iri('class', label))
+
+        for properties in rows:
+            iri = self._node_iri(label, properties)
+            subject = self._term(iri)
+
+            lines = [(subject, self._term(RDF + 'type'), label_type)]
+            for name, value in _items(properties):
+                predicate = self._term(local_iri('property', name))
+                lines.append((subject, predicate, literal(value)))
+                if name == 'name':
+                    lines.append((subject, self._term(RDFS + 'label'), literal(value)))
+
+            self._emit(lines)
+            ids.append(iri)
+
+        return ids
+
+    def _write_relationships(
+        self,
+        start_label: str,
+        rel_type: str,
+        end_label: str,
+        rows: list
+    ):
+        predicate = self._term(relation_iri(rel_type))
+
+        for start, end, properties in rows:
+            subject, value = self._term(start), self._term(end)
+            lines = [(subject, predicate, value)]
+
+            if properties:
+                statement = f'_:s{self._next_statement}'
+                self._next_statement += 1
+                lines += [
+                    (
+                        statement,
+                        self._term(RDF + 'type'),
+                        self._term(RDF + 'Statement'),
+                    ),
+                    (statement, self._term(RDF + 'subject'), subject),
+                    (statement, self._term(RDF + 'predicate'), predicate),
+                    (statement, self._term(RDF + 'object'), value),
+                ]
+                lines += [
+                    (statement, self._term(local_iri('property', name)), literal(item))
+                    for name, item in _items(properties)
+                ]
+
+            self._emit(lines)
+
+    def close(self):
+        """Write everything still buffered and close the last shard."""
+        self.flush()
+
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+        print(
+            f'Wrote {self.triples} triples to {len(self.paths)} files '
+            f'in {self.output_dir}'
+        )
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+
+"""Reference tables of the AMR data, parsed once and shared by all loaders"""
+
+import os
+from functools import lru_cache
+
+import pandas as pd
+
+from constants import DATA_DIR, ENCODING
+
+
+def _read_table(data_dir: str, file_name: str, **kwargs) -> pd.DataFrame:
+    return pd.read_csv(
+        os.path.join(data_dir, 'AMR', file_name),
+        encoding=ENCODING,
+        engine='c',
+        **kwargs
+    )
+
+
+def _id_indexed(df: pd.DataFrame) -> pd.DataFrame:
+    """Use the integer ``id`` column as index, as the person table refers to it."""
+    return df.set_index(df.pop('id').astype(int))
+
+
+class ReferenceData:
+    """Person, institute, project, pathogen and skill tables with lookup dicts."""
+
+    def __init__(self, data_dir: str = DATA_DIR):
+        self.persons = _read_table(data_dir, 'person.csv')
+        self.institutes = _id_indexed(_read_table(data_dir, 'institute.csv', dtype=str))
+        self.projects = _id_indexed(_read_table(data_dir, 'project.csv', dtype=str))
+        self.pathogens = _read_table(data_dir, 'pathogen.csv', dtype=str)
+        self.skills = _id_indexed(_read_table(data_dir, 'skill.csv', dtype=str))
+
+        # id -> name, as used by the person table
+        self.institute_names = self.institutes['institute'].to_dict()
+        self.project_names = self.projects['project'].to_dict()
+        self.pathogen_names = self.pathogens['pathogen'].to_dict()
+        self.skill_names = self.skills['skill'].to_dict()
+
+        # name -> NCBI taxon id used in the pathogen node curie
+        self.pathogen_taxa = {
+            pathogen: taxon
+            for pathogen, taxon in self.pathogens[['pathogen', 'ncbitaxon']].values
+            if pd.notna(pathogen)
+        }
+
+        # skill -> category and skill -> definition
+        self.skill_categories = dict(self.skills[['skill', 'category']].values)
+        self.skill_definitions = {
+            skill: definition
+            for skill, definition in self.skills[['skill', 'definition']].values
+            if pd.notna(definition)
+        }
+
+
+@lru_cache(maxsize=None)
+def get_reference_data(data_dir: str = DATA_DIR) -> ReferenceData:
+    """Load the reference tables once per data directory.
+
+    Call ``get_reference_data.cache_clear()`` to pick up edited files.
+    """
+    return ReferenceData(data_dir=data_dir)
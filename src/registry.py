@@ -0,0 +1,238 @@
+# -*- coding: utf-8 -*-
+
+"""Registry of the nodes built by the loaders, before they are written"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+LOOKUPS = ('curie', 'name', 'alias')
+
+# Cross-references to other sources kept as properties, looked up as aliases
+ALIAS_PROPERTIES = ('Spark ID', 'PubChem ID', 'DrugCentral ID')
+
+
+class LabelTable:
+    """Nodes of one label, interned to dense integer rows with column-wise properties.
+
+    Each key gets the next row on first use. Properties are kept in one list per
+    property name, aligned with the rows and holding ``None`` where a node does
+    not have the property, so a node costs a few list slots instead of a dict.
+    Nodes are only turned into property dicts by :meth:`items`, when written.
+    """
+
+    def __init__(self, label: str):
+        self.label = label
+        self.keys = []
+        self.columns = {}
+        self.aliases = {}  # alias -> row
+        self.collisions = []  # (key, previous curie, new curie) of replaced nodes
+        self.version = 0  # changed by every write, to know when lookups are stale
+        self._rows = {}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def __contains__(self, key) -> bool:
+        return key in self._rows
+
+    def __iter__(self):
+        return iter(self.keys)
+
+    def __getitem__(self, key) -> dict:
+        return self.properties(self._rows[key])
+
+    def row(self, key) -> int:
+        return self._rows[key]
+
+    def properties(self, row: int) -> dict:
+        return {
+            name: column[row]
+            for name, column in self.columns.items()
+            if column[row] is not None
+        }
+
+    def _intern(self, key) -> int:
+        if key not in self._rows:
+            self._rows[key] = len(self.keys)
+            self.keys.append(key)
+            for column in self.columns.values():
+                column.append(None)
+        return self._rows[key]
+
+    def _assign(self, row: int, properties: dict):
+        self.version += 1
+        for name, value in properties.items():
+            if name not in self.columns:
+                self.columns[name] = [None] * len(self.keys)
+            self.columns[name][row] = value
+
+    def set(self, key, properties: dict) -> int:
+        """Add or replace all properties of the node with that key, returning its row.
+
+        Replacing a node with another curie is recorded as a collision.
+        """
+        new = key not in self._rows
+        row = self._intern(key)
+
+        if not new:
+            curies = self.columns.get('curie')
+            curie = curies[row] if curies else None
+            if curie != properties.get('curie'):
+                self.collisions.append((key, curie, properties.get('curie')))
+            for column in self.columns.values():
+                column[row] = None
+
+        self._assign(row, properties)
+        return row
+
+    def update(self, key, properties: dict) -> int:
+        """Add properties to an existing node, returning its row."""
+        row = self._rows[key]
+        self._assign(row, properties)
+        return row
+
+    def fill(self, key, properties: dict) -> int:
+        """Add a node, or the properties the node with that key does not have yet.
+
+        Returns the row of the node.
+        """
+        row = self._intern(key)
+        self._assign(row, {
+            name: value for name, value in properties.items()
+            if name not in self.columns or self.columns[name][row] is None
+        })
+        return row
+
+    def add_alias(self, key, alias):
+        """Make :meth:`NodeRegistry.lookup` find the node with ``key`` by ``alias``.
+
+        The curies in the properties of ``ALIAS_PROPERTIES`` are aliases already.
+        """
+        self.aliases[alias] = self._rows[key]
+        self.version += 1
+
+    def items(self):
+        """Yield ``(key, properties)`` of all nodes in the order they were added."""
+        for row, key in enumerate(self.keys):
+            yield key, self.properties(row)
+
+
+class NodeRegistry:
+    """Nodes of all labels, keyed as in the loaders, looked up by curie, name or alias.
+
+    ``registry[label]`` is the :class:`LabelTable` of a label, created on first
+    use. Name lookups ignore case, and names shared by nodes with different curies
+    are reported by :meth:`report` with the replaced nodes.
+    """
+
+    def __init__(self, labels: list = ()):
+        self.tables = {}
+        self._lookups = None
+        self._lookups_version = None
+        self.add_labels(*labels)
+
+    def add_labels(self, *labels: str):
+        """Create empty tables, so labels are written in this order."""
+        for label in labels:
+            self[label]
+
+    def __getitem__(self, label: str) -> LabelTable:
+        if label not in self.tables:
+            self.tables[label] = LabelTable(label)
+        return self.tables[label]
+
+    def __iter__(self):
+        return iter(self.tables)
+
+    def __len__(self) -> int:
+        return sum(len(table) for table in self.tables.values())
+
+    def merge(self, other: 'NodeRegistry') -> 'NodeRegistry':
+        """Add the nodes of ``other``, replacing those with the same label and key."""
+        for label, table in other.tables.items():
+            target = self[label]
+            target.collisions.extend(table.collisions)
+            for key, properties in table.items():
+                target.set(key, properties)
+            for alias, row in table.aliases.items():
+                target.add_alias(table.keys[row], alias)
+        return self
+
+    def _build_lookups(self) -> dict:
+        lookups = {by: {} for by in LOOKUPS}
+
+        for label, table in self.tables.items():
+            for by in ('curie', 'name'):
+                for row, value in enumerate(table.columns.get(by) or ()):
+                    if isinstance(value, str):
+                        value = value.lower() if by == 'name' else value
+                        found = lookups[by].setdefault(value, [])
+                        found.append((label, table.keys[row]))
+
+            aliases = list(table.aliases.items())
+            for name in ALIAS_PROPERTIES:
+                column = table.columns.get(name, ())
+                aliases.extend(
+                    (alias, row) for row, alias in enumerate(column) if alias
+                )
+
+            for alias, row in aliases:
+                lookups['alias'].setdefault(alias, []).append((label, table.keys[row]))
+
+        return lookups
+
+    def lookup(self, value: str, by: str = 'curie') -> list:
+        """Return the ``(label, key)`` of the nodes with a curie, name or alias."""
+        if by not in LOOKUPS:
+            raise ValueError(f'lookup should be one of {LOOKUPS}, not {by}')
+
+        version = tuple((label, table.version) for label, table in self.tables.items())
+        if self._lookups_version != version:
+            self._lookups = self._build_lookups()
+            self._lookups_version = version
+
+        return self._lookups[by].get(value.lower() if by == 'name' else value, [])
+
+    def name_collisions(self) -> dict:
+        """Names, ignoring case, shared by nodes of one label with different curies."""
+        collisions = {}
+
+        for label, table in self.tables.items():
+            names, curies = table.columns.get('name'), table.columns.get('curie')
+            if names is None or curies is None:
+                continue
+
+            found = {}
+            for name, curie in zip(names, curies):
+                if isinstance(name, str) and curie is not None:
+                    found.setdefault(name.lower(), set()).add(curie)
+
+            for name, name_curies in found.items():
+                if len(name_curies) > 1:
+                    collisions[(label, name)] = sorted(name_curies)
+
+        return collisions
+
+    def report(self) -> dict:
+        """Log and return the replaced nodes by label and the name collisions."""
+        replaced = {
+            label: table.collisions
+            for label, table in self.tables.items()
+            if table.collisions
+        }
+        names = self.name_collisions()
+
+        for label, collisions in replaced.items():
+            logger.warning(
+                f'{len(collisions)} {label} nodes replaced by a node with the same key'
+            )
+            for key, previous, new in collisions[:10]:
+                logger.warning(f'  {key}: {previous} replaced by {new}')
+
+        if names:
+            logger.warning(f'{len(names)} names shared by nodes with different curies')
+            for (label, name), curies in list(names.items())[:10]:
+                logger.warning(f'  {label} {name}: {", ".join(curies)}')
+
+        return {'replaced': replaced, 'names': names}
@@ -3,220 +3,155 @@
 """Script for ingestion of relations from new sources"""
 
 import pandas as pd
-from tqdm import tqdm
 
-from py2neo import Relationship
-from constants import PATHOGEN_MAPPER
+from identity import CompoundIndex, curies, pubchem_curies
+from pathogens import PathogenNormalizer
+from units import MIC_COLUMNS, normalize_mic
+from writer import GraphWriter
 
+CHEMBL_ASSAY_URL = 'https://www.ebi.ac.uk/chembl/assay_report_card/'
 
-def add_base_data(df: pd.DataFrame, node_mapping_dict: dict, tx):
+
+def _melt_edges(df: pd.DataFrame, start: str, prefix: str) -> pd.DataFrame:
+    """Turn wide ``<prefix>_<n>`` columns into a deduplicated start/end edge table."""
+    columns = [column for column in df.columns if column.startswith(prefix + '_')]
+
+    edges = df.melt(id_vars=[start], value_vars=columns, value_name='end')
+    edges = edges.rename(columns={start: 'start'})[['start', 'end']]
+    return edges.dropna().drop_duplicates()
+
+
+def add_base_data(df: pd.DataFrame, writer: GraphWriter):
     """Add basic member related information"""
 
-    for rows in tqdm(df.values, desc="Populating graph"):
-        (
-            person_name,
-            institute_name,
-            project_1_name,
-            project_2_name,
-            pathogen_1_name,
-            pathogen_2_name,
-            pathogen_3_name,
-            skill_1_name,
-            skill_2_name,
-            skill_3_name,
-            skill_4_name,
-        ) = rows
-
-        # Person - [WORKS_AT] -> Institute
-        person_node = node_mapping_dict["Person"][person_name]
-        institute_node = node_mapping_dict["Institute"][institute_name]
-        works_at = Relationship(person_node, "WORKS_AT", institute_node)
-        tx.create(works_at)
-
-        # Peron - [IS_INVOLVED_IN] -> Project + Institute -[SUPERVISES] -> Project
-        if pd.notna(project_1_name):
-            project_1_node = node_mapping_dict["Project"][project_1_name]
-            involved_in = Relationship(person_node, "IS_INVOLVED_IN", project_1_node)
-            tx.create(involved_in)
-
-            supervises = Relationship(institute_node, "SUPERVISES", project_1_node)
-            tx.create(supervises)
-
-        if pd.notna(project_2_name) and project_2_name != project_1_name:
-            project_2_node = node_mapping_dict["Project"][project_2_name]
-            involved_in = Relationship(person_node, "IS_INVOLVED_IN", project_2_node)
-            tx.create(involved_in)
-
-        # Peron - [HAS_SKILL] -> Skill
-        if pd.notna(skill_1_name):
-            skill_1_node = node_mapping_dict["Skill"][skill_1_name]
-            has_skill = Relationship(person_node, "HAS_SKILL", skill_1_node)
-            tx.create(has_skill)
-
-        if pd.notna(skill_2_name) and skill_2_name != skill_1_name:
-            skill_2_node = node_mapping_dict["Skill"][skill_2_name]
-            has_skill = Relationship(person_node, "HAS_SKILL", skill_2_node)
-            tx.create(has_skill)
-
-        if (
-            pd.notna(skill_3_name)
-            and skill_3_name != skill_2_name
-            and skill_3_name != skill_1_name
-        ):
-            skill_3_node = node_mapping_dict["Skill"][skill_3_name]
-            has_skill = Relationship(person_node, "HAS_SKILL", skill_3_node)
-            tx.create(has_skill)
-
-        # Peron - [WORKS_WITH] -> Pathogen
-        if pd.notna(pathogen_1_name):
-            pathogen_1_node = node_mapping_dict["Pathogen"][pathogen_1_name]
-            works_with = Relationship(person_node, "WORKS_WITH", pathogen_1_node)
-            tx.create(works_with)
-
-        if pd.notna(pathogen_2_name) and pathogen_2_name != pathogen_1_name:
-            pathogen_2_node = node_mapping_dict["Pathogen"][pathogen_2_name]
-            works_with = Relationship(person_node, "WORKS_WITH", pathogen_2_node)
-            tx.create(works_with)
-
-        if (
-            pd.notna(pathogen_3_name)
-            and pathogen_3_name != pathogen_1_name
-            and pathogen_3_name != pathogen_2_name
-        ):
-            pathogen_3_node = node_mapping_dict["Pathogen"][pathogen_3_name]
-            works_with = Relationship(person_node, "WORKS_WITH", pathogen_3_node)
-            tx.create(works_with)
-
-
-def add_chembl_data(df: pd.DataFrame, node_mapping_dict: dict, tx):
-    """Add ChEMBL Data"""
-    for row in tqdm(df.values, desc='Adding MIC relations'):
-        (
-            compound_name,
-            chembl_id,  # not needed
-            assay_rel,
-            assay_type,
-            strain,
-            assay_id,
-            mic_val
-        ) = row
-
-        if strain not in node_mapping_dict['Pathogen']:  # Omitted as no one works with that strain
-            continue
-
-        bact_node = node_mapping_dict['Pathogen'][strain]
-        chem_node = node_mapping_dict['ChEMBL'][compound_name]
-
-        assay_property = {}
-        if pd.notna(assay_id):
-            assay_property['ChEMBL Assay'] = f'https://www.ebi.ac.uk/chembl/assay_report_card/{assay_id}/'
-
-        if pd.isna(mic_val) and pd.isna(assay_rel):
-            continue
-
-        assay_property['MIC'] = str(assay_rel) + str(mic_val)
-
-        assay_in = Relationship(
-            bact_node,
-            'ASSAY IN',
-            chem_node,
-            **assay_property
-        )
-        tx.create(assay_in)
+    # Person - [WORKS_AT] -> Institute
+    works_at = df[['contact', 'institute']].set_axis(['start', 'end'], axis=1)
+    works_at = works_at.drop_duplicates()
+    writer.add_relationships('Person', 'WORKS_AT', 'Institute', works_at)
 
+    # Peron - [IS_INVOLVED_IN] -> Project
+    involved_in = _melt_edges(df, start='contact', prefix='project')
+    writer.add_relationships('Person', 'IS_INVOLVED_IN', 'Project', involved_in)
 
-def add_spark_data(df: pd.DataFrame, node_mapping_dict: dict, tx):
-    """Add SPARK IC50 Data"""
-    for row in tqdm(df.values, desc='Adding SPARK relations'):
-        (
-            spark_id,
-            smiles,
-            pubmed_id,
-            mic_val,
-            specie,
-            doi,
-            pubchem_id,
-            chembl_id,
-        ) = row
-
-        if specie not in node_mapping_dict['Pathogen']:  # Omitted as no one works with that strain
-            continue
-
-        bact_node = node_mapping_dict['Pathogen'][specie]
-        try:
-            chem_node = node_mapping_dict['SPARK'][spark_id]
-        except KeyError:
-            try:
-                if pd.notna(chembl_id):
-                    chem_node = node_mapping_dict['ChEMBL'][chembl_id]
-                else:
-                    chem_node = node_mapping_dict['PubChem'][pubchem_id.split('.')[0]]
-            except KeyError:
-                continue
-
-        assay_property = {}
-
-        if pd.notna(mic_val):
-            assay_property['MIC'] = f'{mic_val} microM'
-
-        if pd.notna(pubmed_id):
-            assay_property['Literature'] = f'https://pubmed.ncbi.nlm.nih.gov/{pubmed_id}/'
-
-        if pd.notna(doi):
-            assay_property['DOI'] = doi
-
-        assay_in = Relationship(
-            bact_node,
-            'ASSAY IN',
-            chem_node,
-            **assay_property
-        )
-        tx.create(assay_in)
+    # Peron - [HAS_SKILL] -> Skill
+    has_skill = _melt_edges(df, start='contact', prefix='skill')
+    writer.add_relationships('Person', 'HAS_SKILL', 'Skill', has_skill)
 
+    # Peron - [WORKS_WITH] -> Pathogen
+    works_with = _melt_edges(df, start='contact', prefix='pathogen')
+    writer.add_relationships('Person', 'WORKS_WITH', 'Pathogen', works_with)
 
-def add_drug_central_data(df: pd.DataFrame, node_mapping_dict: dict, tx):
-    """Add DrugCentral Data"""
 
-    # Map bacteria names to those in KG
-    df['ORGANISM'] = df['ORGANISM'].map(lambda x: PATHOGEN_MAPPER.get(x))
-
-    for row in tqdm(df.values, desc='Adding DrugCentral data'):
-        (
-            drug_id,
-            activity_value,
-            activity_unit,
-            activity_type,
-            source,
-            pathogen
-        ) = row
-
-        if pathogen not in node_mapping_dict['Pathogen']:  # Omitted as no one works with that strain
-            continue
-
-        bact_node = node_mapping_dict['Pathogen'][pathogen]
-
-        try:
-            chem_node = node_mapping_dict['PubChem'][drug_id]
-        except KeyError:
-            try:
-                chem_node = node_mapping_dict['DrugCentral'][drug_id]
-            except KeyError:
-                continue
-
-        assay_property = {}
-
-        if pd.notna(activity_type):
-            assay_property[f'{activity_type}'] = f'{activity_value} + {activity_unit}'
-
-        if pd.notna(source):
-            assay_property['Literature'] = source
-
-        assay_in = Relationship(
-            bact_node,
-            'ASSAY IN',
-            chem_node,
-            **assay_property
+def _write_assays(edges: pd.DataFrame, writer: GraphWriter):
+    """Write ``ASSAY IN`` edges to the label of their compound key.
+
+    Edges of unknown compounds are skipped.
+    """
+    edges = edges[edges['end'].notna()]
+    labels = CompoundIndex.labels(edges['end'])
+
+    for chem_label in labels.dropna().unique():
+        writer.add_relationships(
+            'Pathogen', 'ASSAY IN', chem_label, edges[labels == chem_label]
         )
-        tx.create(assay_in)
 
 
+def add_chembl_data(
+    df: pd.DataFrame,
+    writer: GraphWriter,
+    index: CompoundIndex,
+    pathogens: PathogenNormalizer
+):
+    """Add ChEMBL Data"""
+
+    # Map strains to the pathogens in KG, omitting those no one works with
+    pathogen = pathogens.normalize(df['strain'])
+    df, pathogen = df[pathogen.notna()], pathogen[pathogen.notna()]
+    mic_val = df['standard_value'] + df['standard_units']
+    keep = mic_val.notna() | df['standard_relation'].notna()
+    df, mic_val, pathogen = df[keep], mic_val[keep], pathogen[keep]
+
+    mic = normalize_mic(
+        df['standard_value'],
+        units=df['standard_units'],
+        relations=df['standard_relation'],
+    )
+
+    edges = pd.DataFrame({
+        'start': pathogen,
+        'end': index.canonical(curies('chembl', df['chembl_id'])),
+        'Source': 'ChEMBL',
+        'ChEMBL Assay': CHEMBL_ASSAY_URL + df['assay_id'] + '/',
+        'MIC': df['standard_relation'].fillna('') + mic_val.fillna(''),
+        **mic[MIC_COLUMNS],
+    })
+    _write_assays(edges, writer)
+
+
+def add_spark_data(
+    df: pd.DataFrame,
+    writer: GraphWriter,
+    index: CompoundIndex,
+    pathogens: PathogenNormalizer
+):
+    """Add SPARK IC50 Data"""
+
+    # Map strains to the pathogens in KG, omitting those no one works with
+    pathogen = pathogens.normalize(df['Curated & Transformed MIC Data: Species'])
+    df, pathogen = df[pathogen.notna()], pathogen[pathogen.notna()]
+
+    # The compound of the first known id, as in sources.add_spark
+    key = index.first_known(
+        curies('chembl', df['chembl']),
+        pubchem_curies(df['pubchem']),
+        curies('spark', df['Compound Name'])
+    )
+
+    mic_val = df['Curated & Transformed MIC Data: MIC (in microM) (microM)']
+    mic = normalize_mic(mic_val, units='microM')
+
+    edges = pd.DataFrame({
+        'start': pathogen,
+        'end': key,
+        'Source': 'SPARK',
+        'MIC': mic_val + ' microM',
+        'Literature': 'https://pubmed.ncbi.nlm.nih.gov/' + df['PubMed ID'] + '/',
+        'DOI': df['Curated & Transformed MIC Data: DOI'],
+        **mic[MIC_COLUMNS],
+    })
+
+    _write_assays(edges, writer)
+
+
+def add_drug_central_data(
+    df: pd.DataFrame,
+    writer: GraphWriter,
+    index: CompoundIndex,
+    pathogens: PathogenNormalizer
+):
+    """Add DrugCentral Data"""
+
+    # Map bacteria names to the pathogens in KG, omitting those no one works with
+    pathogen = pathogens.normalize(df['ORGANISM'])
+    df, pathogen = df[pathogen.notna()], pathogen[pathogen.notna()]
+
+    # MIC activities are normalized like the MIC values of the other sources
+    is_mic = df['ACT_TYPE'].eq('MIC')
+    mic = normalize_mic(df['ACT_VALUE'].where(is_mic), units=df['ACT_UNIT'])
+
+    edges = pd.DataFrame({
+        'start': pathogen,
+        'end': index.canonical(curies('drug.central', df['STRUCT_ID'])),
+        'Source': 'DrugCentral',
+        'Literature': df['ACT_SOURCE_URL'],
+        **mic[MIC_COLUMNS],
+    })
+
+    # The activity type (e.g. IC50, Ki) is the name of the property, MIC values are
+    # kept apart from the differently formatted MIC of ChEMBL and SPARK
+    activity = df['ACT_VALUE'].map(str) + ' + ' + df['ACT_UNIT'].map(str)
+    for activity_type in df['ACT_TYPE'].dropna().unique():
+        name = 'DrugCentral MIC' if activity_type == 'MIC' else activity_type
+        edges[name] = activity.where(df['ACT_TYPE'] == activity_type)
+
+    _write_assays(edges, writer)
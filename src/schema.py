@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+"""Constraints and indexes created before loading, in the server version syntax"""
+
+import logging
+
+from py2neo import Graph
+
+from constants import NODE_INDEXES, NODE_KEYS, SCHEMA_TIMEOUT, TEXT_INDEXES
+
+logger = logging.getLogger(__name__)
+
+# Version of the neo4j-admin import files written by CsvWriter
+IMPORT_VERSION = (5, 0)
+
+# Schema of the labels of the KG loaded by amr.py, see populate_db
+KG_SCHEMA = {
+    'node_keys': NODE_KEYS,
+    'node_indexes': NODE_INDEXES,
+    'text_indexes': TEXT_INDEXES,
+}
+
+
+def server_version(conn: Graph) -> tuple:
+    """Return the Neo4j version as a tuple of integers, e.g. ``(4, 2, 5)``."""
+    version = conn.run(
+        'CALL dbms.components() YIELD versions RETURN versions[0] AS version'
+    ).evaluate()
+    return tuple(int(part) for part in version.split('-')[0].split('.'))
+
+
+def schema_statements(
+    version: tuple,
+    unique: bool,
+    node_keys: dict = NODE_KEYS,
+    node_indexes: dict = NODE_INDEXES,
+    text_indexes: dict = TEXT_INDEXES
+) -> list:
+    """Return the Cypher statements declaring the schema of the KG.
+
+    With ``unique``, the key property of each label gets a uniqueness constraint,
+    otherwise a lookup index. Loads that ``CREATE`` nodes can hold duplicate keys,
+    which a constraint would reject. Text indexes need Neo4j 4.4.
+    """
+    statements = []
+
+    for label, key in node_keys.items():
+        index = f'{label.lower()}_{key}_index'
+        constraint = f'{label.lower()}_{key}_unique'
+
+        if not unique:
+            statements.append(
+                f'CREATE INDEX {index} IF NOT EXISTS FOR (n:`{label}`) ON (n.`{key}`)'
+            )
+        elif version >= (4, 4):
+            # A constraint cannot be added next to an index on the same property
+            statements.append(f'DROP INDEX {index} IF EXISTS')
+            statements.append(
+                f'CREATE CONSTRAINT {constraint} IF NOT EXISTS '
+                f'FOR (n:`{label}`) REQUIRE n.`{key}` IS UNIQUE'
+            )
+        else:
+            statements.append(f'DROP INDEX {index} IF EXISTS')
+            statements.append(
+                f'CREATE CONSTRAINT {constraint} IF NOT EXISTS '
+                f'ON (n:`{label}`) ASSERT n.`{key}` IS UNIQUE'
+            )
+
+    for label, properties in node_indexes.items():
+        for prop in properties:
+            statements.append(
+                f'CREATE INDEX {label.lower()}_{prop}_index IF NOT EXISTS '
+                f'FOR (n:`{label}`) ON (n.`{prop}`)'
+            )
+
+    if version >= (4, 4):
+        for label, properties in text_indexes.items():
+            for prop in properties:
+                statements.append(
+                    f'CREATE TEXT INDEX {label.lower()}_{prop}_text IF NOT EXISTS '
+                    f'FOR (n:`{label}`) ON (n.`{prop}`)'
+                )
+
+    return statements
+
+
+def provision_schema(
+    conn: Graph, unique: bool, timeout: int = SCHEMA_TIMEOUT, **kwargs
+):
+    """Create the constraints and indexes of the KG and wait until they are online.
+
+    Indexes are populated in the background, so waiting makes the first lookups
+    of the load seeks instead of label scans.
+    """
+    statements = schema_statements(server_version(conn), unique=unique, **kwargs)
+
+    # Schema changes cannot share a transaction with the data
+    for statement in statements:
+        conn.run(statement)
+
+    conn.run('CALL db.awaitIndexes($timeout)', timeout=timeout)
+    logger.info(f'Provisioned {len(statements)} schema statements')
+
+
+def write_schema(path: str, version: tuple = IMPORT_VERSION, **kwargs) -> str:
+    """Write the schema as a Cypher script, to run after ``neo4j-admin`` import."""
+    statements = schema_statements(version, unique=False, **kwargs)
+    statements.append(f'CALL db.awaitIndexes({SCHEMA_TIMEOUT})')
+
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(';\n'.join(statements) + ';\n')
+
+    return path
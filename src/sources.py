@@ -5,180 +5,317 @@
 import os
 import pandas as pd
 from tqdm import tqdm
-from pubchempy import Compound, get_compounds
-from py2neo import Node
-from constants import DATA_DIR, ENCODING, PATHOGEN_MAPPER
-
+from constants import CHUNK_SIZE, DATA_DIR
+from identity import (
+    COMPOUND_LABELS,
+    IDENTIFIER_PROPERTIES,
+    CompoundIndex,
+    compound_properties,
+    curies,
+    inchikeys,
+    prefix,
+    pubchem_curies,
+)
+from pathogens import PathogenNormalizer
+from pubchem import OfflineCacheMiss, PubChemResolver
+from registry import NodeRegistry
+from staging import read_source
+
+
+def read_chembl_dump(
+    pathogens: PathogenNormalizer,
+    usecols: list,
+    chunksize: int = CHUNK_SIZE
+):
+    """Stream the ChEMBL MIC dump in chunks, keeping rows of strains of known pathogens.
 
-def add_chembl(interested_pathogen, node_dict, tx):
-    """Add ChEMBL data"""
+    Without a ``chunksize`` the whole dump is read as a single chunk.
+    """
 
-    mic_df = pd.read_csv(
-        os.path.join(DATA_DIR, 'MIC', 'data_dump_31.tsv'),
-        sep='\t',
-        dtype=str,
-        usecols=[
-            'strain',
-            'pref_name',
-            'chembl_id',
-        ],
-        encoding=ENCODING,
+    mic_df = read_source(
+        'MIC/data_dump_31.tsv',
+        columns=usecols,
+        filter_values=pathogens.matches,
+        chunksize=chunksize or None
     )
 
-    mic_df = mic_df.loc[mic_df['strain'].isin(interested_pathogen)]
-    mic_df.drop('strain', axis=1, inplace=True)
-    mic_df.drop_duplicates(inplace=True)
+    return iter([mic_df]) if isinstance(mic_df, pd.DataFrame) else mic_df
 
-    chembl_to_node_map = {}
 
-    # Create chemical nodes
-    for name, chembl_id in tqdm(mic_df.values):
-        chemical_property = {}
+def read_chembl(
+    pathogens: PathogenNormalizer, chunksize: int = CHUNK_SIZE
+) -> pd.DataFrame:
+    """Read the distinct compounds of the ChEMBL dump tested on known pathogens."""
 
-        if pd.notna(chembl_id):
-            chemical_property['curie'] = 'chembl:' + chembl_id
-            chemical_property['info'] = f'https://www.ebi.ac.uk/chembl/compound_report_card/{chembl_id}/'
-            chembl_to_node_map[chembl_id] = name.title() if pd.notna(name) else '' # To merge duplicates in chembl
+    chunks = read_chembl_dump(
+        pathogens=pathogens,
+        usecols=['pref_name', 'chembl_id'],
+        chunksize=chunksize
+    )
 
-        if pd.notna(name):
-            chemical_property['name'] = name.title()
+    # Duplicates across chunks, in the order of the whole dump
+    tables = [
+        mic_df.drop_duplicates()
+        for mic_df in tqdm(chunks, desc='Reading ChEMBL chunks')
+    ]
+    if not tables:
+        return pd.DataFrame(columns=['pref_name', 'chembl_id'])
 
-        node_dict['ChEMBL'][name] = Node('ChEMBL', **chemical_property)
-        tx.create(node_dict['ChEMBL'][name])
+    return pd.concat(tables, ignore_index=True).drop_duplicates(ignore_index=True)
 
-    return node_dict, chembl_to_node_map
 
+def read_spark(pathogens: PathogenNormalizer) -> pd.DataFrame:
+    """Read the compounds of the SPARK data tested on known pathogens."""
 
-def add_spark(
-    interested_pathogen: set,
-    node_dict: dict,
-    chembl_to_node_map: dict
-):
-    spark_df = pd.read_csv(
-        os.path.join(DATA_DIR, 'SPARK', 'processed_mic_data.tsv'),
-        sep='\t',
-        dtype=str,
-        usecols=[
+    spark_df = read_source(
+        'SPARK/processed_mic_data.tsv',
+        columns=[
             'Compound Name',
             'SMILES',
             'Curated & Transformed MIC Data: Species',
             'pubchem',
             'chembl'
-        ]
+        ],
+        filter_values=pathogens.matches
     )
-    spark_df = spark_df[spark_df['Curated & Transformed MIC Data: Species'].isin(interested_pathogen)]
     spark_df.drop('Curated & Transformed MIC Data: Species', axis=1, inplace=True)
 
     spark_df.drop_duplicates(inplace=True)
+    return spark_df
 
-    if spark_df.empty:
-        return node_dict
 
-    for spark_id, smiles, pubchem_id, chembl_id in tqdm(
-        spark_df.values, desc='Getting information from SPARK data'
-    ):
-        chemical_property = {}
+def prefetch_pubchem(
+    spark_df: pd.DataFrame,
+    drug_central_df: pd.DataFrame,
+    resolver: PubChemResolver
+):
+    """Resolve the PubChem ids of SPARK and the DrugCentral names concurrently.
+
+    All lookups of a load go through this one call, so that they share the rate
+    limit of ``resolver``.
+    """
+    resolver.prefetch(
+        cids=spark_df['pubchem'].dropna().map(lambda x: x.split('.')[0]),
+        names=drug_central_df['DRUG_NAME'].dropna()
+    )
 
-        if pd.notna(smiles):
-            chemical_property['SMILES'] = smiles
 
-        name = chembl_id  # Set default
+def read_drug_central(pathogens: PathogenNormalizer) -> pd.DataFrame:
+    """Read the DrugCentral compounds tested on known pathogens."""
+
+    drug_central_df = read_source(
+        'drug_central/drug.target.interaction.tsv',
+        columns=[
+            'DRUG_NAME',
+            'STRUCT_ID',
+            'ACT_VALUE',
+            'ACT_UNIT',
+            'ACT_TYPE',
+            'ACT_SOURCE_URL',
+            'ORGANISM'
+        ],
+        filter_values=pathogens.matches
+    )
+
+    drug_central_df = drug_central_df[['DRUG_NAME', 'STRUCT_ID']].drop_duplicates()
 
-        if pd.notna(pubchem_id):  # id stored in float format
-            pubchem_id = pubchem_id.split('.')[0]
+    if not drug_central_df.empty:
+        drug_central_df.to_csv(
+            os.path.join(DATA_DIR, 'drug_central', 'drug_target_filtered.tsv'),
+            sep='\t',
+            index=False
+        )
+    return drug_central_df
 
-        if pd.isna(chembl_id) and pd.isna(pubchem_id):
-            if spark_id in node_dict['SPARK']:
-                continue
 
-            if pd.notna(spark_id):
-                chemical_property['curie'] = 'spark:' + spark_id
+def search_drug_central(
+    drug_central_df: pd.DataFrame,
+    resolver: PubChemResolver
+) -> pd.DataFrame:
+    """Add the first PubChem CID of the name of each DrugCentral compound.
+
+    The names are looked up by :func:`prefetch_pubchem` beforehand.
+    """
+    if drug_central_df.empty:
+        return drug_central_df.assign(pubchem=pd.Series(dtype=object))
 
-            node_dict['SPARK'][spark_id] = Node('SPARK', **chemical_property)
+    def _search(drug_name):
+        try:
+            pubchem_ids = resolver.search_name(drug_name)
+        except OfflineCacheMiss:
+            raise
+        except Exception:
+            pubchem_ids = []
+        return str(pubchem_ids[0]) if len(pubchem_ids) > 0 else None
+
+    names = tqdm(drug_central_df['DRUG_NAME'], desc='Searching DrugCentral names')
+    return drug_central_df.assign(pubchem=[_search(drug_name) for drug_name in names])
+
+
+def compound_identifiers(
+    chembl_df: pd.DataFrame,
+    spark_df: pd.DataFrame,
+    drug_central_df: pd.DataFrame
+) -> list:
+    """Tables of the curies of each compound record of the sources.
+
+    They are the input of :class:`identity.CompoundIndex`.
+    """
+    return [
+        pd.DataFrame({'chembl': curies('chembl', chembl_df['chembl_id'])}),
+        pd.DataFrame({
+            'chembl': curies('chembl', spark_df['chembl']),
+            'pubchem': pubchem_curies(spark_df['pubchem']),
+            'spark': curies('spark', spark_df['Compound Name']),
+            'inchikey': inchikeys(spark_df['SMILES']),
+        }),
+        pd.DataFrame({
+            'drug.central': curies('drug.central', drug_central_df['STRUCT_ID']),
+            'pubchem': curies('pubchem', drug_central_df['pubchem']),
+        }),
+    ]
+
+
+def build_compound_index(
+    chembl_df: pd.DataFrame,
+    spark_df: pd.DataFrame,
+    drug_central_df: pd.DataFrame
+) -> CompoundIndex:
+    """Resolve the compounds of all sources to one key each.
+
+    See :class:`identity.CompoundIndex`.
+    """
+    index = CompoundIndex(compound_identifiers(chembl_df, spark_df, drug_central_df))
+
+    merged = index.merged()
+    print(f'Resolved {len(index)} compound identifiers to '
+          f'{index.keys.nunique()} compounds, '
+          f'{len(merged)} known by several identifiers')
+    return index
+
+
+def _add_compound(
+    registry: NodeRegistry, key: str, identifiers: list, properties: dict
+):
+    """Add a compound node, or the properties it does not have yet.
+
+    The other identifiers of the record are kept as ``IDENTIFIER_PROPERTIES``,
+    or as aliases if the node already has one of that kind.
+    """
+    table = registry[COMPOUND_LABELS[prefix(key)]]
+    table.fill(key, {**compound_properties(key), **properties})
+
+    node = table[key]
+    for identifier in identifiers:
+        if not isinstance(identifier, str) or identifier == key:
+            continue
+        if prefix(identifier) not in IDENTIFIER_PROPERTIES:
+            continue
+
+        name = IDENTIFIER_PROPERTIES[prefix(identifier)]
+        if name not in node:
+            table.update(key, {name: identifier})
+            node[name] = identifier
+        elif node[name] != identifier:
+            table.add_alias(key, identifier)
+
+
+def add_chembl(chembl_df: pd.DataFrame, registry: NodeRegistry, index: CompoundIndex):
+    """Add ChEMBL data"""
 
-        elif pd.notna(chembl_id):  # If chembl id exists (higher priority)
-            chemical_property['Spark ID'] = 'spark:' + spark_id
+    chembl_ids = curies('chembl', chembl_df['chembl_id'])
 
-            if pd.notna(pubchem_id):
-                chemical_property['PubChem ID'] = 'pubchem:' + pubchem_id
-                chemical_property['info'] = f'https://pubchem.ncbi.nlm.nih.gov/compound/{pubchem_id}'
-                name = Compound.from_cid(pubchem_id).synonyms[0]
+    # Create chemical nodes
+    keys = index.canonical(chembl_ids)
+    for name, chembl_id, key in zip(chembl_df['pref_name'], chembl_ids, keys):
+        if pd.isna(key):
+            continue
 
-            if chembl_id in chembl_to_node_map:
-                chembl_node_name = chembl_to_node_map[chembl_id]  # Get name of node
-                node_dict['ChEMBL'][chembl_node_name].update(chemical_property)
-            else:
-                chemical_property['curie'] = 'chembl' + chembl_id
-                chemical_property['info'] = f'https://www.ebi.ac.uk/chembl/compound_report_card/{chembl_id}/'
-                chemical_property['name'] = name
-                node_dict['ChEMBL'][name] = Node('ChEMBL', **chemical_property)
-        else:  # If pubchem id exists
-            chemical_property['Spark ID'] = 'spark:' + spark_id
-            name = Compound.from_cid(pubchem_id).iupac_name
+        chemical_property = {}
 
-            if pubchem_id in node_dict['PubChem']:
-                continue
+        if pd.notna(name):
+            chemical_property['name'] = name.title()
 
-            chemical_property['name'] = name
-            chemical_property['curie'] = 'pubchem:' + pubchem_id
-            chemical_property['info'] = f'https://pubchem.ncbi.nlm.nih.gov/compound/{pubchem_id}'
-            node_dict['PubChem'][pubchem_id] = Node('PubChem', **chemical_property)
+        _add_compound(registry, key, [chembl_id], chemical_property)
 
-    return node_dict
+    return registry
 
 
-def add_drug_central(
-    node_dict: dict,
+def add_spark(
+    spark_df: pd.DataFrame,
+    registry: NodeRegistry,
+    index: CompoundIndex,
+    resolver: PubChemResolver
 ):
-    drug_central_df = pd.read_csv(
-        os.path.join(DATA_DIR, 'drug_central', 'drug.target.interaction.tsv'),
-        sep='\t',
-        dtype=str,
-        usecols=[
-            'DRUG_NAME',
-            'STRUCT_ID',
-            'ACT_VALUE',
-            'ACT_UNIT',
-            'ACT_TYPE',
-            'ACT_SOURCE_URL',
-            'ORGANISM'
-        ]
-    )
+    if spark_df.empty:
+        return registry
 
-    drug_central_df = drug_central_df[drug_central_df['ORGANISM'].isin(PATHOGEN_MAPPER)]
-    drug_central_df.drop('ORGANISM', axis=1, inplace=True)
-    drug_central_df = drug_central_df[['DRUG_NAME', 'STRUCT_ID']]
-    drug_central_df.drop_duplicates(inplace=True)
+    chembl_ids = curies('chembl', spark_df['chembl'])
+    pubchem_ids = pubchem_curies(spark_df['pubchem'])
+    spark_ids = curies('spark', spark_df['Compound Name'])
+    keys = index.first_known(chembl_ids, pubchem_ids, spark_ids)
 
-    if drug_central_df.empty:
-        return node_dict
+    for smiles, chembl_id, pubchem_id, spark_id, key in tqdm(
+        zip(spark_df['SMILES'], chembl_ids, pubchem_ids, spark_ids, keys),
+        total=len(spark_df),
+        desc='Getting information from SPARK data'
+    ):
+        if pd.isna(key):
+            continue
 
-    drug_central_df.to_csv(
-        os.path.join(DATA_DIR, 'drug_central', 'drug_target_filtered.tsv'),
-        sep='\t',
-        index=False
-    )
+        chemical_property = {}
+
+        if pd.notna(smiles):
+            chemical_property['SMILES'] = smiles
+
+        if pd.notna(pubchem_id):
+            compound = resolver.compound(pubchem_id.split(':')[1])
+            if compound and pd.notna(chembl_id) and compound['synonym']:
+                chemical_property['name'] = compound['synonym']
+            elif compound and pd.isna(chembl_id) and compound['iupac_name']:
+                chemical_property['name'] = compound['iupac_name']
+
+        if pd.notna(chembl_id) and 'name' not in chemical_property:
+            chemical_property['name'] = chembl_id.split(':')[1]
+
+        identifiers = [chembl_id, pubchem_id, spark_id]
+        _add_compound(registry, key, identifiers, chemical_property)
+
+    return registry
+
+
+def add_drug_central(
+    drug_central_df: pd.DataFrame,
+    registry: NodeRegistry,
+    index: CompoundIndex,
+    resolver: PubChemResolver
+):
+    drug_central_ids = curies('drug.central', drug_central_df['STRUCT_ID'])
+    pubchem_ids = curies('pubchem', drug_central_df['pubchem'])
+
+    for drug_name, drug_central_id, pubchem_id, key in tqdm(
+        zip(
+            drug_central_df['DRUG_NAME'],
+            drug_central_ids,
+            pubchem_ids,
+            index.canonical(drug_central_ids),
+        ),
+        total=len(drug_central_df),
+        desc='Getting information from DrugCentral'
+    ):
+        if pd.isna(key):
+            continue
 
-    for drug_name, drug_central_id in tqdm(drug_central_df.values, desc='Getting information from DrugCentral'):
         chemical_property = {}
 
-        try:
-            pubchem_ids = get_compounds(identifier=drug_name, namespace='name')
-        except Exception:
-            pubchem_ids = []
+        if pd.notna(pubchem_id):
+            compound = resolver.compound(pubchem_id.split(':')[1])
+            if compound and compound['synonym']:
+                chemical_property['name'] = compound['synonym']
 
-        if len(pubchem_ids) > 0:
-            pubchem_id = pubchem_ids[0].cid
-            chemical_property['curie'] = 'pubchem:' + str(pubchem_id)
-            chemical_property['info'] = f'https://pubchem.ncbi.nlm.nih.gov/compound/{pubchem_id}'
-            chemical_property['DrugCentral ID'] = 'drug.central:' + drug_central_id
-            name = Compound.from_cid(pubchem_id).synonyms[0]
-            chemical_property['name'] = name
-            node_dict['PubChem'][drug_central_id] = Node('PubChem', **chemical_property)
-        else:
-            chemical_property['curie'] = 'drug.central:' + drug_central_id
-            chemical_property['info'] = f'https://drugcentral.org/drugcard/{drug_central_id}'
+        if pd.notna(drug_name) and 'name' not in chemical_property:
             chemical_property['name'] = drug_name
-            node_dict['DrugCentral'][drug_central_id] = Node('DrugCentral', **chemical_property)
 
-    return node_dict
+        _add_compound(registry, key, [drug_central_id, pubchem_id], chemical_property)
+
+    return registry
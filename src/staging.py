@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+
+"""Columnar staging of the source files, read in place of the text dumps
+
+Each source file is parsed once and written to ``STAGING_DIR`` as Parquet with
+only the columns the loaders use. Later runs read the Parquet file, projecting
+columns and filtering on the pathogen column while scanning. A staged file is
+used only while the size and modification time of its text file are unchanged,
+otherwise the text file is read as before. pyarrow is optional.
+"""
+
+import os
+import sys
+
+import pandas as pd
+
+from constants import CHUNK_SIZE, DATA_DIR, ENCODING, STAGING_DIR
+from metrics import measure, measured_chunks
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # Staging disabled, the text files are read
+    pa = None
+
+# Columns of each source file used by sources.py and relations.py, the column
+# the rows are filtered on, and the parser options of the text file
+STAGED_SOURCES = {
+    'MIC/data_dump_31.tsv': {
+        'columns': [
+            'pref_name',
+            'chembl_id',
+            'standard_relation',
+            'standard_value',
+            'standard_units',
+            'strain',
+            'assay_id',
+        ],
+        'filter': 'strain',
+        'sep': '\t',
+        'encoding': ENCODING,
+    },
+    'SPARK/processed_mic_data.tsv': {
+        'columns': [
+            'Compound Name',
+            'SMILES',
+            'Curated & Transformed MIC Data: Species',
+            'Curated & Transformed MIC Data: MIC (in microM) (microM)',
+            'Curated & Transformed MIC Data: DOI',
+            'PubMed ID',
+            'pubchem',
+            'chembl',
+        ],
+        'filter': 'Curated & Transformed MIC Data: Species',
+        'sep': '\t',
+        'encoding': ENCODING,
+    },
+    'drug_central/drug.target.interaction.tsv': {
+        'columns': [
+            'DRUG_NAME',
+            'STRUCT_ID',
+            'ACT_VALUE',
+            'ACT_UNIT',
+            'ACT_TYPE',
+            'ACT_SOURCE_URL',
+            'ORGANISM',
+        ],
+        'filter': 'ORGANISM',
+        'sep': '\t',
+        'encoding': 'utf-8',
+    },
+}
+
+_STAT_KEY = b'amr_kg_source_stat'
+
+
+def _staged_path(file_name: str, staging_dir: str) -> str:
+    stem = os.path.splitext(file_name)[0]
+    return os.path.join(os.path.expanduser(staging_dir), stem + '.parquet')
+
+
+def _source_stat(path: str) -> bytes:
+    stat = os.stat(path)
+    return f'{stat.st_size}:{stat.st_mtime_ns}'.encode()
+
+
+def _is_fresh(source_path: str, staged_path: str) -> bool:
+    if pa is None or not os.path.exists(staged_path) or not os.path.exists(source_path):
+        return False
+
+    metadata = pq.read_schema(staged_path).metadata or {}
+    return metadata.get(_STAT_KEY) == _source_stat(source_path)
+
+
+def stage_source(
+    file_name: str,
+    data_dir: str = DATA_DIR,
+    staging_dir: str = STAGING_DIR,
+    force: bool = False
+) -> bool:
+    """Convert one source file to Parquet, ``False`` if it was already staged."""
+    if pa is None:
+        raise ImportError('pyarrow is required to stage the source files')
+
+    spec = STAGED_SOURCES[file_name]
+    source_path = os.path.join(os.path.expanduser(data_dir), file_name)
+    staged_path = _staged_path(file_name, staging_dir)
+
+    if not force and _is_fresh(source_path, staged_path):
+        return False
+
+    df = pd.read_csv(
+        source_path,
+        sep=spec['sep'],
+        dtype=str,
+        usecols=spec['columns'],
+        encoding=spec['encoding'],
+    )[spec['columns']]
+
+    schema = pa.schema(
+        [(column, pa.string()) for column in spec['columns']],
+        metadata={_STAT_KEY: _source_stat(source_path)}
+    )
+    table = pa.Table.from_pandas(df, schema=schema, preserve_index=False)
+
+    # Written to a temporary file first so an interrupted run leaves no partial file
+    os.makedirs(os.path.dirname(staged_path), exist_ok=True)
+    pq.write_table(table, staged_path + '.tmp', use_dictionary=True, compression='zstd')
+    os.replace(staged_path + '.tmp', staged_path)
+    return True
+
+
+def stage_sources(
+    data_dir: str = DATA_DIR,
+    staging_dir: str = STAGING_DIR,
+    force: bool = False
+):
+    """Stage every source file present in ``data_dir``."""
+    for file_name in STAGED_SOURCES:
+        if not os.path.exists(os.path.join(os.path.expanduser(data_dir), file_name)):
+            print(f'{file_name} not found, skipped')
+        elif stage_source(file_name, data_dir, staging_dir=staging_dir, force=force):
+            print(f'Staged {file_name}')
+        else:
+            print(f'{file_name} is up to date')
+
+
+def read_source(
+    file_name: str,
+    columns: list,
+    filter_values=None,
+    chunksize: int = None,
+    data_dir: str = DATA_DIR,
+    staging_dir: str = STAGING_DIR
+):
+    """Read ``columns`` of a source file, filtered by ``filter_values``.
+
+    Rows are kept whose filter column is in ``filter_values``, which can also be
+    a function returning a boolean mask of the values of a column to keep, such
+    as ``PathogenNormalizer.matches``.
+    The staged Parquet file is used when it is up to date, the text file otherwise.
+    Returns a DataFrame, or an iterator of DataFrames of up to ``chunksize`` rows.
+    Empty chunks are not yielded. Reading is measured as ``parse.<file_name>``.
+    """
+    step = f'parse.{file_name}'
+    if chunksize is not None:
+        return measured_chunks(
+            _read_source(
+                file_name, columns, filter_values, chunksize, data_dir, staging_dir
+            ),
+            step
+        )
+
+    with measure(step) as span:
+        df = _read_source(
+            file_name, columns, filter_values, chunksize, data_dir, staging_dir
+        )
+        span.rows = len(df)
+    return df
+
+
+def _read_source(
+    file_name: str,
+    columns: list,
+    filter_values,
+    chunksize: int,
+    data_dir: str,
+    staging_dir: str
+):
+    spec = STAGED_SOURCES[file_name]
+    source_path = os.path.join(os.path.expanduser(data_dir), file_name)
+    staged_path = _staged_path(file_name, staging_dir)
+    filter_column = spec['filter']
+
+    if _is_fresh(source_path, staged_path):
+        if callable(filter_values):
+            # Selected once over the distinct values, so the scan filters as for a list
+            dataset = ds.dataset(staged_path, format='parquet')
+            column = dataset.to_table(columns=[filter_column])[filter_column]
+            values = pd.Series(pc.unique(column).drop_null().to_pylist(), dtype=object)
+            filter_values = values[filter_values(values).to_numpy()]
+
+        if filter_values is not None:
+            filter_values = list(filter_values)
+
+        if filter_values is not None:
+            row_filter = ds.field(filter_column).isin(filter_values)
+        else:
+            row_filter = None
+
+        scan = ds.dataset(staged_path, format='parquet').scanner(
+            columns=columns,
+            filter=row_filter,
+            batch_size=chunksize or CHUNK_SIZE
+        )
+
+        if chunksize is None:
+            return scan.to_table().to_pandas()
+
+        return (
+            batch.to_pandas()
+            for batch in scan.to_batches()
+            if batch.num_rows
+        )
+
+    if filter_values is not None and not callable(filter_values):
+        filter_values = list(filter_values)
+
+    def _filter(df: pd.DataFrame) -> pd.DataFrame:
+        if callable(filter_values):
+            df = df[filter_values(df[filter_column]).to_numpy()]
+        elif filter_values is not None:
+            df = df[df[filter_column].isin(filter_values)]
+        return df[columns]
+
+    reader = pd.read_csv(
+        source_path,
+        sep=spec['sep'],
+        dtype=str,
+        usecols=set(columns) | {filter_column},
+        encoding=spec['encoding'],
+        chunksize=chunksize,
+    )
+
+    if chunksize is None:
+        return _filter(reader)
+
+    return (
+        chunk
+        for chunk in map(_filter, reader)
+        if not chunk.empty
+    )
+
+
+if __name__ == "__main__":
+    stage_sources(force='--force' in sys.argv[1:])
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+
+"""Vectorized parsing and unit normalization of MIC values"""
+
+import re
+
+import numpy as np
+import pandas as pd
+
+# Normalized columns added to the measurements
+MIC_MOLAR = 'MIC (microM)'
+MIC_MASS = 'MIC (ug/mL)'
+MIC_VALID = 'MIC normalized'
+MIC_EXACT = 'MIC exact'
+MIC_COLUMNS = [MIC_MOLAR, MIC_MASS, MIC_VALID, MIC_EXACT]
+
+# Relations of measured values, the others are bounds of censored values like '>64'
+EXACT_RELATIONS = ['=', '~']
+
+# Factors to microM of the molar units, after _canonical_unit
+MOLAR_UNITS = {
+    'm': 1e6,
+    'mm': 1e3,
+    'um': 1.0,
+    'nm': 1e-3,
+    'pm': 1e-6,
+    'mol/l': 1e6,
+    'mmol/l': 1e3,
+    'umol/l': 1.0,
+    'nmol/ml': 1.0,
+    'nmol/l': 1e-3,
+}
+
+# Factors to ug/mL of the mass concentration units, after _canonical_unit
+MASS_UNITS = {
+    'g/l': 1e3,
+    'mg/ml': 1e3,
+    'mg/l': 1.0,
+    'ug/ml': 1.0,
+    'ng/ul': 1.0,
+    'ug/l': 1e-3,
+    'ng/ml': 1e-3,
+}
+
+# Optional relation, number with either decimal separator and optional unit
+VALUE_PATTERN = re.compile(
+    r"""^\s*['"]?(?P<relation><=|>=|<|>|=|~)?['"]?\s*"""
+    r'(?P<number>[-+]?(?:\d+(?:[.,]\d*)?|[.,]\d+)(?:[eE][-+]?\d+)?)'
+    r'\s*(?P<unit>.*?)\s*$'
+)
+
+
+def _canonical_unit(unit) -> str:
+    """Spell units alike: lower case, ``u`` for micro and ``/`` for per.
+
+    For example ``ug.mL-1`` becomes ``ug/ml``.
+    """
+    if not isinstance(unit, str):
+        return None
+
+    unit = unit.strip().lower().replace(' ', '')
+    unit = unit.replace('µ', 'u').replace('μ', 'u').replace('micro', 'u')
+    unit = re.sub(r'\.(\w+)-1$', r'/\1', unit)
+    return unit.replace('.', '/')
+
+
+def _factors(units: pd.Series, table: dict) -> pd.Series:
+    """Look up the factor of each unit, canonicalizing each distinct spelling once."""
+    spellings = units.dropna().unique()
+    factors = {unit: table.get(_canonical_unit(unit), np.nan) for unit in spellings}
+    return units.map(factors).astype(float)
+
+
+def _series(values, index) -> pd.Series:
+    if isinstance(values, pd.Series):
+        return values
+    return pd.Series(values, index=index, dtype=object)
+
+
+def normalize_mic(
+    values: pd.Series, units=None, relations=None, molecular_weight=None
+) -> pd.DataFrame:
+    """Parse MIC values and convert them to microM and ug/mL.
+
+    ``values`` are strings like ``'44,4'`` or ``'>=4 ug.mL-1'``, numbers are read
+    with either decimal separator. ``units`` and ``relations``, as columns or a
+    single value for all rows, take precedence over the ones found in the values.
+    With a ``molecular_weight`` in g/mol, molar values also get a mass
+    concentration and the other way around.
+
+    Returns the ``relation``, the number as ``value``, the columns of ``MIC_COLUMNS``
+    and the source ``unit``, with the same index as ``values``. ``MIC_VALID`` is
+    false for rows whose number or unit could not be read, ``MIC_EXACT`` is
+    false for those and for censored values like ``'>64'`` or ``'<0.5'``.
+    """
+    parsed = values.astype('string').str.extract(VALUE_PATTERN)
+
+    number = parsed['number'].str.replace(',', '.', regex=False)
+    value = pd.to_numeric(number, errors='coerce').astype(float)
+
+    unit = parsed['unit'].where(parsed['unit'] != '').astype(object)
+    if units is not None:
+        unit = _series(units, values.index).where(lambda given: given.notna(), unit)
+
+    relation = parsed['relation'].astype(object)
+    if relations is not None:
+        relations = _series(relations, values.index).astype('string')
+        relations = relations.str.strip('\'" ').astype(object)
+        relation = relations.where(relations.notna(), relation)
+    relation = relation.where(relation.notna() | value.isna(), '=')
+
+    molar = value * _factors(unit, MOLAR_UNITS)
+    mass = value * _factors(unit, MASS_UNITS)
+
+    if molecular_weight is not None:
+        weight = _series(molecular_weight, values.index).astype('string')
+        weight = weight.str.replace(',', '.', regex=False)
+        weight = pd.to_numeric(weight, errors='coerce').astype(float)
+        weight = weight.where(weight > 0)
+
+        # 1 microM of a compound of M g/mol is M / 1000 ug/mL
+        molar, mass = (
+            molar.fillna(mass * 1000 / weight),
+            mass.fillna(molar * weight / 1000),
+        )
+
+    valid = molar.notna() | mass.notna()
+
+    return pd.DataFrame({
+        'relation': relation,
+        'value': value,
+        'unit': unit,
+        MIC_MOLAR: molar,
+        MIC_MASS: mass,
+        MIC_VALID: valid,
+        MIC_EXACT: valid & relation.isin(EXACT_RELATIONS),
+    }, index=values.index)
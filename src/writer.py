@@ -0,0 +1,759 @@
+# -*- coding: utf-8 -*-
+
+"""Buffered bulk writers for loading nodes and relationships into the graph"""
+
+import csv
+import os
+import pickle
+import tempfile
+import time
+import uuid
+from collections import defaultdict, deque
+
+import pandas as pd
+from py2neo.database import Transaction
+
+from checkpoint import Checkpoint, CheckpointMismatch
+from constants import BATCH_SIZE
+from metrics import measure
+
+
+def _escape(name: str) -> str:
+    """Quote a label or relationship type for use in Cypher."""
+    return '`' + name.replace('`', '``') + '`'
+
+
+def _node(label: str, key) -> tuple:
+    """Return the ``(label, key)`` identifying a node, with a missing key as ``None``.
+
+    Missing keys come from pandas as NaN, which only equals itself when it is the
+    same object, and no longer is once passed between processes.
+    """
+    return label, None if isinstance(key, float) and key != key else key
+
+
+def _present(value) -> bool:
+    """Whether a property value from an edge table is set, lists always are."""
+    return isinstance(value, list) or pd.notna(value)
+
+
+class GraphWriter:
+    """Buffer nodes per label and relationships per type and write them in batches.
+
+    Nodes are identified by a ``(label, key)`` tuple, where the key is the one used
+    by the loaders in their node dictionaries. Relationships refer to their
+    endpoints with the same tuples.
+
+    Backends implement :meth:`_write_nodes` and :meth:`_write_relationships`, and
+    may override :meth:`_written` and :meth:`close`. The loaders only call the
+    ``add_*`` methods, so they write to any backend: Neo4j over Bolt
+    (:class:`BoltWriter`, :class:`MergeWriter`), ``neo4j-admin`` import files
+    (:class:`CsvWriter`), RDF files (``rdf.RdfWriter``) or an in-memory graph
+    (``memory.MemoryWriter``).
+    """
+
+    def __init__(self, batch_size: int = BATCH_SIZE):
+        self.batch_size = batch_size
+        self.node_counts = defaultdict(int)
+        self.relationship_counts = defaultdict(int)
+        self._timings = defaultdict(float)
+        self._node_buffer = defaultdict(list)
+        self._relationship_buffer = defaultdict(list)
+        self._ids = {}  # (label, key) -> id of the node in the backend
+        # label -> deque of (key, id) committed by a previous run
+        self._resumed_nodes = {}
+        self._resumed_relationships = defaultdict(int)
+        self._started = time.perf_counter()
+
+    def resume(self, nodes: dict, relationships: dict):
+        """Skip the rows committed by a failed run, from :meth:`Checkpoint.load`.
+
+        Rows are skipped in the order they are added, so the loaders have to add
+        them in the same order as in the failed run. Node keys are checked against
+        the checkpoint.
+        """
+        self._resumed_nodes = {label: deque(rows) for label, rows in nodes.items()}
+        self._resumed_relationships.update(relationships)
+
+    def add_node(self, label: str, key, properties: dict):
+        """Buffer a single node."""
+        resumed = self._resumed_nodes.get(label)
+        if resumed:
+            committed_key, node_id = resumed.popleft()
+            if _node(label, committed_key) != _node(label, key):
+                raise CheckpointMismatch(
+                    f'{label} node {key} was not expected, '
+                    f'{committed_key} was committed'
+                )
+            self._ids[_node(label, key)] = node_id
+            return
+
+        buffer = self._node_buffer[label]
+        buffer.append((key, properties))
+
+        if len(buffer) >= self.batch_size:
+            self._flush_nodes(label)
+
+    def add_nodes(self, label: str, nodes: dict):
+        """Buffer the nodes of a mapping of keys to properties, e.g. ``LabelTable``."""
+        for key, properties in nodes.items():
+            self.add_node(label, key, properties)
+
+    def add_relationship(
+        self,
+        start: tuple,
+        rel_type: str,
+        end: tuple,
+        properties: dict = None
+    ):
+        """Buffer a relationship between two ``(label, key)`` endpoints."""
+        start_label, start_key = start
+        end_label, end_key = end
+
+        group = (start_label, rel_type, end_label)
+        if self._resumed_relationships[group]:
+            self._resumed_relationships[group] -= 1
+            return
+
+        buffer = self._relationship_buffer[group]
+        buffer.append((start_key, end_key, properties or {}))
+
+        if len(buffer) >= self.batch_size:
+            self._flush_relationships(group)
+
+    def add_relationships(
+        self,
+        start_label: str,
+        rel_type: str,
+        end_label: str,
+        edges: pd.DataFrame
+    ):
+        """Buffer the relationships of an edge table.
+
+        ``edges`` holds the endpoint keys in its ``start`` and ``end`` columns, all
+        other columns are properties and are left out where missing.
+        """
+        properties = edges.drop(columns=['start', 'end'])
+        if len(properties.columns):
+            properties = properties.to_dict('records')
+        else:
+            properties = [{}] * len(edges)
+
+        starts, ends = edges['start'].tolist(), edges['end'].tolist()
+        for start, end, record in zip(starts, ends, properties):
+            self.add_relationship(
+                (start_label, start),
+                rel_type,
+                (end_label, end),
+                {key: value for key, value in record.items() if _present(value)}
+            )
+
+    def _flush_nodes(self, label: str):
+        rows = self._node_buffer.pop(label, [])
+        if not rows:
+            return
+
+        start = time.perf_counter()
+        with measure(f'write.{label}', rows=len(rows)):
+            ids = self._write_nodes(label, [properties for _, properties in rows])
+        self._timings[label] += time.perf_counter() - start
+
+        for (key, _), node_id in zip(rows, ids):
+            self._ids[_node(label, key)] = node_id
+        self.node_counts[label] += len(rows)
+        self._written('nodes', label, [key for key, _ in rows], ids, len(rows))
+
+    def _flush_relationships(self, group: tuple):
+        # Endpoints have to exist in the backend before they can be connected
+        self.flush_nodes()
+
+        rows = self._relationship_buffer.pop(group, [])
+        if not rows:
+            return
+
+        start_label, rel_type, end_label = group
+        batch = [
+            (
+                self._ids[_node(start_label, start_key)],
+                self._ids[_node(end_label, end_key)],
+                properties,
+            )
+            for start_key, end_key, properties in rows
+        ]
+
+        start = time.perf_counter()
+        with measure(f'write.{rel_type}', rows=len(batch)):
+            self._write_relationships(start_label, rel_type, end_label, batch)
+        self._timings[rel_type] += time.perf_counter() - start
+
+        self.relationship_counts[rel_type] += len(rows)
+        self._written('relationships', group, None, None, len(rows))
+
+    def _written(self, kind: str, group, keys: list, ids: list, rows: int):
+        """Called after each batch is written, with the node keys and ids for nodes."""
+
+    def flush_nodes(self):
+        """Write all buffered nodes."""
+        for label in list(self._node_buffer):
+            self._flush_nodes(label)
+
+    def flush(self):
+        """Write everything still buffered, nodes first."""
+        self.flush_nodes()
+        for group in list(self._relationship_buffer):
+            self._flush_relationships(group)
+
+    def close(self):
+        """Write everything still buffered and finalize the backend."""
+        self.flush()
+
+    def report(self) -> dict:
+        """Print and return rows written and throughput per label and type."""
+        counts = list(self.node_counts.items()) + list(self.relationship_counts.items())
+        total_rows = sum(count for _, count in counts)
+        total_time = time.perf_counter() - self._started
+
+        summary = {}
+        print('#### Write Summary ####')
+        for name, count in counts:
+            seconds = self._timings[name]
+            rate = count / seconds if seconds else float('inf')
+            summary[name] = {'rows': count, 'seconds': seconds, 'rows_per_second': rate}
+            print(f'{name} - {count} rows in {seconds:.2f}s ({rate:.0f} rows/s)')
+
+        rate = total_rows / total_time
+        print(f'Total - {total_rows} rows in {total_time:.2f}s ({rate:.0f} rows/s)')
+        return summary
+
+    def _write_nodes(self, label: str, rows: list) -> list:
+        """Write node properties and return the backend ids in the same order."""
+        raise NotImplementedError
+
+    def _write_relationships(
+        self,
+        start_label: str,
+        rel_type: str,
+        end_label: str,
+        rows: list
+    ):
+        """Write ``(start id, end id, properties)`` rows."""
+        raise NotImplementedError
+
+
+class EdgeCollector:
+    """Record relationships in place of a writer, to write later with :meth:`replay`.
+
+    Lets the relation builders run in another process than the one holding the
+    database transaction.
+    """
+
+    def __init__(self):
+        self.calls = []
+
+    def add_relationship(
+        self, start: tuple, rel_type: str, end: tuple, properties: dict = None
+    ):
+        self.calls.append(('add_relationship', (start, rel_type, end, properties)))
+
+    def add_relationships(
+        self, start_label: str, rel_type: str, end_label: str, edges: pd.DataFrame
+    ):
+        args = (start_label, rel_type, end_label, edges)
+        self.calls.append(('add_relationships', args))
+
+    def __len__(self) -> int:
+        """Number of relationships recorded."""
+        return sum(
+            len(args[3]) if method == 'add_relationships' else 1
+            for method, args in self.calls
+        )
+
+    def replay(self, writer: GraphWriter):
+        """Pass the recorded relationships to ``writer`` in their original order."""
+        for method, args in self.calls:
+            getattr(writer, method)(*args)
+
+
+class EdgeSpool:
+    """Record relationships to a temporary file, to be written by :meth:`replay`.
+
+    Same use as :class:`EdgeCollector`, for sources read in chunks: each call is
+    appended to the file as it comes, and only the file name is passed between
+    processes. The file is removed once replayed.
+    """
+
+    def __init__(self, directory: str = None):
+        handle, self.path = tempfile.mkstemp(
+            prefix='amr-kg-edges-', suffix='.pkl', dir=directory
+        )
+        self._file = os.fdopen(handle, 'wb')
+        self.rows = 0
+
+    def _record(self, method: str, args: tuple):
+        pickle.dump((method, args), self._file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def add_relationship(
+        self,
+        start: tuple,
+        rel_type: str,
+        end: tuple,
+        properties: dict = None
+    ):
+        self._record('add_relationship', (start, rel_type, end, properties))
+        self.rows += 1
+
+    def add_relationships(
+        self,
+        start_label: str,
+        rel_type: str,
+        end_label: str,
+        edges: pd.DataFrame
+    ):
+        self._record('add_relationships', (start_label, rel_type, end_label, edges))
+        self.rows += len(edges)
+
+    def __len__(self) -> int:
+        """Number of relationships recorded."""
+        return self.rows
+
+    def close(self):
+        """Flush the recorded relationships to the file."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __getstate__(self) -> dict:
+        self.close()
+        return {**self.__dict__, '_file': None}
+
+    def replay(self, writer: GraphWriter):
+        """Pass the recorded relationships to ``writer`` in their original order."""
+        self.close()
+
+        with open(self.path, 'rb') as file:
+            while True:
+                try:
+                    method, args = pickle.load(file)
+                except EOFError:
+                    break
+                getattr(writer, method)(*args)
+
+        os.remove(self.path)
+
+
+class BoltWriter(GraphWriter):
+    """Write batches into Neo4j with parameterized ``UNWIND`` queries.
+
+    With ``commit_size`` set, the transaction is committed and a new one begun
+    whenever that many rows were written, and each commit is recorded in
+    ``checkpoint`` so that a failed load can be resumed.
+    """
+
+    def __init__(
+        self,
+        tx: Transaction,
+        batch_size: int = BATCH_SIZE,
+        commit_size: int = None,
+        checkpoint: Checkpoint = None
+    ):
+        super().__init__(batch_size=batch_size)
+        self.tx = tx
+        self.commit_size = commit_size
+        self.checkpoint = checkpoint
+        self._uncommitted = []
+        self._uncommitted_rows = 0
+
+    def _written(self, kind: str, group, keys: list, ids: list, rows: int):
+        self._uncommitted.append((kind, group, keys, ids, rows))
+        self._uncommitted_rows += rows
+
+        if self.commit_size and self._uncommitted_rows >= self.commit_size:
+            self.commit()
+
+    def commit(self, begin: bool = True):
+        """Commit the written batches, checkpoint them and begin a new transaction."""
+        with measure('commit', rows=self._uncommitted_rows):
+            self.tx.commit()
+
+        if self.checkpoint is not None:
+            self.checkpoint.record(self._uncommitted)
+        self._uncommitted = []
+        self._uncommitted_rows = 0
+
+        if begin:
+            self.tx = self.tx.graph.begin()
+
+    def _write_nodes(self, label: str, rows: list) -> list:
+        records = self.tx.run(
+            f"""
+            UNWIND $rows AS row
+            CREATE (n:{_escape(label)})
+            SET n = row.properties
+            RETURN row.idx AS idx, id(n) AS id
+            """,
+            rows=[
+                {'idx': idx, 'properties': properties}
+                for idx, properties in enumerate(rows)
+            ]
+        ).data()
+
+        ids = [None] * len(rows)
+        for record in records:
+            ids[record['idx']] = record['id']
+        return ids
+
+    def _write_relationships(
+        self,
+        start_label: str,
+        rel_type: str,
+        end_label: str,
+        rows: list
+    ):
+        self.tx.run(
+            f"""
+            UNWIND $rows AS row
+            MATCH (a) WHERE id(a) = row.start
+            MATCH (b) WHERE id(b) = row.end
+            CREATE (a)-[r:{_escape(rel_type)}]->(b)
+            SET r = row.properties
+            """,
+            rows=[
+                {'start': start, 'end': end, 'properties': properties}
+                for start, end, properties in rows
+            ]
+        )
+
+    def close(self):
+        """Write everything still buffered and commit, the load is then complete."""
+        self.flush()
+        self.commit(begin=False)
+
+        if self.checkpoint is not None:
+            self.checkpoint.remove()
+
+
+class MergeWriter(BoltWriter):
+    """Write batches with ``MERGE`` on a key property per label, for incremental loads.
+
+    ``node_keys`` maps each label to its key property, which should be backed by a
+    uniqueness constraint. Relationships are matched by those keys, so they can
+    point to nodes of ``skip_labels`` which are only registered and not rewritten.
+    Nodes without a key property and their relationships are skipped.
+
+    There is one relationship of a type per pair of nodes, merged on its endpoints
+    and given the properties of the latest load. Nodes and relationships are
+    tagged with the ``generation`` of the load, and on :meth:`close` the nodes of
+    ``sweep_labels`` and the relationships of ``sweep_types`` that this load did
+    not write are deleted, as they are gone from the sources or now have another
+    key or label.
+    """
+
+    def __init__(
+        self,
+        tx: Transaction,
+        node_keys: dict,
+        skip_labels: set = frozenset(),
+        sweep_labels: set = frozenset(),
+        sweep_types: set = frozenset(),
+        generation: str = None,
+        batch_size: int = BATCH_SIZE,
+        commit_size: int = None,
+        checkpoint: Checkpoint = None
+    ):
+        super().__init__(
+            tx=tx,
+            batch_size=batch_size,
+            commit_size=commit_size,
+            checkpoint=checkpoint
+        )
+        self.node_keys = node_keys
+        self.skip_labels = set(skip_labels)
+        self.sweep_labels = set(sweep_labels) - self.skip_labels
+        self.sweep_types = set(sweep_types)
+        self.generation = generation or uuid.uuid4().hex
+        self.merge_status = defaultdict(lambda: defaultdict(int))
+
+    def add_node(self, label: str, key, properties: dict):
+        if label in self.skip_labels:
+            self._ids[_node(label, key)] = properties.get(self.node_keys[label])
+            self.merge_status[label]['source unchanged'] += 1
+            return
+
+        super().add_node(label, key, properties)
+
+    def _write_nodes(self, label: str, rows: list) -> list:
+        key_property = self.node_keys[label]
+        keys = [properties.get(key_property) for properties in rows]
+
+        batch = [
+            {'key': key, 'properties': properties}
+            for key, properties in zip(keys, rows)
+            if key is not None
+        ]
+        if len(batch) < len(rows):
+            self.merge_status[label]['missing key'] += len(rows) - len(batch)
+
+        records = self.tx.run(
+            f"""
+            UNWIND $rows AS row
+            OPTIONAL MATCH (old:{_escape(label)} {{{_escape(key_property)}: row.key}})
+            WITH row, row.properties AS props, properties(old) AS before
+            MERGE (n:{_escape(label)} {{{_escape(key_property)}: row.key}})
+            SET n = props, n.load_generation = $generation
+            RETURN CASE
+                WHEN before IS NULL THEN 'inserted'
+                WHEN before = props {{.*, load_generation: before.load_generation}}
+                    THEN 'unchanged'
+                ELSE 'updated'
+            END AS status
+            """,
+            rows=batch,
+            generation=self.generation
+        ).data()
+
+        for record in records:
+            self.merge_status[label][record['status']] += 1
+
+        return keys
+
+    def _write_relationships(
+        self,
+        start_label: str,
+        rel_type: str,
+        end_label: str,
+        rows: list
+    ):
+        start_key = _escape(self.node_keys[start_label])
+        end_key = _escape(self.node_keys[end_label])
+
+        self.tx.run(
+            f"""
+            UNWIND $rows AS row
+            MATCH (a:{_escape(start_label)} {{{start_key}: row.start}})
+            MATCH (b:{_escape(end_label)} {{{end_key}: row.end}})
+            MERGE (a)-[r:{_escape(rel_type)}]->(b)
+            SET r = row.properties, r.load_generation = $generation
+            """,
+            rows=[
+                {'start': start, 'end': end, 'properties': properties}
+                for start, end, properties in rows
+                if start is not None and end is not None
+            ],
+            generation=self.generation
+        )
+
+    def _delete_stale(self, match: str, name: str, delete: str = 'DELETE') -> int:
+        """Delete what ``match`` finds as ``stale`` outside this load's generation.
+
+        Each batch is committed on its own, returning the number deleted.
+        """
+        total = 0
+        while True:
+            deleted = self.tx.run(
+                f"""
+                {match}
+                WHERE stale.load_generation IS NULL
+                    OR stale.load_generation <> $generation
+                WITH stale LIMIT $limit
+                {delete} stale
+                RETURN count(*) AS deleted
+                """,
+                generation=self.generation,
+                limit=self.batch_size
+            ).evaluate()
+            self.tx.commit()
+            self.tx = self.tx.graph.begin()
+
+            self.merge_status[name]['deleted'] += deleted
+            total += deleted
+            if deleted < self.batch_size:
+                return total
+
+    def close(self):
+        """Write and commit everything buffered, then delete the stale graph parts."""
+        self.flush()
+        self.commit()
+
+        with measure('sweep') as span:
+            for rel_type in sorted(self.sweep_types):
+                match = f'MATCH ()-[stale:{_escape(rel_type)}]->()'
+                span.rows += self._delete_stale(match, rel_type)
+
+            # Along with their relationships to the nodes of unchanged labels
+            for label in sorted(self.sweep_labels):
+                match = f'MATCH (stale:{_escape(label)})'
+                span.rows += self._delete_stale(match, label, delete='DETACH DELETE')
+
+        super().close()
+
+    def report(self) -> dict:
+        """Print and return the merge counts per label and relationship type as well."""
+        summary = super().report()
+
+        print('#### Merge Summary ####')
+        for label, status in self.merge_status.items():
+            counts = ', '.join(f'{count} {name}' for name, count in status.items())
+            print(f'{label} - {counts}')
+            summary.setdefault(label, {}).update(status)
+
+        return summary
+
+
+def _type(value) -> str:
+    """Return the neo4j-admin type of a property value, e.g. ``long`` or ``string[]``.
+
+    Empty lists are typed ``[]`` until their column holds a non-empty one.
+    """
+    if isinstance(value, list):
+        item_type = None
+        for item in value:
+            item_type = _widen(item_type, _type(item))
+        return f'{item_type or ""}[]'
+    if isinstance(value, bool):
+        return 'boolean'
+    if isinstance(value, int):
+        return 'long'
+    if isinstance(value, float):
+        return 'double'
+    return 'string'
+
+
+def _widen(current: str, new: str) -> str:
+    """Return the type of a column holding values of both types."""
+    if current is None or current == new:
+        return new
+    if new is None:
+        return current
+    if current.endswith('[]') and new.endswith('[]'):
+        return (_widen(current[:-2] or None, new[:-2] or None) or '') + '[]'
+    if {current, new} == {'long', 'double'}:
+        return 'double'
+    return 'string'
+
+
+def _column(name: str, column_type: str) -> str:
+    """Build a neo4j-admin header column, typed for non-string values."""
+    if column_type == 'string':
+        return name
+    if column_type == '[]':
+        return f'{name}:string[]'
+    return f'{name}:{column_type}'
+
+
+def _value(value):
+    """Format a property value for neo4j-admin, joining list items with ``;``."""
+    if isinstance(value, list):
+        return ';'.join(str(item) for item in value)
+    return value
+
+
+class CsvWriter(GraphWriter):
+    """Write node and relationship CSV files for ``neo4j-admin`` import.
+
+    Every label and relationship type gets one header file and one data file. Their
+    rows are spooled to a temporary file batch by batch, while the columns and
+    their types are collected over all rows, and the files are written on
+    :meth:`close`. The matching ``--nodes``/``--relationships`` arguments are
+    written to ``import.args``.
+    """
+
+    def __init__(self, output_dir: str, batch_size: int = BATCH_SIZE):
+        super().__init__(batch_size=batch_size)
+        self.output_dir = os.path.expanduser(output_dir)
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._next_id = 0
+        self._spools = {}  # (kind, name) -> path of the spooled rows
+        self._columns = defaultdict(dict)  # (kind, name) -> {column: type}
+
+    def _spool(self, kind: str, name: str, rows: list):
+        """Append a batch of ``(fields, properties)`` rows of a label or type."""
+        group = (kind, name)
+        if group not in self._spools:
+            handle, self._spools[group] = tempfile.mkstemp(
+                prefix='amr-kg-csv-', suffix='.pkl', dir=self.output_dir
+            )
+            os.close(handle)
+
+        columns = self._columns[group]
+        for _, properties in rows:
+            for key, value in properties.items():
+                columns[key] = _widen(columns.get(key), _type(value))
+
+        # Opened per batch, so that no file is kept open per label and type
+        with open(self._spools[group], 'ab') as file:
+            pickle.dump(rows, file, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def _write_nodes(self, label: str, rows: list) -> list:
+        ids = list(range(self._next_id, self._next_id + len(rows)))
+        self._next_id += len(rows)
+
+        self._spool(
+            'nodes',
+            label,
+            [((node_id, label), properties) for node_id, properties in zip(ids, rows)]
+        )
+        return ids
+
+    def _write_relationships(
+        self,
+        start_label: str,
+        rel_type: str,
+        end_label: str,
+        rows: list
+    ):
+        self._spool(
+            'relationships',
+            rel_type,
+            [((start, end, rel_type), properties) for start, end, properties in rows]
+        )
+
+    def _write_files(self, kind: str, name: str) -> tuple:
+        """Write the header and data files of a label or type from its spool."""
+        columns = sorted(self._columns[kind, name].items())
+        if kind == 'nodes':
+            fields = [':ID', ':LABEL']
+        else:
+            fields = [':START_ID', ':END_ID', ':TYPE']
+
+        stem = f"{kind}_{name.replace(' ', '_')}"
+        header_path = os.path.join(self.output_dir, f'{stem}_header.csv')
+        data_path = os.path.join(self.output_dir, f'{stem}.csv')
+
+        with open(header_path, 'w', newline='', encoding='utf-8') as header_file:
+            csv.writer(header_file).writerow(
+                [*fields, *(_column(key, column_type) for key, column_type in columns)]
+            )
+
+        spool_path = self._spools.pop((kind, name))
+        with open(data_path, 'w', newline='', encoding='utf-8') as data_file:
+            writer = csv.writer(data_file)
+            with open(spool_path, 'rb') as spool:
+                while True:
+                    try:
+                        rows = pickle.load(spool)
+                    except EOFError:
+                        break
+                    writer.writerows(
+                        [*values, *(_value(properties.get(key)) for key, _ in columns)]
+                        for values, properties in rows
+                    )
+        os.remove(spool_path)
+
+        return header_path, data_path
+
+    def close(self):
+        """Write everything still buffered, the CSV files and ``import.args``."""
+        self.flush()
+
+        arguments = ['--multiline-fields=true']
+        for kind, name in list(self._spools):
+            header_path, data_path = self._write_files(kind, name)
+            arguments.append(f'--{kind}={header_path},{data_path}')
+
+        args_path = os.path.join(self.output_dir, 'import.args')
+        with open(args_path, 'w', encoding='utf-8') as args_file:
+            args_file.write('\n'.join(arguments) + '\n')
+
+        print('Import with:')
+        print(f'  Neo4j 5.x: neo4j-admin database import full <database> @{args_path}')
+        print(f'  Neo4j 4.x: neo4j-admin import --database=<database> @{args_path}')
@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+
+"""The modules of ``src`` import each other by name, as when run as scripts"""
+
+import os
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src')
+sys.path.insert(0, SRC_DIR)
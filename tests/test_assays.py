@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+"""Aggregation of the measurements of a pathogen and compound into one edge"""
+
+import pandas as pd
+import pytest
+
+from assays import ASSAY_TYPE, AssayAggregator, aggregate_assays
+from units import MIC_COLUMNS, normalize_mic
+
+
+def test_censored_values_are_left_out_of_the_statistics():
+    values = pd.Series(['2', '8', '>64', '<0.5', '4'])
+    measurements = pd.DataFrame({
+        'start': ['Escherichia coli'] * 4 + ['Staphylococcus aureus'],
+        'end': 'chembl:CHEMBL25',
+        'Source': ['ChEMBL', 'SPARK', 'ChEMBL', 'ChEMBL', 'ChEMBL'],
+        **normalize_mic(values, units='ug/mL')[MIC_COLUMNS],
+    })
+
+    edges = aggregate_assays(measurements).set_index('start')
+
+    e_coli = edges.loc['Escherichia coli']
+    assert e_coli['Measurements'] == 4
+    assert e_coli['Normalized measurements'] == 4
+    assert e_coli['Censored measurements'] == 2
+    assert e_coli['MIC min (ug/mL)'] == 2.0
+    assert e_coli['MIC median (ug/mL)'] == 5.0
+    assert e_coli['MIC geometric mean (ug/mL)'] == pytest.approx(4.0)
+    assert e_coli['Source'] == ['ChEMBL', 'SPARK']
+
+    assert edges.loc['Staphylococcus aureus', 'Censored measurements'] == 0
+
+
+class Recorder:
+    """Writer keeping the relationship tables it is given."""
+
+    def __init__(self):
+        self.tables = []
+
+    def add_relationships(self, start_label, rel_type, end_label, edges):
+        self.tables.append(edges.assign(label=end_label))
+
+
+def measurements(number: int) -> pd.DataFrame:
+    values = pd.Series([str(number % 7 + 1), f'>{number % 3 + 1}'])
+    return pd.DataFrame({
+        'start': [f'pathogen {number % 5}'] * 2,
+        'end': f'chembl:CHEMBL{number % 11}',
+        'Source': ['ChEMBL', 'SPARK'][number % 2],
+        **normalize_mic(values, units='ug/mL')[MIC_COLUMNS],
+    })
+
+
+def aggregate(tmp_path, name: str, **kwargs) -> tuple:
+    writer = Recorder()
+    raw_path = str(tmp_path / f'{name}.tsv')
+    aggregator = AssayAggregator(writer, raw_path=raw_path, **kwargs)
+    for number in range(60):
+        label = 'ChEMBL' if number % 4 else 'PubChem'
+        table = measurements(number)
+        aggregator.add_relationships('Pathogen', ASSAY_TYPE, label, table)
+    counts = aggregator.close()
+
+    edges = pd.concat(writer.tables, ignore_index=True)
+    edges = edges.sort_values(['label', 'start', 'end'], ignore_index=True)
+    raw = pd.read_csv(raw_path, sep='\t').sort_values(['label', 'Pathogen', 'compound'])
+    return counts, edges, raw.reset_index(drop=True)
+
+
+def test_spilled_measurements_aggregate_alike(tmp_path):
+    counts, edges, raw = aggregate(tmp_path, 'memory')
+    spilled_counts, spilled_edges, spilled_raw = aggregate(
+        tmp_path, 'spilled', spill_rows=10, buckets=3
+    )
+
+    assert spilled_counts == counts
+    pd.testing.assert_frame_equal(spilled_edges, edges)
+    pd.testing.assert_frame_equal(spilled_raw, raw, check_like=True)
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+"""Resuming a failed load from its checkpoint"""
+
+import re
+from collections import Counter
+
+import pytest
+
+from checkpoint import Checkpoint, CheckpointMismatch
+from writer import BoltWriter
+
+SOURCES = {'ChEMBL': {'MIC/data_dump_31.tsv': 'abc'}}
+
+
+class Result:
+    def __init__(self, records: list):
+        self.records = records
+
+    def data(self) -> list:
+        return self.records
+
+
+class FakeGraph:
+    """Database of a fake Bolt transaction, failing at the ``fail_at``-th commit."""
+
+    def __init__(self, fail_at: int = None):
+        self.fail_at = fail_at
+        self.commits = 0
+        self.next_id = 0
+        self.nodes = {}
+        self.relationships = []
+
+    def begin(self):
+        return FakeTransaction(self)
+
+
+class FakeTransaction:
+    """Keep the rows of the ``UNWIND`` queries of BoltWriter until committed."""
+
+    def __init__(self, graph: FakeGraph):
+        self.graph = graph
+        self.nodes = {}
+        self.relationships = []
+
+    def run(self, query: str, rows: list):
+        label = re.search(r'CREATE \(n:`([^`]*)`\)', query)
+        if label:
+            records = []
+            for row in rows:
+                self.graph.next_id += 1
+                node = (label.group(1), row['properties']['name'])
+                self.nodes[self.graph.next_id] = node
+                records.append({'idx': row['idx'], 'id': self.graph.next_id})
+            return Result(records)
+
+        rel_type = re.search(r'\[r:`([^`]*)`\]', query).group(1)
+        self.relationships.extend((row['start'], rel_type, row['end']) for row in rows)
+        return Result([])
+
+    def commit(self):
+        if self.graph.commits == self.graph.fail_at:
+            raise ConnectionError('connection lost')
+
+        self.graph.commits += 1
+        self.graph.nodes.update(self.nodes)
+        self.graph.relationships.extend(self.relationships)
+
+
+def load(writer: BoltWriter):
+    """A load adding its nodes and relationships in the same order on every run."""
+    for number in range(25):
+        writer.add_node('Compound', f'c{number}', {'name': f'c{number}'})
+
+    for number in range(25):
+        writer.add_relationship(
+            ('Compound', f'c{number}'),
+            'SIMILAR',
+            ('Compound', f'c{(number + 1) % 25}')
+        )
+
+    writer.close()
+
+
+def contents(graph: FakeGraph) -> Counter:
+    return Counter(
+        (graph.nodes[start], rel_type, graph.nodes[end])
+        for start, rel_type, end in graph.relationships
+    )
+
+
+@pytest.mark.parametrize('fail_at', [0, 1, 3])
+def test_resume_after_failed_commit(tmp_path, fail_at):
+    clean = FakeGraph()
+    load(BoltWriter(clean.begin(), batch_size=5, commit_size=10))
+
+    path = str(tmp_path / 'checkpoint.jsonl')
+    graph = FakeGraph(fail_at=fail_at)
+    checkpoint = Checkpoint(path, sources=SOURCES)
+    checkpoint.start()
+
+    with pytest.raises(ConnectionError):
+        load(BoltWriter(graph.begin(), 5, commit_size=10, checkpoint=checkpoint))
+
+    graph.fail_at = None
+    checkpoint = Checkpoint(path, sources=SOURCES)
+    writer = BoltWriter(graph.begin(), 5, commit_size=10, checkpoint=checkpoint)
+    writer.resume(*checkpoint.load())
+    load(writer)
+
+    assert sorted(graph.nodes.values()) == sorted(clean.nodes.values())
+    assert contents(graph) == contents(clean)
+    assert not checkpoint.exists()
+
+
+def test_checkpoint_of_other_sources(tmp_path):
+    path = str(tmp_path / 'checkpoint.jsonl')
+    Checkpoint(path, sources=SOURCES).start()
+
+    with pytest.raises(CheckpointMismatch):
+        Checkpoint(path, sources={'ChEMBL': {'MIC/data_dump_31.tsv': 'def'}}).load()
+
+
+def test_resumed_load_keeps_its_generation(tmp_path):
+    path = str(tmp_path / 'checkpoint.jsonl')
+    checkpoint = Checkpoint(path, sources=SOURCES)
+    checkpoint.start()
+
+    resumed = Checkpoint(path, sources=SOURCES)
+    assert resumed.generation != checkpoint.generation
+    resumed.load()
+    assert resumed.generation == checkpoint.generation
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+
+"""Selecting the MIC assays of the KG pathogens from a ChEMBL SQLite file"""
+
+import csv
+import os
+import sqlite3
+from contextlib import closing
+
+import pytest
+
+import get_chembl_data
+from get_chembl_data import get_data
+
+MOLECULES = [
+    (1, 'AMOXICILLIN', 'CHEMBL1082'),
+    (2, 'CIPROFLOXACIN', 'CHEMBL8'),
+]
+
+ASSAYS = [
+    (10, 'CHEMBL100', 'F', 'Escherichia coli'),
+    (11, 'CHEMBL101', 'F', 'Staphylococcus aureus'),
+    (12, 'CHEMBL102', 'B', 'Escherichia coli'),
+    (13, 'CHEMBL103', 'F', 'Homo sapiens'),
+    (14, 'CHEMBL104', 'F', 'Staphylococcus aureus subsp. aureus'),
+    (15, 'CHEMBL105', 'F', 'Staphylococcus aureusX'),
+]
+
+# (activity_id, molregno, assay_id, relation, type, value, units)
+ACTIVITIES = [
+    (100, 1, 10, '=', 'MIC', 2.0, 'ug.mL-1'),
+    (101, 2, 11, '=', 'MIC', 0.5, 'ug.mL-1'),
+    (102, 2, 10, '>', 'MIC', 64.0, 'ug.mL-1'),
+    (103, 1, 10, '=', 'IC50', 3.0, 'nM'),
+    (104, 1, 10, '=', 'MIC', None, 'ug.mL-1'),
+    (105, 1, 12, '=', 'MIC', 1.0, 'ug.mL-1'),
+    (106, 2, 13, '=', 'MIC', 4.0, 'ug.mL-1'),
+    (107, 2, 14, '=', 'MIC', 1.0, 'ug.mL-1'),
+    (108, 1, 15, '=', 'MIC', 8.0, 'ug.mL-1'),
+]
+
+
+@pytest.fixture
+def chembl(tmp_path) -> str:
+    path = str(tmp_path / 'chembl_31.db')
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE MOLECULE_DICTIONARY (
+            molregno INTEGER, pref_name TEXT, chembl_id TEXT
+        );
+        CREATE TABLE ASSAYS (
+            assay_id INTEGER, chembl_id TEXT, assay_type TEXT, assay_organism TEXT
+        );
+        CREATE TABLE ACTIVITIES (
+            activity_id INTEGER,
+            molregno INTEGER,
+            assay_id INTEGER,
+            standard_relation TEXT,
+            standard_type TEXT,
+            standard_value REAL,
+            standard_units TEXT
+        );
+        CREATE INDEX idx_chembl_activities_molregno ON ACTIVITIES (molregno);
+    """)
+    conn.executemany('INSERT INTO MOLECULE_DICTIONARY VALUES (?, ?, ?)', MOLECULES)
+    conn.executemany('INSERT INTO ASSAYS VALUES (?, ?, ?, ?)', ASSAYS)
+    conn.executemany('INSERT INTO ACTIVITIES VALUES (?, ?, ?, ?, ?, ?, ?)', ACTIVITIES)
+    conn.commit()
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def pathogen_file(tmp_path) -> str:
+    path = tmp_path / 'pathogen.csv'
+    path.write_text(
+        'id,pathogen\n1,Escherichia coli\n2,Staphylococcus aureus\n3,Escherichia\n'
+    )
+    return str(path)
+
+
+def read_tsv(path: str) -> list:
+    with open(path, newline='') as file:
+        return list(csv.reader(file, delimiter='\t'))
+
+
+def test_mic_assays_of_known_pathogens(chembl, pathogen_file, tmp_path, monkeypatch):
+    connections = []
+    replaced = []
+    sqlite_connect = sqlite3.connect
+
+    def connect(path):
+        connections.append(sqlite_connect(path))
+        return connections[-1]
+
+    def replace(src, dst):
+        assert os.path.exists(src) and not os.path.exists(dst)
+        replaced.append((src, dst))
+        os.rename(src, dst)
+
+    monkeypatch.setattr(get_chembl_data.sqlite3, 'connect', connect)
+    monkeypatch.setattr(get_chembl_data.os, 'replace', replace)
+
+    output_path = get_data(
+        path=chembl,
+        version='31',
+        pathogen_file=pathogen_file,
+        output_dir=str(tmp_path),
+        chunksize=1
+    )
+
+    assert output_path == str(tmp_path / 'data_dump_31.tsv')
+    header, *rows = read_tsv(output_path)
+    assert header == [
+        'pref_name',
+        'chembl_id',
+        'standard_relation',
+        'standard_type',
+        'standard_value',
+        'standard_units',
+        'strain',
+        'assay_id',
+    ]
+    # Strains of a pathogen are kept, once even if the genus is listed too
+    assert sorted(rows) == [
+        ['AMOXICILLIN', 'CHEMBL1082', '=', 'MIC', '2.0', 'ug.mL-1',
+         'Escherichia coli', 'CHEMBL100'],
+        ['CIPROFLOXACIN', 'CHEMBL8', '=', 'MIC', '0.5', 'ug.mL-1',
+         'Staphylococcus aureus', 'CHEMBL101'],
+        ['CIPROFLOXACIN', 'CHEMBL8', '=', 'MIC', '1.0', 'ug.mL-1',
+         'Staphylococcus aureus subsp. aureus', 'CHEMBL104'],
+    ]
+
+    # The dump is written aside and swapped in once complete
+    assert replaced == [(output_path + '.tmp', output_path)]
+    assert not os.path.exists(output_path + '.tmp')
+
+    # The connection is closed, not only committed
+    with pytest.raises(sqlite3.ProgrammingError):
+        connections[0].execute('SELECT 1')
+
+
+def test_missing_indexes_are_created_once(chembl):
+    with closing(sqlite3.connect(chembl)) as conn:
+        created = get_chembl_data.create_indexes(conn)
+        assert created == [
+            'idx_amr_activities_assay_id',
+            'idx_amr_activities_standard_type',
+            'idx_amr_assays_assay_organism',
+        ]
+        assert get_chembl_data.create_indexes(conn) == []
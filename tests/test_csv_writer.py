@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+"""neo4j-admin import files written by CsvWriter"""
+
+import csv
+import os
+
+from writer import CsvWriter
+
+
+def read_csv(path: str) -> list:
+    with open(path, newline='', encoding='utf-8') as file:
+        return list(csv.reader(file))
+
+
+def test_one_header_per_label_and_type(tmp_path):
+    writer = CsvWriter(output_dir=str(tmp_path), batch_size=2)
+    writer.add_node('Pathogen', 'E. coli', {'name': 'E. coli'})
+    writer.add_node('Pathogen', 'S. aureus', {'name': 'S. aureus', 'taxon': 1280})
+    writer.add_node('Pathogen', 'E. faecium', {'name': 'E. faecium', 'gram': True})
+    writer.add_node('Project', 'AMR', {'name': 'AMR', 'tags': ['a', 'b']})
+    writer.add_relationship(
+        ('Project', 'AMR'), 'INCLUDES', ('Pathogen', 'E. coli'), {'MIC': 2}
+    )
+    writer.add_relationship(
+        ('Project', 'AMR'), 'INCLUDES', ('Pathogen', 'S. aureus'), {'MIC': 0.5}
+    )
+    writer.add_relationship(
+        ('Project', 'AMR'), 'INCLUDES', ('Pathogen', 'E. faecium'), {'MIC': 'n/a'}
+    )
+    writer.close()
+
+    assert sorted(os.listdir(tmp_path)) == [
+        'import.args',
+        'nodes_Pathogen.csv',
+        'nodes_Pathogen_header.csv',
+        'nodes_Project.csv',
+        'nodes_Project_header.csv',
+        'relationships_INCLUDES.csv',
+        'relationships_INCLUDES_header.csv',
+    ]
+
+    # Columns and their types cover all rows, not only the first one
+    assert read_csv(tmp_path / 'nodes_Pathogen_header.csv') == [
+        [':ID', ':LABEL', 'gram:boolean', 'name', 'taxon:long']
+    ]
+    assert read_csv(tmp_path / 'nodes_Pathogen.csv') == [
+        ['0', 'Pathogen', '', 'E. coli', ''],
+        ['1', 'Pathogen', '', 'S. aureus', '1280'],
+        ['2', 'Pathogen', 'True', 'E. faecium', ''],
+    ]
+    assert read_csv(tmp_path / 'nodes_Project_header.csv') == [
+        [':ID', ':LABEL', 'name', 'tags:string[]']
+    ]
+    assert read_csv(tmp_path / 'nodes_Project.csv') == [['3', 'Project', 'AMR', 'a;b']]
+
+    # Long and double values widen to double, anything else mixed to string
+    assert read_csv(tmp_path / 'relationships_INCLUDES_header.csv') == [
+        [':START_ID', ':END_ID', ':TYPE', 'MIC']
+    ]
+    assert read_csv(tmp_path / 'relationships_INCLUDES.csv') == [
+        ['3', '0', 'INCLUDES', '2'],
+        ['3', '1', 'INCLUDES', '0.5'],
+        ['3', '2', 'INCLUDES', 'n/a'],
+    ]
+
+    with open(tmp_path / 'import.args', encoding='utf-8') as file:
+        arguments = file.read().splitlines()
+    assert arguments == [
+        '--multiline-fields=true',
+        f'--nodes={tmp_path}/nodes_Pathogen_header.csv,{tmp_path}/nodes_Pathogen.csv',
+        f'--nodes={tmp_path}/nodes_Project_header.csv,{tmp_path}/nodes_Project.csv',
+        f'--relationships={tmp_path}/relationships_INCLUDES_header.csv,'
+        f'{tmp_path}/relationships_INCLUDES.csv',
+    ]
+
+
+def test_numeric_columns_widen_to_double(tmp_path):
+    writer = CsvWriter(output_dir=str(tmp_path))
+    writer.add_node('Compound', 'a', {'mass': 180, 'ids': []})
+    writer.add_node('Compound', 'b', {'mass': 151.2, 'ids': [1, 2]})
+    writer.close()
+
+    assert read_csv(tmp_path / 'nodes_Compound_header.csv') == [
+        [':ID', ':LABEL', 'ids:long[]', 'mass:double']
+    ]
+    assert read_csv(tmp_path / 'nodes_Compound.csv') == [
+        ['0', 'Compound', '', '180'],
+        ['1', 'Compound', '1;2', '151.2'],
+    ]
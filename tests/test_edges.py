@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+
+"""Relationships recorded in one process and written in another"""
+
+import os
+import pickle
+
+import pandas as pd
+
+from writer import EdgeSpool
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+
+    def add_relationship(self, *args):
+        self.calls.append(('add_relationship', args))
+
+    def add_relationships(self, *args):
+        self.calls.append(('add_relationships', args[:3], args[3].to_dict('list')))
+
+
+def test_spool_replays_in_order_after_pickling(tmp_path):
+    spool = EdgeSpool(directory=str(tmp_path))
+    spool.add_relationships('Pathogen', 'ASSAY IN', 'ChEMBL', pd.DataFrame({
+        'start': ['Escherichia coli', 'Streptococcus'],
+        'end': ['chembl:CHEMBL25', 'chembl:CHEMBL1'],
+    }))
+    spool.add_relationship(('Person', 'a'), 'WORKS_AT', ('Institute', 'b'))
+
+    # As returned by a pipeline stage run in a worker process
+    spool = pickle.loads(pickle.dumps(spool))
+    assert len(spool) == 3
+
+    writer = Recorder()
+    spool.replay(writer)
+
+    assert writer.calls == [
+        (
+            'add_relationships',
+            ('Pathogen', 'ASSAY IN', 'ChEMBL'),
+            {
+                'start': ['Escherichia coli', 'Streptococcus'],
+                'end': ['chembl:CHEMBL25', 'chembl:CHEMBL1'],
+            },
+        ),
+        ('add_relationship', (('Person', 'a'), 'WORKS_AT', ('Institute', 'b'), None)),
+    ]
+    assert not os.listdir(tmp_path)
@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+
+"""Exporting the triples of the KG page by page"""
+
+import csv
+import gzip
+import os
+import re
+
+import pytest
+
+from export import COLUMNS, export_triples, iter_triples
+
+# Relationship id -> (n.name, n.curie, type(r), m.name, m.curie), ids 2 to 4 deleted
+RELATIONSHIPS = {
+    0: ('Escherichia coli', 'ncbitaxon:562', 'ASSAY IN', 'Aspirin', 'chembl:CHEMBL25'),
+    1: ('AMR', 'imi:AMR', 'INCLUDES', 'Escherichia coli', 'ncbitaxon:562'),
+    5: ('Jane Doe', None, 'WORKS_AT', 'Institut Pasteur', None),
+    6: ('Escherichia coli', 'ncbitaxon:562', 'ASSAY IN', 'SPARK-1', 'spark:SPARK-1'),
+}
+
+
+class Result:
+    def __init__(self, records: list):
+        self.records = records
+
+    def data(self) -> list:
+        return self.records
+
+    def evaluate(self):
+        return next(iter(self.records[0].values()), None) if self.records else None
+
+
+class FakeGraph:
+    """Answer the queries of iter_triples from ``relationships``, keeping the ids."""
+
+    def __init__(self, relationships: dict = RELATIONSHIPS):
+        self.relationships = relationships
+        self.pages = []
+
+    def run(self, query: str, ids: list = None):
+        if ids is None:
+            return Result([{'max_id': max(self.relationships, default=None)}])
+
+        self.pages.append(ids)
+        return Result([
+            dict(zip(COLUMNS, self.relationships[rel_id]))
+            for rel_id in ids
+            if rel_id in self.relationships
+        ])
+
+
+def read_tsv(path: str, opener=open) -> list:
+    with opener(path, 'rt', encoding='utf-8', newline='') as file:
+        return list(csv.reader(file, delimiter='\t'))
+
+
+def test_pages_read_each_relationship_once():
+    graph = FakeGraph()
+    pages = list(iter_triples(graph, page_size=2))
+
+    # The page of deleted ids 2 and 3 is queried, not yielded
+    assert graph.pages == [[0, 1], [2, 3], [4, 5], [6]]
+    assert pages == [
+        [RELATIONSHIPS[0], RELATIONSHIPS[1]],
+        [RELATIONSHIPS[5]],
+        [RELATIONSHIPS[6]],
+    ]
+
+    empty = FakeGraph({})
+    assert list(iter_triples(empty)) == []
+    assert empty.pages == []
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_tsv(tmp_path, compress):
+    path = export_triples(
+        FakeGraph(), output_dir=str(tmp_path), compress=compress, page_size=3
+    )
+
+    suffix = re.escape('.tsv.gz' if compress else '.tsv')
+    name = os.path.basename(path)
+    assert re.fullmatch(rf'base_triples-\d\d_\w{{3}}_\d{{4}}{suffix}', name)
+
+    header, *rows = read_tsv(path, gzip.open if compress else open)
+    assert header == COLUMNS
+    assert rows == [
+        [value or '' for value in RELATIONSHIPS[rel_id]] for rel_id in (0, 1, 5, 6)
+    ]
+
+
+def test_ntriples(tmp_path):
+    path = export_triples(FakeGraph(), output_dir=str(tmp_path), fmt='nt')
+    assert path.endswith('.nt')
+
+    with open(path, encoding='utf-8') as file:
+        lines = file.read().splitlines()
+
+    assert lines == [
+        '<http://purl.obolibrary.org/obo/NCBITaxon_562> '
+        '<urn:amr-kg:relation/ASSAY%20IN> '
+        '<https://identifiers.org/chembl.compound:CHEMBL25> .',
+        '<urn:amr-kg:imi:AMR> <urn:amr-kg:relation/INCLUDES> '
+        '<http://purl.obolibrary.org/obo/NCBITaxon_562> .',
+        # Nodes without a curie are named by their name
+        '<urn:amr-kg:Jane%20Doe> <urn:amr-kg:relation/WORKS_AT> '
+        '<urn:amr-kg:Institut%20Pasteur> .',
+        '<http://purl.obolibrary.org/obo/NCBITaxon_562> '
+        '<urn:amr-kg:relation/ASSAY%20IN> <urn:amr-kg:spark:SPARK-1> .',
+    ]
+
+
+def test_parquet(tmp_path):
+    pq = pytest.importorskip('pyarrow.parquet')
+
+    path = export_triples(
+        FakeGraph(), output_dir=str(tmp_path), fmt='parquet', page_size=2
+    )
+    assert path.endswith('.parquet')
+
+    # One row group per non-empty page
+    file = pq.ParquetFile(path)
+    assert file.metadata.num_row_groups == 3
+    table = file.read()
+    assert table.column_names == COLUMNS
+    assert [tuple(row.values()) for row in table.to_pylist()] == [
+        RELATIONSHIPS[rel_id] for rel_id in (0, 1, 5, 6)
+    ]
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+"""Merging compound identifiers across sources"""
+
+import pandas as pd
+
+from identity import CompoundIndex, curies, pubchem_curies
+
+
+def test_sources_sharing_identifiers_merge():
+    index = CompoundIndex([
+        pd.DataFrame({'chembl': ['chembl:CHEMBL25', 'chembl:CHEMBL1']}),
+        pd.DataFrame({
+            'chembl': ['chembl:CHEMBL25', None],
+            'pubchem': ['pubchem:2244', 'pubchem:5090'],
+            'spark': ['spark:aspirin', 'spark:rofecoxib'],
+        }),
+        # Linked to aspirin through its PubChem CID only
+        pd.DataFrame({
+            'drug.central': ['drug.central:74'],
+            'pubchem': ['pubchem:2244'],
+        }),
+    ])
+
+    assert index.key('drug.central:74') == 'chembl:CHEMBL25'
+    assert index.key('spark:aspirin') == 'chembl:CHEMBL25'
+    assert index.key('spark:rofecoxib') == 'pubchem:5090'
+    assert index.key('chembl:CHEMBL1') == 'chembl:CHEMBL1'
+    assert index.key('pubchem:1') is None
+
+    assert index.merged().to_dict() == {'chembl:CHEMBL25': 4, 'pubchem:5090': 2}
+    assert index.identifiers('pubchem:5090') == ['pubchem:5090', 'spark:rofecoxib']
+
+
+def test_merging_is_transitive():
+    index = CompoundIndex([
+        pd.DataFrame({'spark': ['spark:a'], 'pubchem': ['pubchem:1']}),
+        pd.DataFrame({'pubchem': ['pubchem:1'], 'drug.central': ['drug.central:2']}),
+        pd.DataFrame({'drug.central': ['drug.central:2'], 'chembl': ['chembl:C3']}),
+    ])
+
+    assert set(index.keys) == {'chembl:C3'}
+
+
+def test_first_known_and_labels():
+    index = CompoundIndex([pd.DataFrame({
+        'chembl': ['chembl:CHEMBL25', None],
+        'pubchem': ['pubchem:2244', 'pubchem:5090'],
+    })])
+
+    keys = index.first_known(
+        pd.Series([None, 'chembl:CHEMBL404', None]),
+        pd.Series(['pubchem:2244', None, 'pubchem:5090']),
+    )
+
+    assert keys.tolist()[0] == 'chembl:CHEMBL25'
+    assert pd.isna(keys[1])
+    assert CompoundIndex.labels(keys).tolist()[::2] == ['ChEMBL', 'PubChem']
+
+
+def test_curies_keep_missing_identifiers():
+    chembl_ids = curies('chembl', pd.Series(['CHEMBL25', None]))
+    assert chembl_ids[0] == 'chembl:CHEMBL25'
+    assert pd.isna(chembl_ids[1])
+
+    pubchem_ids = pubchem_curies(pd.Series(['2244.0', '5090']))
+    assert pubchem_ids.tolist() == ['pubchem:2244', 'pubchem:5090']
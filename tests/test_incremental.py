@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+
+"""An incremental load after a source edit matches a clean load of the edited sources
+
+Needs a Neo4j server at ``constants.URL``, the loads run ``amr.py`` on synthetic
+source files of benchmark.py.
+"""
+
+import os
+import subprocess
+import sys
+from collections import Counter
+
+import pandas as pd
+import pytest
+
+from benchmark import generate
+from connection import create_new_db, get_graph, get_system_graph
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+AMR_SCRIPT = os.path.join(TESTS_DIR, os.pardir, 'src', 'amr.py')
+CLEAN_DB = 'amr-test-clean'
+INCREMENTAL_DB = 'amr-test-incremental'
+
+
+def _neo4j_available() -> bool:
+    try:
+        get_system_graph().run('RETURN 1')
+    except Exception:
+        return False
+    return True
+
+
+pytestmark = pytest.mark.skipif(not _neo4j_available(), reason='Neo4j is not running')
+
+
+def run_amr(data_dir: str, *args: str):
+    subprocess.run(
+        [sys.executable, AMR_SCRIPT, '-o', *args],
+        env={**os.environ, 'AMR_KG_DATA_DIR': data_dir},
+        check=True,
+    )
+
+
+def clean_load(data_dir: str):
+    create_new_db(CLEAN_DB)
+    run_amr(data_dir, '-d', CLEAN_DB)
+
+
+def _value(value):
+    if isinstance(value, list):
+        return tuple(value)
+    # NaN only equals itself when it is the same object
+    return None if isinstance(value, float) and value != value else value
+
+
+def _freeze(properties: dict) -> frozenset:
+    return frozenset(
+        (name, _value(value))
+        for name, value in properties.items()
+        if name != 'load_generation'
+    )
+
+
+def contents(db_name: str) -> tuple:
+    """Nodes and relationships by their labels and properties."""
+    graph = get_graph(db_name)
+
+    nodes = graph.run('MATCH (n) RETURN labels(n) AS labels, properties(n) AS props')
+    nodes = Counter(
+        (frozenset(record['labels']), _freeze(record['props'])) for record in nodes
+    )
+
+    relationships = graph.run(
+        """
+        MATCH (a)-[r]->(b)
+        RETURN properties(a) AS start, type(r) AS type, properties(b) AS end,
+            properties(r) AS properties
+        """
+    )
+    relationships = Counter(
+        (
+            _freeze(record['start']),
+            record['type'],
+            _freeze(record['end']),
+            _freeze(record['properties']),
+        )
+        for record in relationships
+    )
+    return nodes, relationships
+
+
+def edit_spark(data_dir: str):
+    """Drop half the SPARK rows and give the others a ChEMBL id.
+
+    Compounds known by their PubChem CID only move from PubChem to ChEMBL.
+    """
+    path = os.path.join(data_dir, 'SPARK', 'processed_mic_data.tsv')
+    df = pd.read_csv(path, sep='\t', dtype=str).iloc[::2]
+    number = df['Compound Name'].str.removeprefix('SPARK-')
+    df['chembl'] = df['chembl'].fillna('CHEMBL' + number)
+    df.to_csv(path, sep='\t', index=False)
+
+
+def edit_persons(data_dir: str):
+    """Drop a third of the persons, with their skills, projects and pathogens."""
+    path = os.path.join(data_dir, 'AMR', 'person.csv')
+    df = pd.read_csv(path, dtype=str)
+    df[df.index % 3 != 0].to_csv(path, index=False)
+
+
+@pytest.mark.parametrize('edit', [edit_spark, edit_persons])
+def test_incremental_load_matches_clean_load(tmp_path, edit):
+    data_dir = str(tmp_path) + os.sep
+    generate(data_dir, rows=300)
+
+    create_new_db(INCREMENTAL_DB)
+    run_amr(data_dir, '-d', INCREMENTAL_DB, '-i')
+
+    edit(data_dir)
+    run_amr(data_dir, '-d', INCREMENTAL_DB, '-i')
+    clean_load(data_dir)
+
+    assert contents(INCREMENTAL_DB) == contents(CLEAN_DB)
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+"""Loading synthetic sources of benchmark.py into the in-memory backend"""
+
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+ROWS = 300
+COMPOUND_LABELS = ('ChEMBL', 'SPARK', 'PubChem', 'DrugCentral')
+
+
+def build(rows: int):
+    """Generate the sources and load them, in a process reading ``AMR_KG_DATA_DIR``."""
+    from amr import load
+    from benchmark import generate
+    from constants import DATA_DIR
+    from memory import MemoryWriter
+
+    generate(DATA_DIR, rows)
+    writer = MemoryWriter()
+    load(writer, offline=True, workers=0)
+    return writer.graph
+
+
+@pytest.fixture(scope='module')
+def graph(tmp_path_factory):
+    data_dir = str(tmp_path_factory.mktemp('data')) + os.sep
+
+    # Paths are read from the environment once, when constants is imported
+    env = os.environ.get('AMR_KG_DATA_DIR')
+    os.environ['AMR_KG_DATA_DIR'] = data_dir
+    try:
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            return executor.submit(build, ROWS).result()
+    finally:
+        if env is None:
+            del os.environ['AMR_KG_DATA_DIR']
+        else:
+            os.environ['AMR_KG_DATA_DIR'] = env
+
+
+def test_node_and_relationship_counts(graph):
+    summary = graph.summary()
+
+    assert summary['Person'] == summary['WORKS_AT'] == ROWS
+    # Some SPARK compounds have neither a PubChem CID nor a ChEMBL id
+    for label in COMPOUND_LABELS:
+        assert summary[label] > 0, label
+    for rel_type in ('IS_INVOLVED_IN', 'SUPERVISES', 'HAS_SKILL', 'WORKS_WITH'):
+        assert summary[rel_type] > 0, rel_type
+
+    assert len(graph) == sum(len(graph.nodes(label)) for label in graph.labels)
+    assert graph.relationship_count == sum(
+        len(graph.relationships(rel_type)[0]) for rel_type in graph.types
+    )
+
+
+def test_neighbors(graph):
+    for person in graph.nodes('Person')[:20]:
+        institutes = graph.neighbors(person, 'WORKS_AT')
+        assert len(institutes) == 1
+        assert graph.label(institutes[0]) == 'Institute'
+        assert person in graph.neighbors(institutes[0], 'WORKS_AT', direction='in')
+
+    # Assays link pathogens to the compounds of every source
+    compounds = {
+        graph.label(compound)
+        for pathogen in graph.nodes('Pathogen')
+        for compound in graph.neighbors(pathogen, 'ASSAY IN')
+    }
+    assert compounds == set(COMPOUND_LABELS)
+
+
+def test_degrees(graph):
+    _, starts, ends = graph.relationships()
+    out_degrees = np.bincount(starts, minlength=len(graph))
+    in_degrees = np.bincount(ends, minlength=len(graph))
+    assert np.array_equal(graph.degrees('out'), out_degrees)
+    assert np.array_equal(graph.degrees('in'), in_degrees)
+    assert graph.degrees('both').sum() == 2 * graph.relationship_count
+
+    # Every compound node comes from an assay row
+    compounds = np.concatenate([graph.nodes(label) for label in COMPOUND_LABELS])
+    assert (graph.degrees('in')[compounds] > 0).all()
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+"""Mapping strain names to the pathogens of the KG"""
+
+import pandas as pd
+
+from metrics import METRICS
+from pathogens import PathogenNormalizer
+
+PATHOGEN_TAXA = {
+    'Escherichia coli': '562',
+    'Staphylococcus aureus': '1280',
+    'Streptococcus': '1301',
+    'Shigella sp.': '620',
+}
+
+ALIASES = {
+    'Clostridioides difficile': 'Clostridium difficile',  # Not a pathogen of the KG
+    'Shigella dysenteriae': 'Shigella sp.',
+}
+
+
+def normalize(*strains) -> list:
+    normalizer = PathogenNormalizer(PATHOGEN_TAXA, aliases=ALIASES)
+    pathogens = normalizer.normalize(pd.Series(strains))
+    return [pathogen if pd.notna(pathogen) else None for pathogen in pathogens]
+
+
+def test_strains_map_to_their_longest_known_prefix():
+    assert normalize(
+        'Staphylococcus aureus (strain MRSA252)',
+        'Escherichia coli O157:H7',
+        'escherichia  COLI',
+        'Streptococcus mutans',
+    ) == [
+        'Staphylococcus aureus',
+        'Escherichia coli',
+        'Escherichia coli',
+        'Streptococcus',
+    ]
+
+
+def test_genus_names_and_aliases():
+    assert normalize(
+        'Shigella flexneri',
+        'Shigella dysenteriae',
+        'Clostridioides difficile',
+    ) == ['Shigella sp.', 'Shigella sp.', None]
+
+
+def test_taxon_ids_only_match_whole():
+    assert normalize(
+        '562',
+        'NCBITaxon:562',
+        'ncbitaxon_1280',
+        '562 unknown',
+        '1280abc',
+    ) == ['Escherichia coli', 'Escherichia coli', 'Staphylococcus aureus', None, None]
+
+
+def test_unknown_and_missing_strains():
+    assert normalize('Homo sapiens', 'Escherichia', None) == [None, None, None]
+
+
+def test_matches_and_cache():
+    normalizer = PathogenNormalizer(PATHOGEN_TAXA, aliases=ALIASES)
+    strains = pd.Series(['E. coli', 'Escherichia coli K-12', 'Escherichia coli K-12'])
+
+    METRICS.reset()
+    assert normalizer.matches(strains).tolist() == [False, True, True]
+    assert normalizer.matches(strains).tolist() == [False, True, True]
+
+    # Each distinct strain is only mapped once
+    assert METRICS.counters['pathogens_cache_misses'] == 2
+    assert METRICS.counters['pathogens_cache_hits'] == 2
+    assert 'Streptococcus' in normalizer
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+"""Running load stages in dependency order, locally and in worker processes"""
+
+import os
+import time
+
+import pytest
+
+from metrics import METRICS
+from pipeline import Pipeline
+
+
+def read(source: str, delay: float = 0.0) -> tuple:
+    time.sleep(delay)
+    METRICS.count('rows_read')
+    return source, os.getpid()
+
+
+def compounds(chembl: tuple, spark: tuple, sep: str) -> str:
+    return f'{chembl[0]}{sep}{spark[0]}'
+
+
+def pathogens(spark: tuple, drug_central: tuple) -> str:
+    return f'{spark[0]}+{drug_central}'
+
+
+def noop(**kwargs):
+    return None
+
+
+def pipeline(workers: int) -> Pipeline:
+    pipeline = Pipeline(workers=workers)
+    pipeline.add('chembl', read, source='chembl', delay=0.2)
+    pipeline.add('spark', read, source='spark')
+    pipeline.add('compounds', compounds, deps=('chembl', 'spark'), local=True, sep='|')
+    pipeline.add('pathogens', pathogens, deps=('spark', 'drug_central'), local=True)
+    return pipeline
+
+
+@pytest.mark.parametrize('workers', [0, 2])
+def test_stages_get_the_results_of_their_dependencies(workers):
+    METRICS.reset()
+    stages = pipeline(workers)
+    results = stages.run()
+
+    assert results['compounds'] == 'chembl|spark'
+    # Stages left out of the pipeline are passed as None
+    assert results['pathogens'] == 'spark+None'
+
+    # Pool stages run in other processes, their metrics are merged back
+    pids = {results[name][1] for name in ('chembl', 'spark')}
+    assert (os.getpid() in pids) == (not workers)
+    assert METRICS.counters['rows_read'] == 2
+    assert METRICS.steps['stage.chembl']['calls'] == 1
+
+    assert set(stages.timings) == set(stages.peaks) == set(stages.stages)
+    for name, deps in (('compounds', ('chembl', 'spark')), ('pathogens', ('spark',))):
+        start = stages.timings[name][0]
+        assert all(stages.timings[dep][1] <= start for dep in deps)
+
+
+def test_critical_path_follows_the_last_dependency():
+    stages = pipeline(workers=2)
+    stages.run()
+
+    assert stages.critical_path() == ['chembl', 'compounds']
+    assert set(stages.report()) == set(stages.stages)
+
+
+def test_invalid_stages():
+    stages = Pipeline(workers=0)
+    stages.add('a', noop, deps=('b', 'c'))
+    with pytest.raises(ValueError, match='already defined'):
+        stages.add('a', noop)
+
+    stages.add('b', noop, deps=('a', 'c'))
+    with pytest.raises(ValueError, match='Unresolvable dependencies in stages a, b'):
+        stages.run()
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+
+"""Cached PubChem lookups, with a stub or a local server in place of PubChem"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.error import HTTPError
+from urllib.parse import parse_qs
+
+import pytest
+
+from pubchem import (
+    LookupCache,
+    OfflineCacheMiss,
+    PubChemResolver,
+    PubChemRestClient,
+    RateLimiter,
+)
+
+
+class StubClient:
+    """Answer like PubChem for CIDs below 1000 and for names starting with ``drug``."""
+
+    def __init__(self):
+        self.calls = []
+
+    def compound(self, cid) -> dict:
+        return self.compounds([cid])[int(cid)]
+
+    def compounds(self, cids: list) -> dict:
+        self.calls.append(('compounds', sorted(int(cid) for cid in cids)))
+        return {
+            int(cid): {'cid': int(cid), 'synonym': f'synonym {cid}', 'iupac_name': None}
+            if int(cid) < 1000 else None
+            for cid in cids
+        }
+
+    def search_name(self, name: str) -> list:
+        self.calls.append(('search_name', name))
+        return [int(name[len('drug'):])] if name.startswith('drug') else []
+
+
+@pytest.fixture
+def client():
+    return StubClient()
+
+
+@pytest.fixture
+def resolver(client):
+    cache = LookupCache(':memory:')
+    return PubChemResolver(cache=cache, client=client, workers=2, batch_size=2)
+
+
+def test_lookups_are_cached(resolver, client):
+    assert resolver.compound('42')['synonym'] == 'synonym 42'
+    assert resolver.compound(42)['synonym'] == 'synonym 42'
+    assert client.calls == [('compounds', [42])]
+
+
+def test_misses_are_cached(resolver, client):
+    assert resolver.compound('4000') is None
+    assert resolver.search_name('aspirin') == []
+    assert resolver.compound('4000') is None
+    assert resolver.search_name('aspirin') == []
+    assert len(client.calls) == 2
+
+
+def test_prefetch_batches_cids_and_fetches_found_names(resolver, client):
+    resolver.prefetch(cids=['1', '2', '3'], names=['drug7', 'unknown', 'drug7'])
+
+    batches = [cids for call, cids in client.calls if call == 'compounds']
+    names = [name for call, name in client.calls if call == 'search_name']
+    assert sorted(cid for cids in batches for cid in cids) == [1, 2, 3, 7]
+    assert all(len(cids) <= 2 for cids in batches)
+    assert sorted(names) == ['drug7', 'unknown']
+
+    calls = len(client.calls)
+    assert resolver.search_name('drug7') == [7]
+    assert resolver.compound('7')['synonym'] == 'synonym 7'
+    resolver.prefetch(cids=['1'], names=['drug7'])
+    assert len(client.calls) == calls
+
+
+def test_offline_uses_only_the_cache(client):
+    cache = LookupCache(':memory:', ttl=0)
+    PubChemResolver(cache=cache, client=client).compound('42')
+
+    offline = PubChemResolver(cache=cache, client=client, offline=True)
+    # Expired entries are still used offline
+    assert offline.compound('42')['synonym'] == 'synonym 42'
+    with pytest.raises(OfflineCacheMiss):
+        offline.compound('43')
+    assert len(client.calls) == 1
+
+
+class FakePubChem(BaseHTTPRequestHandler):
+    """Answer PUG REST POSTs, first with the queued error statuses of the server."""
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length'])).decode()
+        self.server.requests.append((time.monotonic(), self.path, parse_qs(body)))
+
+        if self.server.errors:
+            self.send_error(self.server.errors.pop(0))
+            return
+
+        form = parse_qs(body)
+        if self.path.endswith('/property/IUPACName/JSON'):
+            cids = [int(cid) for cid in form['cid'][0].split(',')]
+            properties = [
+                {'CID': cid, 'IUPACName': f'iupac {cid}'} for cid in cids if cid < 1000
+            ]
+            result = {'PropertyTable': {'Properties': properties}}
+        elif self.path.endswith('/synonyms/JSON'):
+            cids = [int(cid) for cid in form['cid'][0].split(',')]
+            information = [
+                {'CID': cid, 'Synonym': [f'synonym {cid}']}
+                for cid in cids if cid < 1000
+            ]
+            result = {'InformationList': {'Information': information}}
+        elif form['name'][0].startswith('drug'):
+            result = {'IdentifierList': {'CID': [int(form['name'][0][len('drug'):])]}}
+        else:
+            self.send_error(404)
+            return
+
+        payload = json.dumps(result).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakePubChem)
+    server.requests = []
+    server.errors = []
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={'poll_interval': 0.01}, daemon=True
+    )
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def rest_client(server, rate: float = 1000, **kwargs) -> PubChemRestClient:
+    return PubChemRestClient(
+        base_url=f'http://127.0.0.1:{server.server_port}/rest/pug/',
+        limiter=RateLimiter(rate),
+        backoff=0.01,
+        **kwargs
+    )
+
+
+def test_rest_client_posts_cids_in_one_batch(server):
+    compounds = rest_client(server).compounds([1, '2', 4000])
+
+    assert compounds == {
+        1: {'cid': 1, 'synonym': 'synonym 1', 'iupac_name': 'iupac 1'},
+        2: {'cid': 2, 'synonym': 'synonym 2', 'iupac_name': 'iupac 2'},
+        4000: None,
+    }
+    assert [(path, form) for _, path, form in server.requests] == [
+        ('/rest/pug/compound/cid/property/IUPACName/JSON', {'cid': ['1,2,4000']}),
+        ('/rest/pug/compound/cid/synonyms/JSON', {'cid': ['1,2,4000']}),
+    ]
+
+
+def test_rest_client_searches_names(server):
+    client = rest_client(server)
+
+    assert client.search_name('drug7') == [7]
+    assert client.search_name('aspirin') == []
+    assert [form for _, _, form in server.requests] == [
+        {'name': ['drug7']}, {'name': ['aspirin']}
+    ]
+
+
+def test_rest_client_retries_busy_responses_with_backoff(server):
+    server.errors = [429, 503]
+
+    assert rest_client(server).search_name('drug7') == [7]
+
+    times = [start for start, _, _ in server.requests]
+    assert len(times) == 3
+    # Waits of 0.01 and 0.02 s between the attempts
+    assert times[1] - times[0] >= 0.01
+    assert times[2] - times[1] >= 0.02
+
+
+def test_rest_client_gives_up_after_its_retries(server):
+    server.errors = [503, 503, 400]
+
+    with pytest.raises(HTTPError) as error:
+        rest_client(server, retries=1).search_name('drug7')
+    assert error.value.code == 503
+
+    # Client errors other than 429 are not retried
+    with pytest.raises(HTTPError) as error:
+        rest_client(server).search_name('drug7')
+    assert error.value.code == 400
+    assert len(server.requests) == 3
+
+
+def test_rest_client_requests_are_rate_limited(server):
+    client = rest_client(server, rate=20)
+
+    for name in ('drug1', 'drug2', 'drug3', 'drug4', 'drug5'):
+        client.search_name(name)
+
+    times = [start for start, _, _ in server.requests]
+    # 20 requests per second leave 0.05 s between requests
+    assert times[-1] - times[0] >= 4 * 0.05 * 0.9
+    assert all(later - start >= 0.05 * 0.9 for start, later in zip(times, times[1:]))
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+"""N-Triples and Turtle files written by RdfWriter"""
+
+import gzip
+import re
+
+import pytest
+
+from rdf import XSD, RdfWriter, literal
+
+try:
+    import rdflib
+except ImportError:
+    rdflib = None
+
+TERM = r'(?:<[^<>"\s]*>|_:\w+)'
+LITERAL = r'"(?:[^"\\]|\\.)*"(?:\^\^<[^<>"\s]*>)?'
+TRIPLE = re.compile(rf'^{TERM} {TERM} (?:{TERM}|{LITERAL}) \.$')
+
+PATHOGEN = 'http://purl.obolibrary.org/obo/NCBITaxon_562'
+COMPOUND = 'https://identifiers.org/chembl.compound:CHEMBL25'
+PROJECT = 'urn:amr-kg:imi:-AMR'
+
+
+def write(tmp_path, fmt: str, compress: bool) -> RdfWriter:
+    writer = RdfWriter(
+        output_dir=str(tmp_path), fmt=fmt, compress=compress, shard_size=4
+    )
+    writer.add_node(
+        'Pathogen',
+        'Escherichia coli',
+        {'name': 'Escherichia coli', 'curie': 'ncbitaxon:562'}
+    )
+    writer.add_node('Project', '-AMR', {'name': '-AMR', 'curie': 'imi:-AMR'})
+    writer.add_node(
+        'ChEMBL',
+        'CHEMBL25',
+        {'name': 'Aspirin', 'curie': 'chembl:CHEMBL25', 'weight': 180.16}
+    )
+    writer.add_relationship(
+        ('Pathogen', 'Escherichia coli'),
+        'ASSAY IN',
+        ('ChEMBL', 'CHEMBL25'),
+        {'MIC': [2.0, 4.0], 'Censored': float('inf'), 'Source': 'ChEMBL'}
+    )
+    writer.add_relationship(
+        ('Project', '-AMR'), 'INCLUDES', ('Pathogen', 'Escherichia coli')
+    )
+    writer.close()
+    return writer
+
+
+def read(path: str) -> list:
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as file:
+        return file.read().splitlines()
+
+
+def test_special_doubles():
+    assert literal(float('inf')) == f'"INF"^^<{XSD}double>'
+    assert literal(float('-inf')) == f'"-INF"^^<{XSD}double>'
+    assert literal(float('nan')) == f'"NaN"^^<{XSD}double>'
+    assert literal(0.5) == f'"0.5"^^<{XSD}double>'
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_n_triples(tmp_path, compress):
+    writer = write(tmp_path, 'nt', compress)
+
+    # A node or relationship is never split across shards
+    suffix = '.nt.gz' if compress else '.nt'
+    assert [path[len(str(tmp_path)) + 1:] for path in writer.paths] == [
+        f'amr-kg-0000{shard}{suffix}' for shard in range(5)
+    ]
+
+    lines = [line for path in writer.paths for line in read(path)]
+    assert len(lines) == writer.triples == 23
+    assert all(TRIPLE.match(line) for line in lines)
+
+    assert f'<{PATHOGEN}> <urn:amr-kg:relation/ASSAY%20IN> <{COMPOUND}> .' in lines
+    assert f'<{COMPOUND}> <urn:amr-kg:property/name> "Aspirin" .' in lines
+    assert f'<{PROJECT}> <urn:amr-kg:relation/INCLUDES> <{PATHOGEN}> .' in lines
+
+    weight = f'"180.16"^^<{XSD}double>'
+    assert f'<{COMPOUND}> <urn:amr-kg:property/weight> {weight} .' in lines
+
+    # Relationship properties belong to a reified statement, one triple per item
+    statement = [line for line in lines if line.startswith('_:s0 ')]
+    assert len(statement) == 8
+    for name, value in (('MIC', '2.0'), ('MIC', '4.0'), ('Censored', 'INF')):
+        property_iri = f'<urn:amr-kg:property/{name}>'
+        assert f'_:s0 {property_iri} "{value}"^^<{XSD}double> .' in statement
+
+    if rdflib is not None:
+        graph = rdflib.Graph()
+        for path in writer.paths:
+            graph.parse(data='\n'.join(read(path)), format='nt')
+        assert len(graph) == writer.triples
+
+
+def test_turtle(tmp_path):
+    writer = write(tmp_path, 'ttl', compress=True)
+
+    triples = []
+    for path in writer.paths:
+        lines = read(path)
+        assert '@prefix chembl: <https://identifiers.org/chembl.compound:> .' in lines
+        triples += [line for line in lines if line and not line.startswith('@prefix')]
+
+    assert len(triples) == writer.triples == 23
+    assert 'ncbitaxon:562 rdf:type class:Pathogen .' in triples
+    assert 'chembl:CHEMBL25 property:name "Aspirin" .' in triples
+    assert 'ncbitaxon:562 <urn:amr-kg:relation/ASSAY%20IN> chembl:CHEMBL25 .' in triples
+
+    # A local name cannot start with "-", so the IRI is written out in full
+    assert f'<{PROJECT}> relation:INCLUDES ncbitaxon:562 .' in triples
+
+    if rdflib is not None:
+        graph = rdflib.Graph()
+        for path in writer.paths:
+            graph.parse(data='\n'.join(read(path)), format='turtle')
+        assert len(graph) == writer.triples
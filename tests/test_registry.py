@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+"""Interning loader nodes and looking them up by curie, name or alias"""
+
+import logging
+
+import pytest
+
+from registry import NodeRegistry
+
+
+def test_rows_and_column_wise_properties():
+    registry = NodeRegistry(['Pathogen', 'ChEMBL'])
+    table = registry['ChEMBL']
+
+    assert table.set('CHEMBL25', {'name': 'Aspirin', 'curie': 'chembl:CHEMBL25'}) == 0
+    assert table.set('CHEMBL8', {'name': 'Ciprofloxacin', 'weight': 331.3}) == 1
+    assert table.update('CHEMBL25', {'weight': 180.2}) == 0
+    with pytest.raises(KeyError):
+        table.update('CHEMBL1', {'weight': 1.0})
+
+    # Missing properties are left out, not written as None
+    assert table['CHEMBL8'] == {'name': 'Ciprofloxacin', 'weight': 331.3}
+    assert table.columns['curie'] == ['chembl:CHEMBL25', None]
+    assert list(table.items()) == [
+        ('CHEMBL25', {'name': 'Aspirin', 'curie': 'chembl:CHEMBL25', 'weight': 180.2}),
+        ('CHEMBL8', {'name': 'Ciprofloxacin', 'weight': 331.3}),
+    ]
+
+    # Labels are kept in the order they were first added, empty or not
+    registry['SPARK']
+    assert list(registry) == ['Pathogen', 'ChEMBL', 'SPARK']
+    assert len(registry) == 2
+
+
+def test_set_replaces_and_fill_completes():
+    table = NodeRegistry()['PubChem']
+    table.set('2244', {'name': 'Aspirin', 'curie': 'pubchem.compound:2244'})
+
+    table.fill('2244', {'name': 'aspirin', 'smiles': 'CC(=O)OC1=CC=CC=C1C(=O)O'})
+    assert table['2244'] == {
+        'name': 'Aspirin',
+        'curie': 'pubchem.compound:2244',
+        'smiles': 'CC(=O)OC1=CC=CC=C1C(=O)O',
+    }
+
+    # Setting a node again drops its other properties and records a new curie
+    table.set('2244', {'name': 'Aspirin', 'curie': 'pubchem.compound:2244'})
+    table.set('2244', {'name': 'Aspirin', 'curie': 'chembl:CHEMBL25'})
+    assert table['2244'] == {'name': 'Aspirin', 'curie': 'chembl:CHEMBL25'}
+    assert table.collisions == [
+        ('2244', 'pubchem.compound:2244', 'chembl:CHEMBL25')
+    ]
+
+
+def test_lookups_follow_writes():
+    registry = NodeRegistry()
+    chembl, spark = registry['ChEMBL'], registry['SPARK']
+    chembl.set('CHEMBL25', {'name': 'Aspirin', 'curie': 'chembl:CHEMBL25'})
+    spark.set('SPARK-1', {'name': 'ASPIRIN', 'curie': 'spark:SPARK-1'})
+
+    assert registry.lookup('chembl:CHEMBL25') == [('ChEMBL', 'CHEMBL25')]
+    assert registry.lookup('aspirin', by='name') == [
+        ('ChEMBL', 'CHEMBL25'), ('SPARK', 'SPARK-1')
+    ]
+    assert registry.lookup('spark:SPARK-1', by='alias') == []
+    with pytest.raises(ValueError):
+        registry.lookup('Aspirin', by='smiles')
+
+    # Aliases are added explicitly or through the cross-reference properties
+    chembl.update('CHEMBL25', {'Spark ID': 'spark:SPARK-1'})
+    chembl.add_alias('CHEMBL25', 'acetylsalicylic acid')
+    assert registry.lookup('spark:SPARK-1', by='alias') == [('ChEMBL', 'CHEMBL25')]
+    assert registry.lookup('acetylsalicylic acid', by='alias') == [
+        ('ChEMBL', 'CHEMBL25')
+    ]
+
+
+def test_merge_and_report(caplog):
+    registry, other = NodeRegistry(), NodeRegistry()
+    registry['Pathogen'].set('E. coli', {'name': 'E. coli', 'curie': 'ncbitaxon:562'})
+    other['Pathogen'].set('E. coli', {'name': 'E. coli', 'curie': 'ncbitaxon:83333'})
+    other['Pathogen'].set('Ecoli', {'name': 'e. COLI', 'curie': 'ncbitaxon:562'})
+    other['Pathogen'].add_alias('Ecoli', 'Escherichia coli')
+
+    registry.merge(other)
+    table = registry['Pathogen']
+    assert list(table) == ['E. coli', 'Ecoli']
+    assert table['E. coli']['curie'] == 'ncbitaxon:83333'
+    assert registry.lookup('Escherichia coli', by='alias') == [('Pathogen', 'Ecoli')]
+
+    with caplog.at_level(logging.WARNING, logger='registry'):
+        report = registry.report()
+
+    assert report == {
+        'replaced': {
+            'Pathogen': [('E. coli', 'ncbitaxon:562', 'ncbitaxon:83333')]
+        },
+        'names': {('Pathogen', 'e. coli'): ['ncbitaxon:562', 'ncbitaxon:83333']},
+    }
+    assert '1 Pathogen nodes replaced by a node with the same key' in caplog.text
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+"""Reading the source files through their staged Parquet copies"""
+
+import os
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from staging import read_source, stage_source
+
+pytest.importorskip('pyarrow')
+
+FILE_NAME = 'drug_central/drug.target.interaction.tsv'
+COLUMNS = ['DRUG_NAME', 'ACT_VALUE', 'ORGANISM']
+
+ROWS = [
+    ('amoxicillin', '1', '2', 'ug.mL-1', 'MIC', '', 'Escherichia coli', 'PBP'),
+    ('ciprofloxacin', '2', '0.5', 'ug.mL-1', 'MIC', '', 'Staphylococcus aureus', ''),
+    ('aspirin', '3', '', '', 'IC50', '', 'Homo sapiens', 'PTGS1'),
+    ('ciprofloxacin', '2', '1', 'ug.mL-1', 'MIC', '', 'Escherichia coli', 'GYRA'),
+]
+
+
+def write_source(data_dir, rows=ROWS):
+    path = data_dir / FILE_NAME
+    path.parent.mkdir(parents=True, exist_ok=True)
+    columns = [
+        'DRUG_NAME',
+        'STRUCT_ID',
+        'ACT_VALUE',
+        'ACT_UNIT',
+        'ACT_TYPE',
+        'ACT_SOURCE_URL',
+        'ORGANISM',
+        'TARGET_NAME',
+    ]
+    pd.DataFrame(rows, columns=columns).to_csv(path, sep='\t', index=False)
+    return path
+
+
+@pytest.fixture
+def dirs(tmp_path):
+    data_dir, staging_dir = tmp_path / 'data', tmp_path / 'staging'
+    write_source(data_dir)
+    return str(data_dir), str(staging_dir)
+
+
+def read(dirs, filter_values=None, chunksize=None) -> pd.DataFrame:
+    data_dir, staging_dir = dirs
+    df = read_source(
+        FILE_NAME,
+        COLUMNS,
+        filter_values=filter_values,
+        chunksize=chunksize,
+        data_dir=data_dir,
+        staging_dir=staging_dir,
+    )
+    if chunksize is not None:
+        df = pd.concat(list(df), ignore_index=True)
+    return df.reset_index(drop=True)
+
+
+def is_coli(values: pd.Series) -> pd.Series:
+    return values.str.endswith('coli')
+
+
+@pytest.mark.parametrize('filter_values', [None, ['Escherichia coli'], is_coli])
+@pytest.mark.parametrize('chunksize', [None, 1])
+def test_staged_file_reads_as_the_text_file(dirs, filter_values, chunksize):
+    text = read(dirs, filter_values, chunksize)
+
+    data_dir, staging_dir = dirs
+    assert stage_source(FILE_NAME, data_dir, staging_dir)
+    assert os.listdir(os.path.join(staging_dir, 'drug_central')) == [
+        'drug.target.interaction.parquet'
+    ]
+
+    staged = read(dirs, filter_values, chunksize)
+    assert list(staged.columns) == COLUMNS
+    pd.testing.assert_frame_equal(staged, text, check_dtype=False)
+
+
+def test_filtered_chunks_are_not_empty(dirs):
+    data_dir, staging_dir = dirs
+    for staged in (False, True):
+        if staged:
+            stage_source(FILE_NAME, data_dir, staging_dir)
+        chunks = list(
+            read_source(
+                FILE_NAME,
+                COLUMNS,
+                filter_values=['Staphylococcus aureus'],
+                chunksize=1,
+                data_dir=data_dir,
+                staging_dir=staging_dir,
+            )
+        )
+        assert [len(chunk) for chunk in chunks] == [1]
+
+
+def test_changed_source_is_read_as_text_until_staged_again(dirs):
+    data_dir, staging_dir = dirs
+    assert stage_source(FILE_NAME, data_dir, staging_dir)
+    assert not stage_source(FILE_NAME, data_dir, staging_dir)
+
+    path = write_source(Path(data_dir), rows=ROWS[:2])
+    os.utime(path, ns=(0, 0))
+    assert len(read(dirs)) == 2
+
+    assert stage_source(FILE_NAME, data_dir, staging_dir)
+    assert len(read(dirs)) == 2
+    assert stage_source(FILE_NAME, data_dir, staging_dir, force=True)
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+
+"""Parsing and unit normalization of MIC values"""
+
+import pandas as pd
+import pytest
+
+from units import MIC_EXACT, MIC_MASS, MIC_MOLAR, MIC_VALID, normalize_mic
+
+
+def test_comma_decimals_and_quoted_relations():
+    mic = normalize_mic(
+        pd.Series(['44,4', '0,5']),
+        units='nM',
+        relations=pd.Series(["'='", "'>'"])
+    )
+
+    assert mic['value'].tolist() == [44.4, 0.5]
+    assert mic['relation'].tolist() == ['=', '>']
+    assert mic[MIC_MOLAR].tolist() == pytest.approx([0.0444, 0.0005])
+
+
+def test_units_within_values():
+    mic = normalize_mic(pd.Series(['>=4 ug.mL-1', '2 mg/L', '8 uM', '16 µM']))
+
+    assert mic['relation'].tolist() == ['>=', '=', '=', '=']
+    assert mic[MIC_MASS].tolist()[:2] == [4.0, 2.0]
+    assert mic[MIC_MOLAR].tolist()[2:] == [8.0, 16.0]
+
+
+def test_molecular_weight_converts_both_ways():
+    mic = normalize_mic(
+        pd.Series(['10', '5']),
+        units=pd.Series(['uM', 'ug/mL']),
+        molecular_weight=pd.Series(['500,0', '250'])
+    )
+
+    # 10 microM of 500 g/mol is 5 ug/mL, 5 ug/mL of 250 g/mol is 20 microM
+    assert mic[MIC_MASS].tolist() == pytest.approx([5.0, 5.0])
+    assert mic[MIC_MOLAR].tolist() == pytest.approx([10.0, 20.0])
+
+
+def test_unparseable_rows_are_flagged():
+    mic = normalize_mic(
+        pd.Series(['abc', '12', None, '3 furlongs']),
+        units=[None, 'nM', 'nM', None]
+    )
+
+    assert mic[MIC_VALID].tolist() == [False, True, False, False]
+    assert mic[MIC_MOLAR].isna().tolist() == [True, False, True, True]
+
+
+def test_censored_values_are_not_exact():
+    mic = normalize_mic(pd.Series(['>64', '<0.5', '~2', '8', 'abc']), units='ug/mL')
+
+    assert mic[MIC_VALID].tolist() == [True, True, True, True, False]
+    assert mic[MIC_EXACT].tolist() == [False, False, True, True, False]